@@ -0,0 +1,202 @@
+"""
+Benchmarks schema cleanup and data generation over the schemas bundled in tests/data.
+
+For each schema it times the schema cleanup (cleanup_schema_dict, the cleanup_schema_for_data_gen
+steps used for generation), gen_fake_data (per document, JSF and compiled generators built once) and end-to-end gen_data_from_schema on an empty schema cache, records
+the peak memory of each with tracemalloc and the per-stage stats of the end-to-end run.
+Results are written as JSON and compared against a stored baseline.
+
+    python benchmarks/bench_generation.py
+    python benchmarks/bench_generation.py --schemas oc2ls_1.1.0_schema.json --repeat 5
+    python benchmarks/bench_generation.py --save-baseline
+
+Exits with 1 when a time or memory metric is over the baseline by more than the tolerance.
+"""
+
+import argparse
+import copy
+import glob
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from jadnjson.generators.json_generator import build_faker, cleanup_schema_dict, gen_data_from_schema, gen_fake_data
+from jadnjson.utils.gen_stats import GenStats
+from jadnjson.utils.schema_cache import SchemaCache
+
+
+DATA_DIR = os.path.join(os.path.dirname(BENCH_DIR), "tests", "data")
+RESULTS_PATH = os.path.join(BENCH_DIR, "results.json")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+
+# Metrics compared against the baseline, all lower is better
+COMPARED_METRICS = ["cleanup_s", "gen_doc_s", "gen_doc_compiled_s", "end_to_end_s", "cleanup_peak_kb", "gen_doc_peak_kb", "end_to_end_peak_kb"]
+
+# Differences below these are noise, whatever the ratio
+MIN_DELTA = {"_s": 0.01, "_kb": 64}
+
+
+def get_schema_files(names: list = None) -> list:
+    if names:
+        return [os.path.join(DATA_DIR, name) for name in names]
+
+    return sorted(
+        path for path in glob.glob(os.path.join(DATA_DIR, "*.json"))
+        if not path.endswith(" copy.json")
+    )
+
+
+def time_call(func, repeat: int) -> float:
+    """
+    Median seconds of repeat calls.
+    """
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return statistics.median(timings)
+
+
+def peak_kb(func) -> float:
+    """
+    Peak memory allocated by one call, tracemalloc slows calls down so it is measured apart.
+    """
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return round(peak / 1024, 1)
+
+
+def bench_schema(path: str, repeat: int, docs: int, seed: int) -> dict:
+    with open(path) as schema_file:
+        schema = json.load(schema_file)
+
+    result = {"size_bytes": os.path.getsize(path)}
+
+    cleanup = lambda: cleanup_schema_dict(copy.deepcopy(schema))
+    result["cleanup_s"] = round(time_call(cleanup, repeat), 4)
+    result["cleanup_peak_kb"] = peak_kb(cleanup)
+
+    schema_dict, _ = cleanup_schema_dict(copy.deepcopy(schema))
+    faker = build_faker(schema_dict, seed)
+    gen_docs = lambda: [gen_fake_data(schema_dict, faker, seed=seed + i) for i in range(docs)]
+    result["gen_doc_s"] = round(time_call(gen_docs, repeat) / docs, 5)
+    result["gen_doc_peak_kb"] = peak_kb(lambda: gen_fake_data(schema_dict, faker, seed=seed))
+
+    compiled = build_faker(schema_dict, seed, compiled=True)
+    gen_compiled_docs = lambda: [gen_fake_data(schema_dict, compiled, seed=seed + i) for i in range(docs)]
+    result["gen_doc_compiled_s"] = round(time_call(gen_compiled_docs, repeat) / docs, 5)
+
+    # A new cache each run, so the schema is validated and cleaned up every time
+    end_to_end = lambda: gen_data_from_schema(schema, cache=SchemaCache(), seed=seed)
+    result["end_to_end_s"] = round(time_call(end_to_end, repeat), 4)
+    result["end_to_end_peak_kb"] = peak_kb(end_to_end)
+
+    stats = GenStats()
+    gen_data_from_schema(schema, cache=SchemaCache(), seed=seed, stats=stats)
+    result["stages_s"] = {stage: round(seconds, 4) for stage, seconds in stats.timings.items()}
+    result["counters"] = stats.counters
+
+    return result
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Returns a message for each metric over its baseline by more than the tolerance.
+    """
+
+    regressions = []
+    for schema_name, result in results.items():
+        base = baseline.get(schema_name)
+        if not base or "error" in result or "error" in base:
+            continue
+
+        for metric in COMPARED_METRICS:
+            current, previous = result.get(metric), base.get(metric)
+            if not current or not previous:
+                continue
+
+            min_delta = MIN_DELTA["_s"] if metric.endswith("_s") else MIN_DELTA["_kb"]
+            if current > previous * tolerance and current - previous > min_delta:
+                regressions.append(f"{schema_name} {metric}: {previous} => {current} ({current / previous:.2f}x)")
+
+    return regressions
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark schema cleanup and data generation")
+    parser.add_argument("--schemas", nargs="*", help="schema file names in tests/data, all of them by default")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per metric, the median is kept")
+    parser.add_argument("--docs", type=int, default=10, help="documents per gen_fake_data run")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=RESULTS_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=1.25, help="allowed ratio over the baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    args = parser.parse_args(argv)
+
+    logging.getLogger("jadnjson").setLevel(logging.ERROR)
+
+    results = {}
+    for path in get_schema_files(args.schemas):
+        schema_name = os.path.basename(path)
+        try:
+            results[schema_name] = bench_schema(path, args.repeat, args.docs, args.seed)
+        except Exception as err:
+            results[schema_name] = {"error": str(err)}
+
+        result = results[schema_name]
+        if "error" in result:
+            print(f"{schema_name:45} error: {result['error'].splitlines()[0][:60]}")
+        else:
+            print(
+                f"{schema_name:45} cleanup {result['cleanup_s']:8.4f}s  doc {result['gen_doc_s']:8.5f}s  "
+                f"compiled {result['gen_doc_compiled_s']:8.5f}s  "
+                f"end-to-end {result['end_to_end_s']:8.4f}s  peak {result['end_to_end_peak_kb']:10.1f}KB"
+            )
+
+    output = {"python": platform.python_version(), "machine": platform.machine(), "results": results}
+    with open(args.output, "w") as results_file:
+        json.dump(output, results_file, indent=2, sort_keys=True)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(output, baseline_file, indent=2, sort_keys=True)
+        print(f"baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}, run with --save-baseline to store one")
+        return 0
+
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+
+    regressions = compare(results, baseline.get("results", {}), args.tolerance)
+    for regression in regressions:
+        print(f"regression: {regression}")
+
+    if not regressions:
+        print(f"no regressions over {args.baseline} (tolerance {args.tolerance}x)")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Benchmarks the import time of the jadnjson entry points, the startup cost of each CLI run,
+worker process and test process.
+
+Each module is imported in a new interpreter, the time of the import is measured there and
+the slow dependencies (JSF, Faker, benedict, jsonschema) it loaded are listed.  Results are
+written as JSON and compared against a stored baseline.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --repeat 20
+    python benchmarks/bench_startup.py --save-baseline
+
+Exits with 1 when an import is over the baseline by more than the tolerance, or loads a
+dependency it did not load in the baseline.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_PATH = os.path.join(BENCH_DIR, "startup_results.json")
+BASELINE_PATH = os.path.join(BENCH_DIR, "startup_baseline.json")
+
+MODULES = [
+    "jadnjson",
+    "jadnjson.validators.schema_validator",
+    "jadnjson.generators.json_generator",
+    "jadnjson.generators.parallel_generator",
+    "jadnjson.generators.async_generator",
+    "jadnjson.cli",
+    "jsf"
+]
+
+# Dependencies that are slow to import, reported when an import loads them
+SLOW_DEPENDENCIES = ["jsf", "faker", "benedict", "jsonschema"]
+
+# Differences below this are noise, whatever the ratio
+MIN_DELTA_S = 0.01
+
+_IMPORT_CODE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "loaded": [name for name in {dependencies} if name in sys.modules]}}))
+"""
+
+
+def bench_import(module: str, repeat: int) -> dict:
+    """
+    Median import seconds over repeat new interpreters, with the slow dependencies loaded.
+    """
+
+    code = _IMPORT_CODE.format(module=module, dependencies=SLOW_DEPENDENCIES)
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output)
+        timings.append(result["seconds"])
+
+    return {"import_s": round(statistics.median(timings), 4), "loaded": result["loaded"]}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Returns a message for each import over its baseline by more than the tolerance, or
+    loading more of the slow dependencies.
+    """
+
+    regressions = []
+    for module, result in results.items():
+        base = baseline.get(module)
+        if not base or "error" in result or "error" in base:
+            continue
+
+        current, previous = result["import_s"], base["import_s"]
+        if current > previous * tolerance and current - previous > MIN_DELTA_S:
+            regressions.append(f"{module} import_s: {previous} => {current} ({current / previous:.2f}x)")
+
+        loaded = sorted(set(result["loaded"]) - set(base["loaded"]))
+        if loaded:
+            regressions.append(f"{module} now loads {', '.join(loaded)}")
+
+    return regressions
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the import time of the jadnjson entry points")
+    parser.add_argument("--modules", nargs="*", default=MODULES, help="modules to import")
+    parser.add_argument("--repeat", type=int, default=10, help="interpreters per module, the median is kept")
+    parser.add_argument("--output", default=RESULTS_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=1.5, help="allowed ratio over the baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for module in args.modules:
+        try:
+            results[module] = bench_import(module, args.repeat)
+        except subprocess.CalledProcessError as err:
+            results[module] = {"error": err.stderr.strip().splitlines()[-1]}
+
+        result = results[module]
+        if "error" in result:
+            print(f"{module:45} error: {result['error'][:60]}")
+        else:
+            print(f"{module:45} import {result['import_s']:8.4f}s  loads {', '.join(result['loaded']) or '-'}")
+
+    output = {"python": platform.python_version(), "machine": platform.machine(), "results": results}
+    with open(args.output, "w") as results_file:
+        json.dump(output, results_file, indent=2, sort_keys=True)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(output, baseline_file, indent=2, sort_keys=True)
+        print(f"baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}, run with --save-baseline to store one")
+        return 0
+
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+
+    regressions = compare(results, baseline.get("results", {}), args.tolerance)
+    for regression in regressions:
+        print(f"regression: {regression}")
+
+    if not regressions:
+        print(f"no regressions over {args.baseline} (tolerance {args.tolerance}x)")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,20 @@
-from jadnjson.generators.json_generator import gen_data_from_schema, ReturnVal
 from jadnjson.constants.generator_constants import BASE_16, BASE_32, BASE_64, CONTENT_ENCODING, DOL_REF, POUND, POUND_SLASH, SLASH_DOL_REF
-from jadnjson.validators.schema_validator import validate_schema
-from jadnjson.constants import generator_constants
\ No newline at end of file
+from jadnjson.constants import generator_constants
+
+# Imported on first use, so importing the package or its constants does not load the generators
+_LAZY_IMPORTS = {
+    "gen_data_from_schema": "jadnjson.generators.json_generator",
+    "ReturnVal": "jadnjson.generators.json_generator",
+    "validate_schema": "jadnjson.validators.schema_validator"
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_IMPORTS:
+        import importlib
+
+        value = getattr(importlib.import_module(_LAZY_IMPORTS[name]), name)
+        globals()[name] = value
+        return value
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,168 @@
+"""
+Generates data for a set of schemas, one schema per worker process.
+
+    jadnjson-gen tests/data -n 100 -o _out --workers 4 --seed 42
+
+Each schema's documents are written to <output>/<schema name>.ndjson, replacing the file
+of an earlier run, and a summary line is printed per schema.  Exits with 1 when any schema
+fails, and with 2 before generating anything when two schemas have the same name.
+"""
+
+import argparse
+import glob
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from jadnjson.constants import generator_constants
+from jadnjson.generators.json_generator import gen_data_stream_from_schema
+from jadnjson.utils.cleanup_options import CleanupOptions
+from jadnjson.utils.gen_stats import GenStats
+from jadnjson.utils.general_utils import read_json, write_ndjson
+
+
+logger = logging.getLogger(__name__)
+
+
+def find_schemas(paths: list) -> list:
+    """
+    The schema files given, and the .json files in the directories given, sorted.
+    """
+
+    schema_paths = set()
+    for path in paths:
+        if os.path.isdir(path):
+            schema_paths.update(glob.glob(os.path.join(path, "*.json")))
+        else:
+            schema_paths.add(path)
+
+    return sorted(schema_paths)
+
+
+def get_schema_name(schema_path: str) -> str:
+    """
+    The name a schema's output file and summary line are given, its file name without .json.
+    """
+
+    return os.path.splitext(os.path.basename(schema_path))[0]
+
+
+def find_name_clashes(schema_paths: list) -> dict:
+    """
+    The schema names given to more than one of the schema files, with their files.
+    """
+
+    paths_by_name = {}
+    for path in schema_paths:
+        paths_by_name.setdefault(get_schema_name(path), []).append(path)
+
+    return {name: paths for name, paths in paths_by_name.items() if len(paths) > 1}
+
+
+def gen_schema_file(schema_path: str, count: int, output_dir: str, gen_args: dict) -> dict:
+    """
+    Generates count documents for one schema file into output_dir with the gen_args of
+    gen_data_stream_from_schema, returns its summary.
+    The documents go to a temporary file that replaces the schema's .ndjson once they are
+    all written, a failed schema leaves the file of an earlier run as it was.  Errors are
+    reported in the summary instead of raised, so one schema does not stop the others.
+    """
+
+    name = get_schema_name(schema_path)
+    output_path = os.path.join(output_dir, name + ".ndjson")
+    tmp_path = output_path + ".tmp"
+    summary = {"schema": name, "documents": 0, "seconds": 0.0, "generation": 0.0, "invalid": 0, "error": None}
+    stats = GenStats()
+
+    start = time.perf_counter()
+    try:
+        with open(tmp_path, "wb") as ndjson_file:
+            schema = read_json(schema_path)
+            docs = gen_data_stream_from_schema(schema, count, stats=stats, **gen_args)
+            summary["documents"] = write_ndjson(docs, ndjson_file)
+        os.replace(tmp_path, output_path)
+    except Exception as err:
+        logger.debug("%s failed", schema_path, exc_info=True)
+        summary["error"] = str(err) or type(err).__name__
+
+        # No partial output for a failed schema
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    summary["seconds"] = time.perf_counter() - start
+    summary["generation"] = stats.timings.get("generation", 0.0)
+    summary["invalid"] = stats.counters.get("instances_invalid", 0)
+    return summary
+
+
+def print_summary(summary: dict):
+    if summary["error"]:
+        print(f"{summary['schema']:45} error: {summary['error']}")
+    else:
+        invalid = f"  {summary['invalid']} invalid" if summary["invalid"] else ""
+        print(
+            f"{summary['schema']:45} {summary['documents']:8} docs  {summary['seconds']:8.3f}s"
+            f"  (generation {summary['generation']:.3f}s){invalid}"
+        )
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate JSON data for schema files, one schema per worker")
+    parser.add_argument("paths", nargs="+", help="schema files, or directories of .json schema files")
+    parser.add_argument("-n", "--count", type=int, default=1, help="documents per schema")
+    parser.add_argument("-o", "--output", default="_out", help="directory the .ndjson files are written to")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes, the cpu count by default")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--compiled", action="store_true", help="generate from the compiled schemas")
+    parser.add_argument("--shared-refs", action="store_true", help="resolve refs to shared definitions")
+    parser.add_argument("--target-size", type=int, default=generator_constants.GEN_TARGET_SIZE, help="planned bytes per document")
+    parser.add_argument(
+        "--recursion-depth", type=int, default=generator_constants.GEN_RECURSION_DEPTH,
+        help="levels recursive definitions are unrolled to, 0 removes the recursion"
+    )
+    parser.add_argument("--validate", action="store_true", help="validate the documents and repair what fails")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    schema_paths = find_schemas(args.paths)
+    if not schema_paths:
+        parser.error("no schema files found")
+
+    # Each would replace the other's output file
+    clashes = find_name_clashes(schema_paths)
+    if clashes:
+        parser.error("; ".join(f"{', '.join(paths)} would all be written to {name}.ndjson" for name, paths in clashes.items()))
+
+    os.makedirs(args.output, exist_ok=True)
+    gen_args = {
+        "seed": args.seed, "compiled": args.compiled, "validate": args.validate,
+        "options": CleanupOptions(shared_refs=args.shared_refs, target_size=args.target_size, recursion_depth=args.recursion_depth)
+    }
+    workers = min(args.workers or os.cpu_count() or 1, len(schema_paths))
+
+    start = time.perf_counter()
+    summaries = []
+    if workers == 1:
+        for path in schema_paths:
+            summaries.append(gen_schema_file(path, args.count, args.output, gen_args))
+            print_summary(summaries[-1])
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            futures = [executor.submit(gen_schema_file, path, args.count, args.output, gen_args) for path in schema_paths]
+            for future in futures:
+                summaries.append(future.result())
+                print_summary(summaries[-1])
+
+    failed = sum(1 for summary in summaries if summary["error"])
+    documents = sum(summary["documents"] for summary in summaries)
+    print(f"{len(summaries)} schemas, {documents} docs, {failed} failed in {time.perf_counter() - start:.3f}s")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
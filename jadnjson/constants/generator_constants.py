@@ -17,10 +17,14 @@ POUND = "#"
 POUND_SLASH = "#/"
 POUND_SLASH_DEFINITIONS = "#/definitions"
 DEFINITIONS = "definitions"
+DEFINITION_TAGS = [DEFINITIONS, "$defs"]
 MAX_ITEMS = "maxItems"
 MAX_LENGTH = "maxLength"
 MIN_ITEMS = "minItems"
 MIN_LENGTH= "minLength"
+MAX_PROPERTIES = "maxProperties"
+MIN_PROPERTIES = "minProperties"
+ANY_OF = "anyOf"
 OBJECT = "object"
 SCHEMA_KEY = "$schema"                
 # SCHEMA_URL = "https://json-schema.org/draft/2020-12/schema"                
@@ -37,9 +41,45 @@ DATETIME_TIMEZONE_REVISED = "/(\\d{4})-?(\\d{2})-?(\\d{2})[T\\s]?(\\d{2}):?(\\d{
 NCNAME_ORIG = "^(\\p{L}|_)(\\p{L}|\\p{N}|[.\\-_])*$"
 NCNAME_REVISED = "^[a-zA-Z_][\\w.-]*$"
 
+# Data generation
+GEN_MAX_ATTEMPTS = 6
+# Bytes of JSON per document the cleanup plans array and string limits for
+GEN_TARGET_SIZE = 8192
+# Levels recursive definitions are unrolled to, 0 removes the refs that make the recursion
+GEN_RECURSION_DEPTH = 0
+
 # File Paths
 TESTS_PATH = "/tests/data/"
 
 # Reserved words
 RES_WORD_TYPE = "Type"
-RES_WORD_TYPE_ALT = "Type$1"
\ No newline at end of file
+RES_WORD_TYPE_ALT = "Type$1"
+
+# Keywords updated by the schema cleanup
+UNIQUE_ITEMS = "uniqueItems"
+PATTERN = "pattern"
+
+# Keywords whose value maps names to subschemas, and keywords whose value is data, not schemas
+SCHEMA_MAP_KEYWORDS = [PROPERTIES, "patternProperties", "dependentSchemas"] + DEFINITION_TAGS
+DATA_KEYWORDS = ["enum", "const", "default", "examples"]
+
+# Schema compiler, nodes holding any of the fallback keywords are generated by JSF
+ARRAY = "array"
+ITEMS = "items"
+ENUM = "enum"
+CONST = "const"
+ONE_OF = "oneOf"
+ALL_OF = "allOf"
+FORMAT = "format"
+# Formats JSF generates values for, the keys of jsf.schema_types.string.format_map (JSF adds
+# regex once it generates a string), listed here so planning and compiling a schema can check
+# them without importing JSF
+JSF_FORMATS = frozenset([
+    "date", "date-time", "duration", "email", "hostname", "idn-email", "idn-hostname", "ipv4", "ipv6", "iri",
+    "iri-reference", "json-pointer", "regex", "relative-json-pointer", "time", "uri", "uri-reference",
+    "uri-template", "uuid"
+])
+COMPILER_FALLBACK_KEYWORDS = [
+    DOL_REF, ALL_OF, "not", "if", "then", "else", "patternProperties", "dependencies", 
+    "contentMediaType", "prefixItems", "$provider", "$state", "$fixed"
+]
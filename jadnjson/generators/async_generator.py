@@ -0,0 +1,158 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import Executor
+
+from jadnjson.constants import generator_constants
+from jadnjson.generators.json_generator import (
+    SCHEMA_CACHE, DataGenerationError, ReturnVal, build_faker, build_repairer, check_cancelled, gen_fake_data,
+    get_child_seed, get_prepared_key, prepare_schema
+)
+from jadnjson.generators.instance_repair import InstanceRepairer
+from jadnjson.utils.cleanup_options import CleanupOptions
+from jadnjson.utils.gen_budget import GenerationBudget
+from jadnjson.utils.gen_stats import GenStats
+from jadnjson.utils.schema_cache import SchemaCache
+
+
+# Preparations in flight, by event loop and cache key, see prepare_schema_async
+_preparing = {}
+
+
+async def prepare_schema_async(
+    schema: dict,
+    cache: SchemaCache = SCHEMA_CACHE,
+    stats: GenStats = None,
+    options: CleanupOptions = None,
+    executor: Executor = None
+) -> tuple[dict, dict]:
+    """
+    Runs prepare_schema on the executor (the loop's default one when None).  Concurrent
+    calls for the same schema and options share one preparation, its stages are added to
+    the stats of the call that started it, the others count shared_preparations.  Calls
+    after it are served from the cache.  Cancelling a call does not stop a preparation
+    other calls are waiting on.  With cache=None each call prepares its own schema.
+    """
+
+    loop = asyncio.get_running_loop()
+    stats = stats or GenStats()
+
+    if cache is None:
+        return await loop.run_in_executor(executor, functools.partial(prepare_schema, schema, None, stats, options))
+
+    cache_key = await loop.run_in_executor(executor, functools.partial(get_prepared_key, schema, options))
+
+    in_flight = (loop, cache_key)
+    future = _preparing.get(in_flight)
+    if future is None:
+        future = loop.run_in_executor(executor, functools.partial(prepare_schema, schema, cache, stats, options, cache_key))
+        _preparing[in_flight] = future
+        future.add_done_callback(functools.partial(_prepared, in_flight))
+    else:
+        stats.count("shared_preparations")
+
+    return await asyncio.shield(future)
+
+
+def _prepared(in_flight: tuple, future: asyncio.Future):
+    _preparing.pop(in_flight, None)
+
+    # Retrieved here in case every caller was cancelled, the next call prepares again
+    if not future.cancelled():
+        future.exception()
+
+
+def _build_and_generate(
+    schema_dict: dict,
+    seed: int,
+    compiled: bool,
+    budget: GenerationBudget,
+    max_attempts: int,
+    stats: GenStats,
+    cancel: threading.Event,
+    repairer: InstanceRepairer = None
+) -> tuple:
+    check_cancelled(cancel)
+
+    # Generated with a budget, unlimited when none is given, so cancel stops it part way
+    with stats.time("model"):
+        faker = build_faker(schema_dict, seed, compiled, budget or GenerationBudget())
+
+    fake_data = gen_fake_data(schema_dict, faker, max_attempts, get_child_seed(seed, 0), stats, cancel, repairer)
+    return fake_data, faker.budget.hit if budget is not None else None
+
+
+async def gen_data_from_schema_async(
+    schema: dict,
+    cache: SchemaCache = SCHEMA_CACHE,
+    max_attempts: int = generator_constants.GEN_MAX_ATTEMPTS,
+    seed: int = None,
+    stats: GenStats = None,
+    compiled: bool = False,
+    options: CleanupOptions = None,
+    budget: GenerationBudget = None,
+    executor: Executor = None,
+    timeout: float = None,
+    validate: bool = False
+) -> ReturnVal:
+    """
+    gen_data_from_schema for asyncio code.  The preparation and generation run on the
+    executor (the loop's default thread pool when None), the event loop is free meanwhile,
+    and requests for the same schema share one preparation (see prepare_schema_async).
+    The same seed gives the same document as gen_data_from_schema, and budget_hit tells
+    whether the document hit the budget the same way.  validate repairs the document like
+    gen_data_from_schema does, the repairer is built on the executor too.
+
+    timeout is the deadline in seconds for the whole call, when it runs out err_msg is a
+    TimeoutError.  When the call times out or is cancelled the executor's thread is freed
+    right away: the document is generated from the compiled schema with a budget (an
+    unlimited one when budget is None), which stops at the next schema node once the call
+    is over.  Nodes left to JSF (see SchemaCompiler) are not interrupted.
+    """
+
+    loop = asyncio.get_running_loop()
+    deadline = None if timeout is None else loop.time() + timeout
+
+    ret_val = ReturnVal()
+    ret_val.stats = stats or ret_val.stats
+    cancel = threading.Event()
+
+    try:
+        repairer = None
+        if validate:
+            # Built before the preparation, which changes the schema in place with cache=None
+            repairer = await asyncio.wait_for(
+                loop.run_in_executor(executor, build_repairer, schema, cache), get_remaining(loop, deadline)
+            )
+
+        schema_dict, choices_found = await asyncio.wait_for(
+            prepare_schema_async(schema, cache, ret_val.stats, options, executor),
+            get_remaining(loop, deadline)
+        )
+
+        ret_val.gen_data, ret_val.budget_hit = await asyncio.wait_for(
+            loop.run_in_executor(executor, functools.partial(
+                _build_and_generate, schema_dict, seed, compiled, budget, max_attempts, ret_val.stats, cancel, repairer
+            )),
+            get_remaining(loop, deadline)
+        )
+    except asyncio.TimeoutError:
+        ret_val.err_msg = asyncio.TimeoutError(f"data generation did not finish in {timeout}s")
+    except DataGenerationError as err:
+        ret_val.err_msg = err
+    except asyncio.CancelledError:
+        raise
+    except Exception as err:
+        ret_val.err_msg = err
+    finally:
+        cancel.set()
+
+    return ret_val
+
+
+def get_remaining(loop: asyncio.AbstractEventLoop, deadline: float = None) -> float | None:
+    """
+    Seconds left until the deadline, in loop time, None without one.
+    """
+
+    return None if deadline is None else max(deadline - loop.time(), 0)
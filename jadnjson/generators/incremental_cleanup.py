@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import copy
+from typing import TYPE_CHECKING
+
+from jadnjson.constants import generator_constants
+from jadnjson.generators.json_generator import (
+    CLEANUP_VISITOR, add_required_root_items, find_choices, fix_root_ref, is_choice, replace_reserved_words, split_choice
+)
+from jadnjson.utils.cleanup_options import CleanupOptions
+from jadnjson.utils.gen_stats import GenStats
+from jadnjson.utils.general_utils import is_benedict, loads_json
+from jadnjson.utils.ref_resolver import ROOT, RefResolver, get_ref_owner
+from jadnjson.utils.schema_cache import get_schema_hash
+from jadnjson.utils.schema_index import SchemaIndex
+from jadnjson.utils.size_planner import SizePlanner
+
+if TYPE_CHECKING:
+    from benedict import benedict
+
+
+class CleanedDefinition:
+    """
+    A definition (or the schema root, outside of its definitions) as the last cleanup left it:
+    the fingerprint of its schema before cleanup, the definitions it refers to, its refs removed
+    for recursion, its cleaned node and the choices split in it.
+    """
+
+    def __init__(self, fingerprint: str, refs: list, recursive_refs: list):
+        self.fingerprint = fingerprint
+        self.refs = refs
+        self.recursive_refs = recursive_refs
+        self.node = None
+        self.choices = {}
+
+    def is_same(self, other: "CleanedDefinition") -> bool:
+        return (
+            other is not None and self.fingerprint == other.fingerprint and self.refs == other.refs
+            and self.recursive_refs == other.recursive_refs
+        )
+
+
+class IncrementalCleaner:
+    """
+    cleanup_schema_dict for successive versions of a schema.  Each definition is kept with its
+    fingerprint, its cleaned node and the definitions it refers to.  Given the next version, only
+    the definitions that changed, and the ones that refer to them directly or through other
+    definitions, are cleaned up again, the others reuse their cleaned node from the last version.
+    The schema is the same as cleanup_schema_dict gives for the version, choices are listed at
+    the keypaths they were split at.
+
+    A definition changed when its schema, the definitions its refs point to or its refs removed
+    for recursion are not the ones of the last version.  The size planning covers the whole
+    document, it runs for every version.  Unrolled recursive definitions (see recursion_depth
+    in CleanupOptions) are definitions like the others.
+    """
+
+    def __init__(self, options: CleanupOptions = None):
+        self.options = options or CleanupOptions()
+        self.definitions = {}
+
+    def cleanup(self, schema: str | dict | benedict, stats: GenStats = None) -> tuple[dict, dict]:
+        """
+        Cleans up the next version of the schema, returns the cleaned schema and its choices
+        like cleanup_schema_dict.  The schema given is not changed.  stats counts the
+        definitions_cleaned and definitions_reused (the schema root counts as one).
+        """
+
+        stats = stats or GenStats()
+
+        if isinstance(schema, str):
+            schema = loads_json(schema)
+        else:
+            schema = copy.deepcopy(schema.dict() if is_benedict(schema) else schema)
+
+        with stats.time("root_fixing"):
+            fix_root_ref(schema)
+            add_required_root_items(schema)
+
+        with stats.time("ref_resolution"):
+            index = SchemaIndex(schema)
+            replace_reserved_words(index, stats)
+
+            resolver = RefResolver(index)
+            stats.count("recursions_unrolled", resolver.unroll_recursive_refs(self.options.recursion_depth))
+            definitions = self._get_definitions(index, resolver)
+            changed = [owner for owner, definition in definitions.items() if not definition.is_same(self.definitions.get(owner))]
+            dirty = self._get_dependents(resolver.graph, changed)
+
+        with stats.time("cleanup"):
+            reused = [owner for owner in definitions if owner not in dirty]
+            nodes_visited = CLEANUP_VISITOR.visit(schema, {"stats": stats}, [index[owner] for owner in reused if owner != ROOT])
+            stats.count("nodes_visited", nodes_visited)
+
+            for owner in reused:
+                definitions[owner].node = self.definitions[owner].node
+                definitions[owner].choices = self.definitions[owner].choices
+                for keypath, node in self._get_owned(owner, definitions[owner].node):
+                    index.link(keypath, node, keypath)
+
+        with stats.time("ref_resolution"):
+            resolver.remove_recursive_refs(dirty)
+            stats.count("recursions_removed", sum(len(definitions[owner].recursive_refs) for owner in dirty))
+            stats.count("refs_unresolved", len(resolver.unresolved_refs))
+
+            choice_keys = {}
+            for choice_key in find_choices(index):
+                choice_keys.setdefault(get_ref_owner(choice_key), []).append(choice_key)
+
+            # In dependency order, so the definitions a ref is resolved to are complete, choices split
+            ref_sites = resolver.get_ref_sites(dirty)
+            for owner in resolver.resolve_order:
+                if owner not in dirty:
+                    continue
+
+                resolver.resolve_refs(ref_sites.get(owner, []), self.options.shared_refs, False)
+
+                for choice_key in choice_keys.get(owner, []):
+                    choice = index.get(choice_key)
+                    if is_choice(choice):
+                        definitions[owner].choices[choice_key] = list(choice[generator_constants.PROPERTIES])
+                        split_choice(choice)
+                        stats.count("choices_split")
+
+                definitions[owner].node = index[owner] if owner != ROOT else dict(self._get_owned(owner, schema))
+
+            stats.count("refs_resolved", resolver.resolved_refs)
+
+        self.definitions = definitions
+        stats.count("definitions_cleaned", len(dirty))
+        stats.count("definitions_reused", len(reused))
+
+        # Planning changes the schema in place, the cleaned definitions are kept for the next version
+        with stats.time("planning"):
+            schema = copy.deepcopy(schema)
+            planner = SizePlanner(self.options.target_size, self.options.target_seconds)
+            planner.plan(schema)
+            stats.count("constraints_clamped", planner.apply())
+
+        return schema, {key: options for definition in definitions.values() for key, options in definition.choices.items()}
+
+    def _get_definitions(self, index: SchemaIndex, resolver: RefResolver) -> dict:
+        recursive_refs = {}
+        for ref_site, pointer in resolver.recursive_refs:
+            recursive_refs.setdefault(get_ref_owner(ref_site), []).append((ref_site, pointer))
+
+        definitions = {}
+        for owner, targets in resolver.graph.items():
+            node = index[owner] if owner != ROOT else dict(self._get_owned(owner, index.schema))
+            definitions[owner] = CleanedDefinition(get_schema_hash(node), sorted(targets), recursive_refs.get(owner, []))
+
+        return definitions
+
+    def _get_owned(self, owner: str, node: dict) -> list:
+        """
+        The (keypath, node) pairs a definition is made of, the root's are its keys outside of the definitions.
+        """
+
+        if owner != ROOT:
+            return [(owner, node)]
+
+        return [(key, value) for key, value in node.items() if key not in generator_constants.DEFINITION_TAGS]
+
+    def _get_dependents(self, graph: dict, owners: list) -> set:
+        """
+        The owners and every definition that refers to one of them, directly or through other definitions.
+        """
+
+        referrers = {}
+        for owner, targets in graph.items():
+            for target in targets:
+                referrers.setdefault(target, set()).add(owner)
+
+        dependents = set(owners)
+        stack = list(owners)
+        while stack:
+            for referrer in referrers.get(stack.pop(), ()):
+                if referrer not in dependents:
+                    dependents.add(referrer)
+                    stack.append(referrer)
+
+        return dependents
@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import copy
+import json
+import logging
+import random
+import re
+import threading
+from typing import TYPE_CHECKING, Any, Callable
+
+from jadnjson.constants import generator_constants
+from jadnjson.generators.json_generator import add_required_root_items, fix_root_ref, replace_reserved_words
+from jadnjson.generators.schema_compiler import SchemaCompiler
+from jadnjson.utils.gen_stats import GenStats
+from jadnjson.utils.ref_resolver import ROOT, RefResolver, get_pointer_keypath, get_ref_owner
+from jadnjson.utils.schema_index import SchemaIndex
+from jadnjson.utils.seeding import seeded_generation
+from jadnjson.validators.schema_validator import get_validator
+
+if TYPE_CHECKING:
+    from jsonschema.exceptions import ValidationError
+    from jsonschema.protocols import Validator
+
+    from jadnjson.utils.schema_cache import SchemaCache
+
+
+logger = logging.getLogger(__name__)
+
+# Errors a subtree is generated again for, with every property and at least one item
+NON_EMPTY_KEYWORDS = frozenset(["minProperties", "minItems", "minLength"])
+
+# Repaired after the other errors of the same node, duplicates and extra properties are removed first
+MAXIMUM_KEYWORDS = frozenset(["maxItems", "maxProperties", "maxLength"])
+
+
+class InstanceRepairer:
+    """
+    Validates generated documents against the schema and repairs the subtrees that fail,
+    instead of generating the whole document again.
+
+    The validator is built once per schema and cached (see get_validator), for the schema
+    as data generation sees it: its root ref fixed, the root items required and reserved
+    words replaced, but its refs and patterns as written.  It is for the draft the caller's
+    $schema names, see get_validator_class.  Each error is repaired where the
+    validator found it, deepest first: extra properties and duplicate items are removed,
+    arrays, strings and objects over their maximum are cut, missing required properties,
+    enums and consts are filled in and any other failing subtree is generated again from
+    the subschema it failed, with SchemaCompiler.  The document is validated again after
+    each round of repairs, for up to max_rounds rounds.  The root is never generated again.
+
+    A repairer is built once per schema and cached with it (see build_repairer), the
+    schema's definitions are resolved once for every subschema it generates.  It repairs one
+    document at a time, callers in other threads wait for their turn.
+    """
+
+    def __init__(self, schema: dict, max_rounds: int = 3, cache: SchemaCache = None):
+        schema_url = schema.get(generator_constants.SCHEMA_KEY)
+
+        schema = copy.deepcopy(schema)
+        fix_root_ref(schema)
+        add_required_root_items(schema)
+        replace_reserved_words(SchemaIndex(schema))
+
+        # fix_root_ref names draft-07 for JSF, documents are validated by the caller's draft
+        if schema_url is None:
+            del schema[generator_constants.SCHEMA_KEY]
+        else:
+            schema[generator_constants.SCHEMA_KEY] = schema_url
+
+        self.schema = schema
+        self.max_rounds = max_rounds
+        self.cache = cache
+        self.rng = random.Random()
+        self._validator = None
+        self._compiler = None
+        self._generators = {}
+        self._definitions = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        # Validators and compiled generators are built again in the process that unpickles it
+        return {"schema": self.schema, "max_rounds": self.max_rounds}
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(
+            state, cache=None, rng=random.Random(), _validator=None, _compiler=None, _generators={}, _definitions=None,
+            _lock=threading.Lock()
+        )
+
+    @property
+    def validator(self) -> Validator:
+        if self._validator is None:
+            self._validator = get_validator(self.schema, self.cache)
+        return self._validator
+
+    def repair(self, instance: Any, stats: GenStats = None, seed: int = None) -> list[ValidationError]:
+        """
+        Repairs the instance in place, returns the errors left after max_rounds.  stats
+        counts the instance_errors found, the instance_repairs made and the
+        instances_invalid left with errors.  With a seed the subtrees generated again are
+        reproducible.
+        """
+
+        stats = stats or GenStats()
+
+        # The compiled generators draw from self.rng, shared by every caller of a cached repairer
+        with self._lock, seeded_generation(seed, self.rng):
+            errors = list(self.validator.iter_errors(instance))
+            stats.count("instance_errors", len(errors))
+
+            for _ in range(self.max_rounds):
+                if not errors:
+                    break
+
+                for error in sorted(errors, key=lambda error: (-len(error.absolute_path), error.validator in MAXIMUM_KEYWORDS)):
+                    if self._repair_error(instance, error):
+                        stats.count("instance_repairs")
+
+                errors = list(self.validator.iter_errors(instance))
+
+        if errors:
+            logger.debug("instance still invalid after %s rounds: %s", self.max_rounds, [error.message for error in errors])
+            stats.count("instances_invalid")
+
+        return errors
+
+    def _repair_error(self, instance: Any, error: ValidationError) -> bool:
+        path = list(error.absolute_path)
+        parent = instance
+        for key in path[:-1]:
+            try:
+                parent = parent[key]
+            except (KeyError, IndexError, TypeError):
+                # A repair of an error deeper down moved it
+                return False
+
+        try:
+            value = parent[path[-1]] if path else instance
+        except (KeyError, IndexError, TypeError):
+            return False
+
+        keyword, node = error.validator, error.schema
+        if isinstance(value, dict) and keyword in ("additionalProperties", "maxProperties", "required"):
+            return self._repair_object(value, keyword, node)
+
+        if isinstance(value, list) and keyword in ("maxItems", "uniqueItems"):
+            return self._repair_array(value, keyword, node)
+
+        if keyword in ("maxLength", "const", "enum") and path:
+            repaired = self._repair_value(value, keyword, node)
+            if repaired is not None:
+                parent[path[-1]] = repaired[0]
+                return True
+
+        if not path:
+            return False
+
+        generator = self._get_generator(node, keyword in NON_EMPTY_KEYWORDS)
+        if generator is None:
+            return False
+
+        parent[path[-1]] = generator()
+        return True
+
+    def _repair_object(self, value: dict, keyword: str, node: dict) -> bool:
+        properties = node.get(generator_constants.PROPERTIES) or {}
+        required = node.get(generator_constants.REQUIRED) or []
+
+        if keyword == "additionalProperties":
+            patterns = [re.compile(pattern) for pattern in node.get("patternProperties") or {}]
+            extra = [name for name in value if name not in properties and not any(pattern.search(name) for pattern in patterns)]
+            for name in extra:
+                del value[name]
+            return bool(extra)
+
+        if keyword == "maxProperties":
+            optional = [name for name in value if name not in required]
+            for name in optional[:max(len(value) - node[keyword], 0)]:
+                del value[name]
+            return bool(optional)
+
+        missing = [name for name in required if name not in value and name in properties]
+        for name in missing:
+            generator = self._get_generator(properties[name], True)
+            if generator is None:
+                return False
+            value[name] = generator()
+
+        return bool(missing)
+
+    def _repair_array(self, value: list, keyword: str, node: dict) -> bool:
+        if keyword == "maxItems":
+            del value[node[keyword]:]
+            return True
+
+        seen = set()
+        unique = []
+        for item in value:
+            item_key = json.dumps(item, sort_keys=True)
+            if item_key not in seen:
+                seen.add(item_key)
+                unique.append(item)
+
+        if len(unique) < node.get(generator_constants.MIN_ITEMS, 0):
+            return False
+
+        value[:] = unique
+        return True
+
+    def _repair_value(self, value: Any, keyword: str, node: dict) -> tuple | None:
+        """
+        The repaired value in a tuple, None when the value is not repaired here.
+        """
+
+        if keyword == "const":
+            return (node[keyword],)
+
+        if keyword == "enum":
+            return (node[keyword][0],) if node[keyword] else None
+
+        if isinstance(value, str):
+            return (value[:node[keyword]],)
+
+        return None
+
+    def _get_generator(self, node: dict, non_empty: bool) -> Callable[[], Any] | None:
+        """
+        The generator of a subschema, compiled once with its refs resolved against the
+        schema's definitions.  None for subschemas it can not be compiled for.
+        """
+
+        key = (id(node), non_empty)
+        if key not in self._generators:
+            try:
+                self._generators[key] = (node, self._compile(node, non_empty))
+            except Exception as err:
+                logger.debug("subschema can not be generated from: %s", err)
+                self._generators[key] = (node, None)
+
+        return self._generators[key][1]
+
+    def _compile(self, node: dict, non_empty: bool) -> Callable[[], Any]:
+        if not isinstance(node, dict):
+            raise ValueError(f"not a schema object: {node}")
+
+        if self._compiler is None:
+            self._compiler = SchemaCompiler(rng=self.rng)
+
+        return self._compiler.compile(self._resolve_refs(node), non_empty)
+
+    def _get_definitions(self) -> dict:
+        """
+        The schema's definitions with their refs resolved, in a copy so the schema is left
+        as it is.  Resolved once and shared by every subschema compiled, so the compiler
+        compiles each definition once too.
+        """
+
+        if self._definitions is None:
+            definitions = copy.deepcopy({tag: self.schema[tag] for tag in generator_constants.DEFINITION_TAGS if tag in self.schema})
+            RefResolver(SchemaIndex(definitions)).resolve(shared=True)
+            self._definitions = definitions
+
+        return self._definitions
+
+    def _resolve_refs(self, node: dict) -> dict:
+        """
+        A copy of the node with its refs into the definitions replaced by the resolved
+        definitions (see _get_definitions).  Other refs are left as they are.
+        """
+
+        import jsonpointer
+
+        definitions = self._get_definitions()
+
+        # The node is held under a key, so a ref at its root is replaced like any other
+        holder = {"node": copy.deepcopy(node)}
+        stack = [(holder, "node")]
+        while stack:
+            container, key = stack.pop()
+            value = container[key]
+
+            if isinstance(value, dict):
+                pointer = value.get(generator_constants.DOL_REF)
+                if isinstance(pointer, str) and pointer.startswith(generator_constants.POUND) and get_ref_owner(get_pointer_keypath(pointer)) != ROOT:
+                    try:
+                        container[key] = jsonpointer.JsonPointer(get_pointer_keypath(pointer, True)).resolve(definitions)
+                        continue
+                    except jsonpointer.JsonPointerException:
+                        pass
+
+                stack.extend((value, child_key) for child_key in value)
+
+            elif isinstance(value, list):
+                stack.extend((value, index) for index in range(len(value)))
+
+        return holder["node"]
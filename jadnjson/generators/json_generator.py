@@ -1,195 +1,195 @@
+from __future__ import annotations
+
+import copy
+import itertools
 import json
-from random import randrange
+import logging
+from random import Random
+import threading
 import time
-from benedict import benedict
-from jsf import JSF
-import jsonpointer
+from typing import TYPE_CHECKING
 
 from jadnjson.constants import generator_constants
-from jadnjson.utils.general_utils import get_keys, get_last_occurance, remove_chars
+from jadnjson.generators.schema_compiler import CompiledGenerator, schema_can_be_filled
+from jadnjson.utils.cleanup_options import CleanupOptions
+from jadnjson.utils.gen_budget import GenerationBudget
+from jadnjson.utils.gen_stats import GenStats
+from jadnjson.utils.general_utils import get_last_occurance, is_benedict, loads_json
+from jadnjson.utils.pattern_cache import install_jsf_patterns, sanitize_pattern
+from jadnjson.utils.ref_resolver import RefResolver, get_pointer_keypath
+from jadnjson.utils.schema_cache import SchemaCache, get_schema_hash
+from jadnjson.utils.schema_index import SchemaIndex, get_parent_keypath
+from jadnjson.utils.schema_visitor import SchemaVisitor
+from jadnjson.utils.size_planner import SizePlanner
+from jadnjson.utils.seeding import derive_seed, seeded_generation
 from jadnjson.validators.schema_validator import validate_schema
 
+# JSF (and Faker through it) and benedict are slow to import, they are imported by the 
+# functions that use them so validation and cleanup alone do not load them
+if TYPE_CHECKING:
+    from benedict import benedict
+    from jsf import JSF
+    from jsf.schema_types.base import BaseSchema
+    
+    from jadnjson.generators.instance_repair import InstanceRepairer
+
+
+logger = logging.getLogger(__name__)
+
+# Cleaned schemas shared by every call in the process, see prepare_schema
+SCHEMA_CACHE = SchemaCache()
+
+
+class DataGenerationError(Exception):
+    """
+    Raised when the data generator cannot fill the document or one of its required properties. 
+    """
+
+
+class GenerationCancelled(DataGenerationError):
+    """
+    Raised when generation is stopped through its cancel event. 
+    """
+
 
 class ReturnVal: 
     def __init__(self): 
         self.gen_data = None
         self.err_msg = None
+        self.timings = {}
+        self.stats = GenStats()
+        self.budget_hit = None
 
 
-def find_choices(bene_schema: benedict) -> dict:
+def find_choices(schema: SchemaIndex) -> dict:
+    """
+    Looks up the choices (objects that allow only one property, the JADN Choice type) 
+    from the index.  Returns each choice's schema keypath with its option names.  Resolved 
+    refs share the choice's dict, so each choice is listed once.  To prune the choices of 
+    a document generated elsewhere, see cleanup_choices. 
+    """
+    
     choices_found_dict = {}
-    keys = bene_schema.keypaths(True)
+    seen = set()
     
-    for k in keys:
+    for k in schema.keys_ending_with(generator_constants.MAX_PROPERTIES, indexes=True):
+        choice_key = get_parent_keypath(k)
+        value = schema.get(choice_key)
         
-        value = bene_schema.get(k)
-        if isinstance(value, benedict):
-            
-            min_prop_val = value.get('minProperties')
-            max_prop_val = value.get('maxProperties')
-            
-            if min_prop_val == 1 and max_prop_val == 1:
-                
-                if "definitions/" in k:
-                   k = k.replace("definitions/", "")
-                   
-                if "properties/" in k:
-                   k = k.replace("properties/", "")
-                        
-                choices_found_dict[k] = value
-            elif max_prop_val == 1:
-                
-                if "definitions/" in k:
-                   k = k.replace("definitions/", "")
-                   
-                if "properties/" in k:
-                   k = k.replace("properties/", "")
-                        
-                choices_found_dict[k] = value                
-                
+        if is_choice(value) and id(value) not in seen:
+            seen.add(id(value))
+            choices_found_dict[choice_key] = list(value[generator_constants.PROPERTIES])
             
     return choices_found_dict
 
 
-def find_fix_encoding(key: str, schema: benedict) -> benedict:
+def is_choice(node: dict) -> bool:
     """
-    Some JADN specific encoding does not get converted to a JSON Schema equivalent during JSON Schema translation. 
-    This logic attempts to map JADN encoding to JSON Schema valid encoding.  Eventually this needs to be fixed 
-    in the JADN to JSON Schema Translation logic.  
+    True for an object that allows only one of its properties, and has more than one. 
     """
-        
-    encoding_type = schema.get(key)
-    if isinstance(encoding_type, benedict):       
-        return schema
-        
-    elif generator_constants.CONTENT_ENCODING in key:
-        new_encoding_type = None
-        
-        match encoding_type:
-            case generator_constants.BASE_64_URL:
-                new_encoding_type = generator_constants.BASE_64
-            case generator_constants.BASE64:
-                new_encoding_type = generator_constants.BASE_64
-            case generator_constants.BASE_64:
-                new_encoding_type = generator_constants.BASE_64                    
-            case generator_constants.BASE32:
-                new_encoding_type = generator_constants.BASE_32
-            case generator_constants.BASE16:
-                new_encoding_type = generator_constants.BASE_16
-            case _:
-                print(f"encoding type not known {encoding_type}")
-                
-        if new_encoding_type:
-            schema[key] = new_encoding_type
     
-    return schema
+    options = node.get(generator_constants.PROPERTIES) if isinstance(node, dict) else None
+    return isinstance(options, dict) and len(options) > 1 and node.get(generator_constants.MAX_PROPERTIES) == 1
 
 
-def is_recursion_found(data: benedict, key: str, pointer: str) -> bool:  
+def split_choice(choice: dict) -> dict:
     """
-    Attempts to detect recursion within inner ref data.  The logic looks at parent keys,
-    child keys and child ref keys.  More detection maybe needed, or renaming...
+    Replaces the options of a choice with an anyOf of single property objects, updating 
+    the dict in place.  JSF then generates exactly one option for the choice. 
     """
-        
-    recursion_found = False        
-        
-    key = remove_chars(key, "/", 1)  
-    pointer = remove_chars(pointer, "/", 1)             
-    pointer_name = get_last_occurance(pointer, '/', True)
-    pointer_data = data.get(pointer) 
-    
-    if pointer_data == None:
-        print('pointer_data == None')
-    elif not isinstance(pointer_data, benedict):
-        print('not isinstance(pointer_data, benedict)')        
-    else:
-        pointer_keys = pointer_data.keypaths(indexes=True)
-        inner_refs = [i for i in pointer_keys if generator_constants.DOL_REF in i]
-        
-        parent_keys = key.split('/')
-        parent_keys = list(map(str.lower, parent_keys))
-
-        # Must be more than one, because the pointer resolve could contian the pointer name    
-        if parent_keys.count(pointer_name) > 1:
-            recursion_found = True
-            
-        elif pointer_keys.count(pointer_name) >= 1:
-            recursion_found = True        
-            
-        elif inner_refs:
-            
-            for inner_ref in inner_refs:
-                inner_pointer_path = pointer_data.get(inner_ref)
-                innner_pointer_name = get_last_occurance(inner_pointer_path, '/', True)
-                if innner_pointer_name in parent_keys:
-                    recursion_found = True
-                    break        
-        
-    return recursion_found
+    
+    options = choice.pop(generator_constants.PROPERTIES)
+    for key in [generator_constants.MIN_PROPERTIES, generator_constants.MAX_PROPERTIES, generator_constants.REQUIRED]:
+        choice.pop(key, None)
+    
+    choice[generator_constants.ANY_OF] = [
+        {
+            generator_constants.TYPE: generator_constants.OBJECT,
+            generator_constants.ADDITIONAL_PROPS: False,
+            generator_constants.PROPERTIES: {option_key: option},
+            generator_constants.REQUIRED: [option_key]
+        }
+        for option_key, option in options.items()
+    ]
+    
+    return choice
 
 
-def update_inner_refs(schema: dict | benedict) -> benedict:
+def find_fix_encoding(node: dict, parent: dict | list, context: dict) -> dict:
     """
-    Searches the json schema for inner $refs and updates them with their actual values. 
-    Attempts to detect recursion in refs.  If recursion is found, then that item is removed
-    from the JSON Schema used for data generation.  Otherwise the data generation hits an endless loop.  
+    Some JADN specific encoding does not get converted to a JSON Schema equivalent during JSON Schema translation. 
+    This logic attempts to map JADN encoding to JSON Schema valid encoding.  Eventually this needs to be fixed 
+    in the JADN to JSON Schema Translation logic.  
     """
-    
-    keys_list = schema.keypaths(indexes=True)
-    ref_key_list = [i for i in keys_list if i.endswith(generator_constants.DOL_REF)]
-    for ref_key in ref_key_list:
-        pointer = schema.get(ref_key)
         
-        if isinstance(pointer, str) and generator_constants.POUND in pointer:
-            pointer_updated = pointer.replace(generator_constants.POUND, "")                
-            ref_key_updated = ref_key.replace(generator_constants.SLASH_DOL_REF, "")
-            
-            recursion_found = is_recursion_found(schema, ref_key_updated, pointer_updated)
+    encoding_type = node.get(generator_constants.CONTENT_ENCODING)
+    if isinstance(encoding_type, dict):       
+        return node
+        
+    new_encoding_type = None
+    
+    match encoding_type:
+        case generator_constants.BASE_64_URL:
+            new_encoding_type = generator_constants.BASE_64
+        case generator_constants.BASE64:
+            new_encoding_type = generator_constants.BASE_64
+        case generator_constants.BASE_64:
+            new_encoding_type = generator_constants.BASE_64                    
+        case generator_constants.BASE32:
+            new_encoding_type = generator_constants.BASE_32
+        case generator_constants.BASE16:
+            new_encoding_type = generator_constants.BASE_16
+        case _:
+            logger.warning("encoding type not known %s", encoding_type)
             
-            if recursion_found:
-                print("warning: recursion found, removing for generation: ", ref_key_updated)
-                del schema[ref_key_updated]                 
-            else:
-                resolved_data = jsonpointer.JsonPointer(pointer_updated).resolve(schema)
-                schema[ref_key_updated] = resolved_data
-                                     
-    return schema
+    if new_encoding_type and new_encoding_type != encoding_type:
+        node[generator_constants.CONTENT_ENCODING] = new_encoding_type
+        context["stats"].count("encodings_fixed")
+    
+    return node
 
 
-def limit_max_items(key: str, schema: benedict, max_items: int = 3, max_length: int = 25) -> benedict:
+def update_inner_refs(
+    schema: dict | benedict | SchemaIndex, 
+    stats: GenStats = None, 
+    shared: bool = False, 
+    recursion_depth: int = generator_constants.GEN_RECURSION_DEPTH
+) -> dict:
     """
-    Searches for type Array and then, adds a limit (default 3) to help 
-    reduce the amount of mock data generated.  If nothing is provided then
-    the data generated has no limit and takes awhile to generate data. 
+    Searches the json schema for inner $refs and updates them with their actual values. 
+    Recursion is found from the definition reference graph.  The refs that close a cycle are 
+    removed from the JSON Schema used for data generation.  Otherwise the data generation hits an endless loop.  
+    With a recursion_depth, recursive definitions are unrolled that many levels deep first, 
+    see RefResolver.unroll_recursive_refs.  
+    With shared, each ref is replaced by the definition's own dict instead of a copy of it. 
     """
+    
+    index = get_schema_index(schema)
+    
+    resolver = RefResolver(index)
+    recursions_unrolled = resolver.unroll_recursive_refs(recursion_depth)
+    if recursions_unrolled:
+        logger.info("recursion found, unrolling %s refs to depth %s", recursions_unrolled, recursion_depth)
         
-    if key.endswith(generator_constants.MAX_ITEMS):          
-        max_val = schema.get(key)      
-        if max_val > max_items:
-            schema[key] = max_items
-            print(f"{key} maxItems updated, {max_val} => {max_items}")
-            
-    if key.endswith(generator_constants.MAX_LENGTH):          
-        max_val = schema.get(key)
-        if max_val > max_length:
-            schema[key] = max_length
-            print(f"{key} maxLength updated, {max_val} => {max_length}")            
-    
-    if key.endswith(generator_constants.MIN_ITEMS):        
-        min_val = schema.get(key)
-        if min_val > max_items:
-            schema[key] = max_items
-            print(f"{key} minItems updated, was {max_val} => {max_items}")
-            
-    if key.endswith(generator_constants.MIN_LENGTH):        
-        min_val = schema.get(key)
-        if min_val > max_length:
-            schema[key] = max_length
-            print(f"{key} minLength updated, was {max_val} => {max_length}")         
+    resolver.resolve(shared)
     
-    return schema
+    if resolver.recursive_refs:
+        recursive_ref_sites = [ref_site for ref_site, _ in resolver.recursive_refs]
+        logger.warning("recursion found, removing for generation: %s", recursive_ref_sites)
+        
+    if resolver.unresolved_refs:
+        logger.warning("refs not resolved: %s", resolver.unresolved_refs)
+        
+    if stats:
+        stats.count("refs_resolved", resolver.resolved_refs)
+        stats.count("recursions_removed", len(resolver.recursive_refs))
+        stats.count("recursions_unrolled", recursions_unrolled)
+        stats.count("refs_unresolved", len(resolver.unresolved_refs))
+                                     
+    return index.schema
+
 
-def add_required_root_items(schema: benedict) -> benedict:
+def add_required_root_items(schema: dict) -> dict:
     """
     Adds a required item to root if one does not exist.  Otherwise the 
     data generator may return nothing. 
@@ -202,18 +202,15 @@ def add_required_root_items(schema: benedict) -> benedict:
         reqs = []
         
         if properties:
-            prop_list = properties.keypaths(indexes=False)
-            
-            for prop in prop_list:
-                if "/" not in prop:
-                    reqs.append(prop)         
+            for prop in sorted(properties):
+                reqs.append(prop)         
             
             required = schema.get(generator_constants.REQUIRED)
             if not required:
                 schema[generator_constants.REQUIRED] = reqs
                 
         elif definitions:
-            defi = definitions.keypaths(indexes=False)[0]
+            defi = sorted(definitions)[0]
             reqs.append(defi)              
             
             required = schema.get(generator_constants.REQUIRED)
@@ -224,7 +221,7 @@ def add_required_root_items(schema: benedict) -> benedict:
     return schema
 
 
-def fix_root_ref(schema: benedict) -> benedict:
+def fix_root_ref(schema: dict) -> dict:
     """
     Some JSON Schemas contain a single root level $ref, no properties and definitions.
     The data generator has trouble with these, so to be consistant, this function
@@ -241,9 +238,8 @@ def fix_root_ref(schema: benedict) -> benedict:
      
     if root_ref and not properties:
         root_name = get_last_occurance(root_ref, "/", False)
-        new_props_path = generator_constants.PROPERTIES + "/" + root_name + "/" + generator_constants.DOL_REF
         
-        schema[new_props_path] = root_ref
+        schema[generator_constants.PROPERTIES] = {root_name: {generator_constants.DOL_REF: root_ref}}
         del schema[generator_constants.DOL_REF]
 
         if not type:
@@ -254,258 +250,672 @@ def fix_root_ref(schema: benedict) -> benedict:
     
     return schema
 
-def replace_reserved_words(key: str, schema: benedict) -> benedict:
+def replace_reserved_words(schema: SchemaIndex, stats: GenStats = None) -> SchemaIndex:
     """
-    Looks for revered words and sets them to an alternate name.
+    Looks for definitions named with a reserved word and sets them to an alternate name. 
+    Only the definition names and the $refs pointing at them are renamed, property names, 
+    required fields and data (default, const, examples...) are what documents hold and 
+    are left as they are. 
     """
-
-    # Update Keys
-    removed_keys = []
-    if get_last_occurance(key, '/') == generator_constants.RES_WORD_TYPE:
-        copy_obj = schema.get(key)
-        copy_obj_key = key.replace(generator_constants.RES_WORD_TYPE, generator_constants.RES_WORD_TYPE_ALT)
-        schema[copy_obj_key] = copy_obj
-        del schema[key]
-        removed_keys.append(key)
-        print(f"{key} Reserved word replaced {generator_constants.RES_WORD_TYPE} => {generator_constants.RES_WORD_TYPE_ALT}")
-        
+    
+    renamed = {}
+    for tag in generator_constants.DEFINITION_TAGS:
+        key = f"{tag}/{generator_constants.RES_WORD_TYPE}"
+        if key in schema:
+            schema.rename(key, generator_constants.RES_WORD_TYPE_ALT)
+            renamed[tag] = key
+            logger.debug("%s Reserved word replaced %s => %s", key, generator_constants.RES_WORD_TYPE, generator_constants.RES_WORD_TYPE_ALT)
+    
+    if stats:
+        stats.count("reserved_words_replaced", len(renamed))
         
-    if removed_keys:
-        # Update ref pointers
-        ref_key_list = get_keys(schema, False, generator_constants.DOL_REF)
-        for ref_key in ref_key_list:
-            pointer = schema.get(ref_key)
-            if isinstance(pointer, str):
-                
-                pointer_filtered = pointer.replace(generator_constants.POUND_SLASH, "") 
-                if pointer_filtered in removed_keys:
-                    
-                    pointer_updated = pointer.replace(generator_constants.RES_WORD_TYPE, generator_constants.RES_WORD_TYPE_ALT) 
-                    schema[ref_key] = pointer_updated
-                    print("Reserved word found in ref and updated", pointer)  
-                
+    if renamed:
+        # Update ref pointers to the renamed definitions, and to keys within them
+        for site, pointer in schema.ref_sites():
+            pointer_parts = pointer.split("/")
+            if len(pointer_parts) > 2 and pointer_parts[0] == "#" and pointer_parts[1] in renamed \
+                    and pointer_parts[2] == generator_constants.RES_WORD_TYPE:
                 
-        # Update required fields
-        req_key_list = get_keys(schema, False, generator_constants.REQUIRED)
-        for req_key in req_key_list:
-            req_array = schema.get(req_key)
-            if generator_constants.RES_WORD_TYPE in req_array:
-                
-                for index, req in enumerate(req_array):
-                    if req == generator_constants.RES_WORD_TYPE:
-                        req_array[index] = generator_constants.RES_WORD_TYPE_ALT
-                        schema[req_key] = req_array           
-                        print("Reserved word found in required fields and updated", req_key)         
+                pointer_parts[2] = generator_constants.RES_WORD_TYPE_ALT
+                schema[site + generator_constants.SLASH_DOL_REF if site else generator_constants.DOL_REF] = "/".join(pointer_parts)
+                logger.debug("Reserved word found in ref and updated %s", pointer)
         
     return schema
 
 
-def update_unique_items(key: str, schema: benedict, set_to: bool = False) -> benedict:
+def update_unique_items(node: dict, parent: dict | list, context: dict) -> dict:
     """
-    Looks for uniqueItems and updates them to the set_to bool provided. 
+    Looks for uniqueItems and updates them to context unique_items (default False). 
     """
     
-    if key.endswith("uniqueItems"):
-        schema[key] = set_to
+    node[generator_constants.UNIQUE_ITEMS] = context.get("unique_items", False)
     
-    return schema
+    return node
 
 
-def adjust_patterns(key: str, schema: benedict) -> benedict:
+def adjust_patterns(node: dict, parent: dict | list, context: dict) -> dict:
     """
     Looks for regex patterns that don't jive with the data generator and 
     updates them with comparable patterns that the data generator is happy with. 
+    Patterns no string can be generated from are removed.
     """
     
-    if key.endswith("pattern"):  
-       
-        pattern = schema.get(key)    
+    pattern = node.get(generator_constants.PATTERN)
+    if not isinstance(pattern, str):
+        return node
+    
+    if pattern == generator_constants.DATETIME_TIMEZONE_ORIG:
+        revised = generator_constants.DATETIME_TIMEZONE_REVISED
+    elif pattern == generator_constants.NCNAME_ORIG:
+        revised = generator_constants.NCNAME_REVISED
+    else:
+        revised = sanitize_pattern(pattern)
         
-        if pattern == generator_constants.DATETIME_TIMEZONE_ORIG:
-            schema[key] = generator_constants.DATETIME_TIMEZONE_REVISED
-            print(f"{key} pattern revised {pattern} => {generator_constants.DATETIME_TIMEZONE_REVISED}")
-            
-        if pattern == generator_constants.NCNAME_ORIG:
-            schema[key] = generator_constants.NCNAME_REVISED
-            print(f"{key} pattern revised {pattern} => {generator_constants.NCNAME_REVISED}")
+    if revised is None:
+        del node[generator_constants.PATTERN]
+        logger.warning("pattern removed, no strings can be generated for %s", pattern)
+        context["stats"].count("patterns_removed")
+    elif revised != pattern:
+        node[generator_constants.PATTERN] = revised
+        logger.debug("pattern revised %s => %s", pattern, revised)
+        context["stats"].count("patterns_revised")
     
-    return schema
+    return node
+
 
-def determine_max_items(num_of_keys: int) -> int:
-    max = 1
+# Node transforms run by cleanup_schema_dict in a single walk of the schema, 
+# register new fixups here
+CLEANUP_VISITOR = SchemaVisitor()
+CLEANUP_VISITOR.register(generator_constants.UNIQUE_ITEMS, update_unique_items)
+CLEANUP_VISITOR.register(generator_constants.PATTERN, adjust_patterns)
+CLEANUP_VISITOR.register(generator_constants.CONTENT_ENCODING, find_fix_encoding)
+
+
+def get_schema_index(schema: dict | benedict | SchemaIndex) -> SchemaIndex:
+    """
+    Returns the keypath index for the schema, building it if one was not provided.
+    """
     
-    if num_of_keys < 100000 and num_of_keys >= 50000:
-        max = 2
-    elif num_of_keys < 50000 and num_of_keys >= 10000:
-        max = 4
-    elif num_of_keys < 10000 and num_of_keys >= 5000:
-        max = 6
-    elif num_of_keys < 5000 and num_of_keys >= 1000:
-        max = 8
-    elif num_of_keys < 1000 and num_of_keys >= 500:
-        max = 10
-    elif num_of_keys < 500:
-        max = 12
+    if isinstance(schema, SchemaIndex):
+        return schema
     
-    return max
+    if is_benedict(schema):
+        schema = schema.dict()
+        
+    return SchemaIndex(schema)
 
 
-def cleanup_schema_for_data_gen(schema: str | dict | benedict) -> {benedict, dict}:
+def cleanup_schema_for_data_gen(
+    schema: str | dict | benedict, 
+    stats: GenStats = None, 
+    options: CleanupOptions = None
+) -> {benedict, dict}:
     """
     Searches the json schema for inner refs ($ref) and replaces them with their actual values.  
     In other words, resovling the references.  Attempts to detect recursion and skips it if found.
     """
     
+    from benedict import benedict
+    
+    schema, choices_found_dict = cleanup_schema_dict(schema, stats, options)
+    
+    return benedict(schema, keypath_separator="/"), choices_found_dict
+
+
+def cleanup_schema_dict(
+    schema: str | dict | benedict, 
+    stats: GenStats = None, 
+    options: CleanupOptions = None
+) -> tuple[dict, dict]:
+    """
+    Same as cleanup_schema_for_data_gen, returning the cleaned up schema as a plain dict.  
+    Wrapping it in a benedict turns the dicts held in lists (anyOf, items...) into benedicts 
+    in place, which JSF is much slower to parse, so data generation uses this one. 
+    Stage timings and counters are added to stats when given.  options set how refs, 
+    recursion and the document size are handled, see CleanupOptions (its defaults when None). 
+    """
+    
+    stats = stats or GenStats()
+    options = options or CleanupOptions()
+    
     if isinstance(schema, str):
-        schema = json.loads(schema)
+        schema = loads_json(schema)
     
-    if isinstance(schema, dict):
-        schema = benedict(schema, keypath_separator="/")
+    if is_benedict(schema):
+        schema = schema.dict()
     
-    fix_root_ref(schema)
-    add_required_root_items(schema)
-    update_inner_refs(schema)
+    with stats.time("root_fixing"):
+        fix_root_ref(schema)
+        add_required_root_items(schema)
     
-    keys_list = schema.keypaths(indexes=False)
-    num_of_keys = len(keys_list)
-    print(f'Number of keys to process: {str(num_of_keys)}')
-    proposed_max_items = determine_max_items(num_of_keys)
-    print(f'Proposed max items: {str(proposed_max_items)}')
+    with stats.time("ref_resolution"):
+        index = SchemaIndex(schema)
+        replace_reserved_words(index, stats)
+        update_inner_refs(index, stats, options.shared_refs, options.recursion_depth)
     
-    for key in keys_list:
-        print(f'{key}')
+    with stats.time("cleanup"):
+        num_of_keys = index.num_of_keys()
+        logger.info("Number of keys to process: %s", num_of_keys)
+        stats.count("keys", num_of_keys)
         
-        if key.startswith("definitions/"):
-                
-            val = schema.get(key) 
-            if key is None:
-                print(f"NoneType found!!! {key}")
-            elif val is None:
-                print(f"NoneType val found!!! {key}")
-            else:
-                try:
-                    # TODO: Temporarily disbled, poor peroforance with larger schemas 
-                    # replace_reserved_words(key, schema)
-                    update_unique_items(key, schema)
-                    adjust_patterns(key, schema)
-                    limit_max_items(key, schema, max_items=proposed_max_items)
-                    find_fix_encoding(key, schema)
-                except Exception as err:
-                    print(f'key: {key}')                
-                    print("error cleaning up json schema: ", err)
-                    raise Exception(err)
-
-    # TODO: Temporarily disbled, poor peroforance with larger schemas 
-    # choices_found_dict = find_choices(resolved_schema)
-    choices_found_dict = None
+        try:
+            nodes_visited = CLEANUP_VISITOR.visit(schema, {"stats": stats})
+            stats.count("nodes_visited", nodes_visited)
+        except Exception as err:
+            logger.error("error cleaning up json schema: %s", err)
+            raise Exception(err)
+
+        choices_found_dict = find_choices(index)
+        for choice_key in choices_found_dict:
+            split_choice(index[choice_key])
+        stats.count("choices_split", len(choices_found_dict))
+    
+    # Planned once the choices are split, a choice then generates one option
+    with stats.time("planning"):
+        planner = SizePlanner(options.target_size, options.target_seconds)
+        planner.plan(schema)
+        stats.count("constraints_clamped", planner.apply())
     
     return schema, choices_found_dict
     
 
-def gen_fake_data(schema: dict) -> json:
-    print("gen_fake_data")
+def is_empty(value) -> bool:
+    """
+    True for values that carry no data (None, {}, [] and "").  0 and False are data. 
+    """
+    
+    return value is None or (isinstance(value, (dict, list, str)) and len(value) == 0)
+
+
+def can_be_filled(model: BaseSchema | dict) -> bool:
+    """
+    False for JSF models, or the schema nodes of a compiled generator, that can only 
+    generate an empty value, such as an object without any properties or an array 
+    limited to 0 items. 
+    """
+    
+    if isinstance(model, dict):
+        return schema_can_be_filled(model)
+    
+    from jsf.schema_types import Array, Object
+    
+    if isinstance(model, Object):
+        return bool(model.properties or model.patternProperties)
+    
+    if isinstance(model, Array):
+        return model.items is not None and model.maxItems != 0
+    
+    return True
+
+
+def force_non_empty(model: BaseSchema) -> BaseSchema:
+    """
+    Returns a copy of a JSF model that does not generate an empty value: it is never
+    nulled, objects keep every property as if required and arrays get at least one item. 
+    """
+    
+    from jsf.schema_types import Array, Object
+    
+    update = {"allow_none_optionals": 0.0, "is_nullable": False}
+    
+    if isinstance(model, Object) and model.properties:
+        update[generator_constants.REQUIRED] = [prop.name for prop in model.properties]
+    elif isinstance(model, Array) and model.items is not None and model.maxItems != 0:
+        update[generator_constants.MIN_ITEMS] = max(model.minItems or 0, 1)
+        
+    return model.model_copy(update=update)
+
+
+def get_root_properties(faker: JSF | CompiledGenerator) -> dict:
+    """
+    The top-level properties of a generator's schema by name, JSF models or schema nodes.
+    """
+    
+    if isinstance(faker, CompiledGenerator):
+        return faker.root_properties()
+    
+    from jsf.schema_types import Object
+    
+    if isinstance(faker.root, Object):
+        return {prop.name: prop for prop in faker.root.properties}
+    
+    return {}
+
+
+def generate_non_empty(faker: JSF | CompiledGenerator, model: BaseSchema | dict = None):
+    """
+    Generates the whole document, or one of its root properties, forced to be non-empty. 
+    """
+    
+    if isinstance(faker, CompiledGenerator):
+        return faker.generate_non_empty(model)
+    
+    context = {**faker.context, "use_defaults": False, "use_examples": False}
+    return force_non_empty(faker.root if model is None else model).generate(context)
+
+
+def build_faker(
+    schema: dict, 
+    seed: int = None, 
+    compiled: bool = False, 
+    budget: GenerationBudget = None
+) -> JSF | CompiledGenerator:
+    """
+    Builds the JSF generator for a cleaned up schema.  JSF makes some random choices while 
+    parsing the schema, with a seed those come from derive_seed(seed, "model").  With 
+    compiled the schema is compiled into generator closures instead (see SchemaCompiler), 
+    which generate each document faster and fall back to JSF for the keywords they lack. 
+    A budget limits each document, JSF can not stop part way so it implies compiled.  
+    Either way patterns are generated from the generators prepared once per process, see 
+    install_jsf_patterns. 
+    """
+    
+    install_jsf_patterns()
+    
+    with seeded_generation(get_child_seed(seed, "model")):
+        if compiled or budget is not None:
+            return CompiledGenerator(schema, budget=budget)
+        
+        from jsf import JSF
+        
+        return JSF(schema)
+
+
+def get_child_seed(seed: int, *parts) -> int:
+    """
+    Seed of one document or stage, derived from seed.  None when generation is not seeded. 
+    """
+    
+    return derive_seed(seed, *parts) if seed is not None else None
+
+
+def gen_fake_data(
+    schema: dict, 
+    faker: JSF | CompiledGenerator = None, 
+    max_attempts: int = generator_constants.GEN_MAX_ATTEMPTS, 
+    seed: int = None, 
+    stats: GenStats = None, 
+    cancel: threading.Event = None, 
+    repairer: InstanceRepairer = None
+) -> json:
+    """
+    Generates one document.  Pass a generator built from the schema by build_faker to 
+    reuse it across calls, otherwise a JSF one is built here. 
+    
+    Required top-level properties that come back empty are regenerated on their own, 
+    forced to be non-empty, until max_attempts is used up (an empty document is 
+    regenerated the same way).  A DataGenerationError is raised if the document or a 
+    required property is still empty after that. 
+    
+    With a seed the document is reproducible, the same schema and seed always give the 
+    same document.  The generation time, documents and regenerations are added to stats. 
+    Once cancel is set GenerationCancelled is raised before the next attempt starts.  A 
+    generator with a budget also stops part way through the attempt, it finishes with 
+    minimal values as soon as cancel is set (see GenerationBudget). 
+    
+    A generator with a budget (see build_faker) starts it for the document.  Once the 
+    budget is hit the document is returned as it is, with minimal values where the budget 
+    ran out and without further attempts, and budget_hits is counted in stats. 
     
-    fake_data_json = {}
+    With a repairer (see build_repairer) the document is validated against the schema and 
+    the subtrees that fail are repaired in place, documents that hit the budget are not. 
+    """
+    logger.debug("gen_fake_data")
+    
+    stats = stats or GenStats()
+    budget = None
     
-    i = 0
-    lim = 6
-    while i < lim:
-          
-        try:   
-            faker = JSF(schema)                
+    try:   
+        if faker is None:
+            with stats.time("model"):
+                faker = build_faker(schema, seed)
+        
+        budget = getattr(faker, "budget", None)
+        if budget is not None:
+            budget.start(cancel)
+        
+        with stats.time("generation"), seeded_generation(seed, getattr(faker, "rng", None)):
+            check_cancelled(cancel)
             fake_data_json = faker.generate()
+            check_cancelled(cancel)
+            attempts = 1
+        
+            root_props = get_root_properties(faker) if isinstance(fake_data_json, dict) else {}
+        
+            # Only fill the properties the schema requires, others may be left out 
+            required = [
+                name for name in schema.get(generator_constants.REQUIRED, []) 
+                if name in root_props and can_be_filled(root_props[name])
+            ]
+            empty_props = [name for name in required if is_empty(fake_data_json.get(name))]
+        
+            while (empty_props or is_empty(fake_data_json)) and attempts < max_attempts and not is_budget_hit(budget):
+                check_cancelled(cancel)
+                attempts += 1
             
-            if not fake_data_json:
-                i += 1
-                time_to_wait = i * .3
-                time.sleep(time_to_wait)                
-                print("no data, trying again....")
-            else:
-                for value in fake_data_json.values():
-                    if not value:
-                        i += 1
-                        time_to_wait = i * .3
-                        time.sleep(time_to_wait)
-                    else:
-                        print("data generated")
-                        i = lim
-                        break                        
+                if empty_props:
+                    logger.debug("empty required properties, regenerating: %s", empty_props)
+                    stats.count("regenerations", len(empty_props))
+                    for name in empty_props:
+                        fake_data_json[name] = generate_non_empty(faker, root_props[name])
+                else:
+                    logger.debug("no data, trying again....")
+                    stats.count("regenerations")
+                    fake_data_json = generate_non_empty(faker)
                 
-        except Exception as err:
-            i = lim
-            print('--------------------')
-            print('schema:')
-            print(schema)
-            print('--------------------')
-            print("error attempting to gen fake data: ", err)
-            raise Exception(err)
+                empty_props = [name for name in required if is_empty(fake_data_json.get(name))]
+            
+            check_cancelled(cancel)
+        
+        if repairer is not None and not is_budget_hit(budget):
+            with stats.time("repair"):
+                repairer.repair(fake_data_json, stats, get_child_seed(seed, "repair"))
+            
+    except GenerationCancelled:
+        raise
+    except Exception as err:
+        logger.debug("schema: %s", schema)
+        logger.error("error attempting to gen fake data: %s", err)
+        raise Exception(err)
+    
+    if is_budget_hit(budget):
+        logger.debug("generation budget hit: %s", budget.hit)
+        stats.count("budget_hits")
+        
+    elif empty_props:
+        raise DataGenerationError(f"unable to generate required properties {empty_props} after {attempts} attempts")
+    
+    elif is_empty(fake_data_json):
+        raise DataGenerationError(f"no data generated after {attempts} attempts")
             
+    stats.count("documents")
+    logger.debug("data generated")
     return fake_data_json 
 
 
-def cleanup_choices(fake_data: dict, choices_found: dict) -> benedict:
-    fake_data_bene = benedict(fake_data, keypath_separator="/")
-    fake_data_bene.clean(strings=True, collections=True)
+def is_budget_hit(budget: GenerationBudget = None) -> bool:
+    return budget is not None and budget.hit is not None
+
+
+def check_cancelled(cancel: threading.Event = None):
+    """
+    Raises GenerationCancelled once cancel is set. 
+    """
+    
+    if cancel is not None and cancel.is_set():
+        raise GenerationCancelled("data generation cancelled")
+
+
+def cleanup_choices(fake_data: dict, schema: dict | SchemaIndex, seed: int = None) -> dict:
+    """
+    Keeps one randomly selected option in each choice of a document, for data that was not 
+    generated from a cleaned up schema (which already has one option per choice).  The 
+    document is walked along the schema it was generated from, following its $refs, 
+    properties, items and subschemas, and each object whose schema is a choice (see 
+    is_choice) keeps one of its options.  The selection uses its own Random, seeded with 
+    seed when given.  The document is updated in place. 
+    """
+    
+    index = get_schema_index(schema)
+    rng = Random(seed)
+    
+    stack = [(fake_data, index.schema)]
+    seen = set()
+    while stack:
+        data, node = stack.pop()
+        if not isinstance(node, dict) or (id(data), id(node)) in seen:
+            continue
+        seen.add((id(data), id(node)))
+        
+        pointer = node.get(generator_constants.DOL_REF)
+        if isinstance(pointer, str) and pointer.startswith(generator_constants.POUND):
+            stack.append((data, index.get(get_pointer_keypath(pointer))))
             
-    if choices_found and len(choices_found) > 0:
+        for key in (generator_constants.ALL_OF, generator_constants.ANY_OF, generator_constants.ONE_OF):
+            if isinstance(node.get(key), list):
+                stack.extend((data, subschema) for subschema in node[key])
         
-        for choice_key in choices_found.copy():
+        if isinstance(data, dict):
+            options = node.get(generator_constants.PROPERTIES)
+            options = options if isinstance(options, dict) else {}
             
-            # Get choice data
-            choice_data = fake_data_bene.get(choice_key)
-
-            if choice_data != None:
-                
-                if len(choice_data) > 0:
-                    # Remove 'extra' choices, to fix a jsf data gen bug
-                
-                    # Get a randomized choice option
-                    choice_list = list(choice_data.keys())
-                    randomized_key = randrange(0, len(choice_list))
-                    select_choice_opt_key = choice_list[randomized_key]
-                    select_choice_opt_data = choice_data.get(select_choice_opt_key)
-                    
-                    # Clear out all choice options
-                    for choice_opt_key in choice_data.copy():
-                        del choice_data[choice_opt_key]
-                        
-                    # Reset choice with 1st choice option only
-                    choice_data[select_choice_opt_key] = select_choice_opt_data
+            if is_choice(node) and len(data) > 1 and all(key in options for key in data):
+                # Reset choice with a randomized option only
+                choice_list = list(data.keys())
+                select_choice_opt_key = choice_list[rng.randrange(0, len(choice_list))]
+                select_choice_opt_data = data[select_choice_opt_key]
+                data.clear()
+                data[select_choice_opt_key] = select_choice_opt_data
+            
+            stack.extend((value, options[key]) for key, value in data.items() if key in options)
+            
+        elif isinstance(data, list):
+            stack.extend((item, node.get(generator_constants.ITEMS)) for item in data)
                     
-    return fake_data_bene
+    return fake_data
     
 
-def gen_data_from_schema(schema: dict) -> ReturnVal:
+def build_repairer(schema: dict, cache: SchemaCache = SCHEMA_CACHE) -> InstanceRepairer:
     """
-    Generates fake data based on the schema
+    The InstanceRepairer that validates documents against the schema, with a validator 
+    built once per schema for the draft its $schema names.  It is cached next to the 
+    prepared schema, by the schema's hash (see get_prepared_key), so repeat calls reuse its 
+    validator, resolved definitions and compiled subschemas.  Built before the schema is 
+    prepared, which changes it in place with cache=None (a new repairer every call then). 
     """
     
-    ret_val = ReturnVal()
+    from jadnjson.generators.instance_repair import InstanceRepairer
+    
+    if cache is None:
+        return InstanceRepairer(schema)
+    
+    cache_key = get_schema_hash(schema, repairer=True)
+    repairer = cache.get(cache_key)
+    if repairer is None:
+        repairer = InstanceRepairer(schema)
+        cache.put(cache_key, repairer)
+    
+    return repairer
 
+
+def get_prepared_key(schema: dict, options: CleanupOptions = None) -> str:
+    """
+    The cache key prepare_schema stores the prepared schema under, the schema hashed with 
+    the options. 
+    """
+    
+    return get_schema_hash(schema, **(options or CleanupOptions()).to_dict())
+
+
+def prepare_schema(
+    schema: dict, 
+    cache: SchemaCache = SCHEMA_CACHE, 
+    stats: GenStats = None, 
+    options: CleanupOptions = None, 
+    cache_key: str = None
+) -> tuple[dict, dict]:
+    """
+    Validates and cleans up the schema for data generation.  The result is cached by a 
+    canonical hash of the schema, so repeat calls with the same schema skip both steps.
+    Pass cache=None to always run them (the schema is then updated in place).  options 
+    are the cleanup's, see CleanupOptions.  cache_key is the hash when the caller already 
+    has it, see get_prepared_key. 
+    """
+    
+    stats = stats or GenStats()
+    
+    if cache is not None:
+        cache_key = cache_key or get_prepared_key(schema, options)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            stats.count("schema_cache_hits")
+            return cached
+        
+        # Cleanup updates the schema in place, keep the caller's copy as it was 
+        schema = copy.deepcopy(schema)
+    
     # Validate before changes
-    try:
+    with stats.time("validation"):
         validate_schema(schema)
+    
+    prepared = cleanup_schema_dict(schema, stats, options)
+    
+    if cache is not None:
+        cache.put(cache_key, prepared)
+    
+    return prepared
+    
+
+def gen_data_from_schema(
+    schema: dict, 
+    cache: SchemaCache = SCHEMA_CACHE, 
+    max_attempts: int = generator_constants.GEN_MAX_ATTEMPTS, 
+    seed: int = None, 
+    stats: GenStats = None, 
+    compiled: bool = False, 
+    options: CleanupOptions = None, 
+    budget: GenerationBudget = None, 
+    validate: bool = False
+) -> ReturnVal:
+    """
+    Generates fake data based on the schema.  With a seed the same schema always gives the 
+    same document, the first document a batch or stream with that seed gives.  
+    stats reports the time spent in each stage and what the cleanup changed. 
+    
+    The other arguments are shared by every generator (batch, stream, parallel and async): 
+    compiled generates the documents from the compiled schema, see build_faker.  options 
+    set how the schema is cleaned up, see CleanupOptions.  budget limits the time, depth 
+    and nodes spent on each document, budget_hit names the limit it hit (see 
+    GenerationBudget).  validate checks each document against the schema and repairs the 
+    subtrees that fail, see build_repairer. 
+    """
+    
+    ret_val = ReturnVal()
+    ret_val.stats = stats or ret_val.stats
+
+    try:
+        repairer = build_repairer(schema, cache) if validate else None
+        schema_dict, choices_found = prepare_schema(schema, cache, ret_val.stats, options)
     except Exception as err:
         ret_val.err_msg = err
         return ret_val
     
-    schema_bene, choices_found = cleanup_schema_for_data_gen(schema)
+    try:
+        with ret_val.stats.time("model"):
+            faker = build_faker(schema_dict, seed, compiled, budget)
+        fake_data = gen_fake_data(schema_dict, faker, max_attempts, get_child_seed(seed, 0), ret_val.stats, repairer=repairer)
+    except DataGenerationError as err:
+        ret_val.err_msg = err
+        return ret_val
+
+    ret_val.gen_data = fake_data
+    ret_val.budget_hit = faker.budget.hit if budget is not None else None
+
+    return ret_val
+
+
+def gen_data_batch_from_schema(
+    schema: dict, 
+    count: int, 
+    cache: SchemaCache = SCHEMA_CACHE, 
+    lazy: bool = False, 
+    max_attempts: int = generator_constants.GEN_MAX_ATTEMPTS, 
+    seed: int = None, 
+    stats: GenStats = None, 
+    compiled: bool = False, 
+    options: CleanupOptions = None, 
+    budget: GenerationBudget = None, 
+    validate: bool = False
+) -> ReturnVal:
+    """
+    Generates count documents from the schema.  The schema is cleaned up and the 
+    generator is built once, then reused for every document.  gen_data is a list, or an 
+    iterator when lazy is True (which raises DataGenerationError as it is consumed).  
+    timings reports the setup and generation seconds, stats the time spent in each stage.  
+    With a seed the same schema always gives the same documents.  The documents that hit 
+    the budget are counted as budget_hits in stats.  compiled, options, budget and 
+    validate are those of gen_data_from_schema. 
+    """
     
-    # schema_json = schema_bene.to_json()
-    # schema_dict = json.loads(schema_json)
+    ret_val = ReturnVal()
+    ret_val.stats = stats or ret_val.stats
     
-    # write_filename = "test_schema.json"
-    # write_to_file(schema_dict, write_filename)
-    # print(f"schema writtern to file {write_filename}")
+    setup_start = time.perf_counter()
+    try:
+        repairer = build_repairer(schema, cache) if validate else None
+        schema_dict, choices_found = prepare_schema(schema, cache, ret_val.stats, options)
+        with ret_val.stats.time("model"):
+            faker = build_faker(schema_dict, seed, compiled, budget)
+    except Exception as err:
+        ret_val.err_msg = err
+        return ret_val
     
-    # try:
-    #     validate_schema(schema_dict)
-    # except Exception as err:
-    #     ret_val.err_msg = err
-    #     return ret_val
+    ret_val.timings = {"setup": time.perf_counter() - setup_start, "generation": 0.0, "count": 0}
     
-    fake_data = gen_fake_data(schema)
-    # fake_data = cleanup_choices(fake_data, choices_found)
-    ret_val.gen_data = fake_data
-
-    return ret_val
\ No newline at end of file
+    fake_data_iter = iter_fake_data(schema_dict, faker, count, ret_val.timings, max_attempts, seed, ret_val.stats, repairer)
+    if lazy:
+        ret_val.gen_data = fake_data_iter
+    else:
+        try:
+            ret_val.gen_data = list(fake_data_iter)
+        except DataGenerationError as err:
+            ret_val.err_msg = err
+    
+    return ret_val
+
+
+def iter_fake_data(
+    schema: dict, 
+    faker: JSF | CompiledGenerator, 
+    count: int = None, 
+    timings: dict = None, 
+    max_attempts: int = generator_constants.GEN_MAX_ATTEMPTS, 
+    seed: int = None, 
+    stats: GenStats = None, 
+    repairer: InstanceRepairer = None
+):
+    """
+    Yields count documents (without end when count is None) from a prebuilt generator, 
+    adding the time spent to timings.  With a seed each document is seeded from the seed 
+    and its index.  A repairer repairs each document, see gen_fake_data. 
+    """
+    
+    for doc_index in itertools.count() if count is None else range(count):
+        gen_start = time.perf_counter()
+        fake_data = gen_fake_data(schema, faker, max_attempts, get_child_seed(seed, doc_index), stats, repairer=repairer)
+        
+        if timings is not None:
+            timings["generation"] += time.perf_counter() - gen_start
+            timings["count"] += 1
+            
+        yield fake_data
+
+
+def gen_data_stream_from_schema(
+    schema: dict, 
+    count: int = None, 
+    cache: SchemaCache = SCHEMA_CACHE, 
+    max_attempts: int = generator_constants.GEN_MAX_ATTEMPTS, 
+    seed: int = None, 
+    stats: GenStats = None, 
+    compiled: bool = False, 
+    options: CleanupOptions = None, 
+    budget: GenerationBudget = None, 
+    validate: bool = False
+):
+    """
+    Yields documents one at a time, count of them or without end when count is None.  
+    Nothing is kept once a document is yielded, pair with write_ndjson to write 
+    datasets of any size with flat memory.  Raises on an invalid schema or a 
+    DataGenerationError.  Stage timings and counters are added to stats when given.  
+    compiled, options, budget and validate are those of gen_data_from_schema. 
+    """
+    
+    stats = stats or GenStats()
+    
+    repairer = build_repairer(schema, cache) if validate else None
+    schema_dict, choices_found = prepare_schema(schema, cache, stats, options)
+    with stats.time("model"):
+        faker = build_faker(schema_dict, seed, compiled, budget)
+    
+    yield from iter_fake_data(schema_dict, faker, count, max_attempts=max_attempts, seed=seed, stats=stats, repairer=repairer)
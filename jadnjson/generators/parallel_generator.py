@@ -0,0 +1,121 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from jadnjson.constants import generator_constants
+from jadnjson.generators.instance_repair import InstanceRepairer
+from jadnjson.generators.json_generator import (
+    SCHEMA_CACHE, build_faker, build_repairer, gen_fake_data, get_child_seed, prepare_schema
+)
+from jadnjson.utils.cleanup_options import CleanupOptions
+from jadnjson.utils.gen_budget import GenerationBudget
+from jadnjson.utils.schema_cache import SchemaCache
+
+
+# Set once per worker process by _init_worker
+_worker_schema = None
+_worker_faker = None
+_worker_seed = None
+_worker_max_attempts = None
+_worker_repairer = None
+
+
+def _init_worker(
+    schema: dict,
+    seed: int,
+    max_attempts: int,
+    compiled: bool = False,
+    budget: GenerationBudget = None,
+    repairer: InstanceRepairer = None
+):
+    """
+    Receives the cleaned schema once per worker and builds the worker's generator.
+    """
+
+    global _worker_schema, _worker_faker, _worker_seed, _worker_max_attempts, _worker_repairer
+
+    _worker_schema = schema
+    _worker_seed = seed
+    _worker_max_attempts = max_attempts
+    _worker_repairer = repairer
+
+    _worker_faker = build_faker(schema, seed, compiled, budget)
+
+
+def _gen_chunk(start: int, count: int) -> list:
+    """
+    Generates the documents start to start + count.  Each document is seeded from the master
+    seed and its own index, so the output does not depend on how the count was split.
+    """
+
+    fake_data_list = []
+    for doc_index in range(start, start + count):
+        doc_seed = get_child_seed(_worker_seed, doc_index)
+        fake_data_list.append(gen_fake_data(
+            _worker_schema, _worker_faker, _worker_max_attempts, doc_seed, repairer=_worker_repairer
+        ))
+
+    return fake_data_list
+
+
+def gen_data_parallel_from_schema(
+    schema: dict,
+    count: int,
+    workers: int = None,
+    seed: int = None,
+    ordered: bool = True,
+    chunk_size: int = None,
+    cache: SchemaCache = SCHEMA_CACHE,
+    max_attempts: int = generator_constants.GEN_MAX_ATTEMPTS,
+    compiled: bool = False,
+    options: CleanupOptions = None,
+    budget: GenerationBudget = None,
+    validate: bool = False
+):
+    """
+    Generates count documents on a pool of worker processes and yields them as they come back.
+
+    The schema is cleaned up once, here, and shipped to each worker once when it starts.
+    The count is split into chunks spread over the workers.  With a seed, each document is
+    seeded from the seed and its index, so the combined output is the same for any number of
+    workers or chunk size.  ordered=False yields chunks as soon as they finish.  With compiled
+    each worker compiles the schema (see build_faker), closures are not shipped between processes.
+    With validate each worker builds the validator once.  compiled, options, budget and validate
+    are those of gen_data_from_schema.
+    """
+
+    repairer = build_repairer(schema, cache) if validate else None
+    schema_dict, choices_found = prepare_schema(schema, cache, None, options)
+
+    workers = workers or os.cpu_count() or 1
+    chunk_size = chunk_size or max(1, min(100, -(-count // (workers * 4))))
+    chunks = [(start, min(chunk_size, count - start)) for start in range(0, count, chunk_size)]
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(schema_dict, seed, max_attempts, compiled, budget, repairer)
+    ) as executor:
+
+        # A bounded number of chunks is in flight, so results never pile up in memory
+        max_in_flight = workers * 2
+        pending = {}
+        next_chunk = 0
+        next_to_yield = 0
+        finished = {}
+
+        while next_chunk < len(chunks) or pending:
+            while next_chunk < len(chunks) and len(pending) + len(finished) < max_in_flight:
+                pending[executor.submit(_gen_chunk, *chunks[next_chunk])] = next_chunk
+                next_chunk += 1
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                finished[pending.pop(future)] = future.result()
+
+            if ordered:
+                while next_to_yield in finished:
+                    yield from finished.pop(next_to_yield)
+                    next_to_yield += 1
+            else:
+                for chunk_index in sorted(finished):
+                    yield from finished.pop(chunk_index)
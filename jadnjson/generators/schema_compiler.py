@@ -0,0 +1,471 @@
+import copy
+import logging
+import math
+import random
+import re
+from typing import Any, Callable
+
+from jadnjson.constants import generator_constants
+from jadnjson.utils.gen_budget import GenerationBudget
+from jadnjson.utils.pattern_cache import get_pattern_generator
+
+
+logger = logging.getLogger(__name__)
+
+# JSF defaults for keywords a schema leaves out
+DEFAULT_MAX_ITEMS = 5
+DEFAULT_MAX_LENGTH = 50
+DEFAULT_MAXIMUM = 9999
+
+# Formats that need JSF's generation state, or the node's pattern
+_STATE_FORMATS = ["relative-json-pointer"]
+_PATTERN_FORMATS = ["regex"]
+
+_FALLBACK_KEYWORDS = frozenset(generator_constants.COMPILER_FALLBACK_KEYWORDS)
+
+
+def get_types(node: dict) -> tuple[list, bool]:
+    """
+    Returns the types a node can generate, without null, and whether it may be null.
+    """
+
+    node_type = node.get(generator_constants.TYPE)
+    if not isinstance(node_type, list):
+        return [node_type], False
+
+    types = list(dict.fromkeys(item for item in node_type if item != "null"))
+    nullable = "null" in node_type and len(set(node_type)) >= 2
+    return types or ["null"], nullable
+
+
+def schema_can_be_filled(node: dict) -> bool:
+    """
+    False for schema nodes that can only generate an empty value, such as an object
+    without any properties or an array limited to 0 items.
+    """
+
+    if not isinstance(node, dict) or generator_constants.ENUM in node or generator_constants.CONST in node:
+        return True
+
+    node_type = node.get(generator_constants.TYPE)
+    if node_type == generator_constants.OBJECT:
+        return any(node.get(key) for key in (
+            generator_constants.PROPERTIES, "patternProperties", generator_constants.ANY_OF,
+            generator_constants.ONE_OF, generator_constants.ALL_OF
+        ))
+
+    if node_type == generator_constants.ARRAY:
+        return generator_constants.ITEMS in node and node.get(generator_constants.MAX_ITEMS) != 0
+
+    return True
+
+
+def get_number_steps(node: dict) -> tuple[float, int, int]:
+    """
+    Returns the step of a number node and the lowest and highest multiples of it the node
+    allows, JSF draws the multiple between them.
+    """
+
+    step = node.get("multipleOf") or 1
+    minimum = node.get("minimum", 0)
+    maximum = node.get("maximum", DEFAULT_MAXIMUM)
+
+    # Draft 4 uses booleans, later drafts the bound itself
+    exclusive_min = node.get("exclusiveMinimum")
+    if exclusive_min is True:
+        minimum += step
+    elif not isinstance(exclusive_min, bool) and exclusive_min is not None:
+        minimum = exclusive_min + step
+
+    exclusive_max = node.get("exclusiveMaximum")
+    if exclusive_max is True:
+        maximum -= step
+    elif not isinstance(exclusive_max, bool) and exclusive_max is not None:
+        maximum = exclusive_max - step
+
+    return step, math.ceil(float(minimum) / step), math.floor(float(maximum) / step)
+
+
+class SchemaCompiler:
+    """
+    Compiles the nodes of a cleaned up schema (see cleanup_schema_dict) into generator
+    closures.  Each closure takes no arguments and returns one value, with the node's
+    constraints, enums and formats bound when it is compiled, so generating an instance
+    is plain function calls instead of JSF walking its models again.
+
+    Resolved refs share dicts and each one is compiled once, so every definition gets one
+    closure used wherever it is referenced.  Patterns use the generators prepared once per
+    process (see get_pattern_generator).  Nodes holding keywords the compiler does not
+    handle (COMPILER_FALLBACK_KEYWORDS, unique items, tuples, patterns rstr can not
+    generate from...) are generated by a JSF model built for that node.  The closures draw
+    from rng, bound when they are compiled, in the same order as JSF.  JSF, its faker and
+    the fallback models draw from the seeded_generation block's Random, so generating in
+    seeded_generation(seed, rng) gives the documents JSF gives for the seed.  Except for
+    nodes with a list of types: JSF picks one of them once, when it parses the schema, the
+    closures pick one for each value.
+
+    With a budget every node is counted against it.  Once a limit is hit optional
+    properties and array items over minItems are no longer generated, and the nodes left
+    get minimal values (see compile_minimal).  Until then the budget draws nothing, the
+    documents are the ones generated without it.
+    """
+
+    def __init__(self, allow_none_optionals: float = 0.5, budget: GenerationBudget = None, rng: random.Random = None):
+        self.allow_none_optionals = allow_none_optionals
+        self.budget = budget
+        self.rng = rng or random.Random()
+        self.compiled = {}
+        self.compiling = set()
+        self.minimal = {}
+        self.fallbacks = 0
+
+    def compile(self, node: dict, non_empty: bool = False) -> Callable[[], Any]:
+        """
+        Returns the generator of a schema node.  With non_empty the node is never null, an
+        object keeps every property as if required and an array gets at least one item
+        (its subschemas are generated as usual).
+        """
+
+        key = (id(node), non_empty)
+        if key in self.compiled:
+            return self.compiled[key][1]
+
+        if id(node) in self.compiling:
+            raise ValueError("cannot compile a recursive schema, resolve its refs first")
+
+        self.compiling.add(id(node))
+        try:
+            generator = self._compile_node(node, non_empty)
+        finally:
+            self.compiling.discard(id(node))
+
+        if self.budget is not None:
+            generator = self._budgeted(node, generator)
+
+        # The node is kept with its generator so its id is not reused while compiling
+        self.compiled[key] = (node, generator)
+        return generator
+
+    def compile_minimal(self, node: dict) -> Callable[[], Any] | None:
+        """
+        Returns the generator of a node's minimal value: never null where null is allowed,
+        the first enum value or option, only the required properties, minItems items,
+        minLength characters of free text and the lowest number.  Formats and patterns are
+        generated as usual.  None for nodes generated with JSF.
+        """
+
+        key = id(node)
+        if key in self.minimal:
+            return self.minimal[key][1]
+
+        if key in self.compiling:
+            raise ValueError("cannot compile a recursive schema, resolve its refs first")
+
+        self.compiling.add(key)
+        try:
+            generator = self._compile_minimal(node)
+        finally:
+            self.compiling.discard(key)
+
+        self.minimal[key] = (node, generator)
+        return generator
+
+    def _compile_node(self, node: dict, non_empty: bool) -> Callable[[], Any]:
+        if not isinstance(node, dict) or not _FALLBACK_KEYWORDS.isdisjoint(node):
+            return self._fallback(node)
+
+        types, nullable = get_types(node)
+
+        if generator_constants.CONST in node or generator_constants.ENUM in node:
+            generators = [self._compile_enum(node)]
+        else:
+            generators = [self._compile_type(node, node_type, non_empty) for node_type in types]
+
+        if None in generators:
+            return self._fallback(node)
+
+        if len(generators) == 1:
+            generator = generators[0]
+        else:
+            choice = self.rng.choice
+            generator = lambda: choice(generators)()
+
+        if nullable and not non_empty:
+            return self._nullable(generator)
+
+        return generator
+
+    def _compile_type(self, node: dict, node_type: str, non_empty: bool) -> Callable[[], Any]:
+        """
+        Dispatches on the type in the same order JSF does, None when the node is not supported.
+        """
+
+        if node_type == generator_constants.OBJECT:
+            if generator_constants.PROPERTIES in node:
+                return self._compile_object(node, non_empty)
+            for key in (generator_constants.ANY_OF, generator_constants.ONE_OF):
+                if key in node:
+                    return self._compile_choice(node[key])
+            return dict
+
+        if node_type == generator_constants.ARRAY:
+            return self._compile_array(node, non_empty)
+
+        if node_type == "string":
+            return self._compile_string(node)
+
+        if node_type in ("integer", "number"):
+            return self._compile_number(node, node_type == "integer")
+
+        if node_type == "boolean":
+            choice = self.rng.choice
+            return lambda: choice((True, False))
+
+        if node_type == "null":
+            return lambda: None
+
+        if node_type is None:
+            for key in (generator_constants.ANY_OF, generator_constants.ONE_OF):
+                if key in node:
+                    return self._compile_choice(node[key])
+
+        return None
+
+    def _compile_object(self, node: dict, non_empty: bool) -> Callable[[], dict]:
+        required = set(node.get(generator_constants.REQUIRED) or [])
+        properties = [
+            (name, self.compile(prop), non_empty or name in required)
+            for name, prop in node[generator_constants.PROPERTIES].items()
+        ]
+        keep_above = self.allow_none_optionals
+        budget = self.budget
+        uniform = self.rng.uniform
+
+        if budget is not None:
+            def gen_object() -> dict:
+                return {
+                    name: generator() for name, generator, always in properties
+                    if always or (budget.hit is None and uniform(0, 1) > keep_above)
+                }
+
+            return gen_object
+
+        def gen_object() -> dict:
+            return {
+                name: generator() for name, generator, always in properties
+                if always or uniform(0, 1) > keep_above
+            }
+
+        return gen_object
+
+    def _compile_array(self, node: dict, non_empty: bool) -> Callable[[], list]:
+        items = node.get(generator_constants.ITEMS)
+        if not isinstance(items, dict) or node.get(generator_constants.UNIQUE_ITEMS):
+            return None
+
+        item_generator = self.compile(items)
+        min_items = int(node.get(generator_constants.MIN_ITEMS, 0))
+        max_items = int(node.get(generator_constants.MAX_ITEMS, DEFAULT_MAX_ITEMS))
+        if non_empty and max_items != 0:
+            min_items = max(min_items, 1)
+
+        budget = self.budget
+        randint = self.rng.randint
+        if budget is not None:
+            def gen_array() -> list:
+                return [
+                    item_generator() for index in range(randint(min_items, max_items))
+                    if index < min_items or budget.hit is None
+                ]
+
+            return gen_array
+
+        def gen_array() -> list:
+            return [item_generator() for _ in range(randint(min_items, max_items))]
+
+        return gen_array
+
+    def _compile_string(self, node: dict) -> Callable[[], str]:
+        string_format = node.get(generator_constants.FORMAT)
+        pattern = node.get(generator_constants.PATTERN)
+
+        if string_format in _STATE_FORMATS:
+            return None
+
+        if string_format in generator_constants.JSF_FORMATS and string_format not in _PATTERN_FORMATS:
+            from jsf.schema_types import string as jsf_string
+
+            # Looked up on each call, install_thread_random replaces the date formats
+            format_map = jsf_string.format_map
+            generator = lambda: format_map[string_format]()
+        elif pattern is not None:
+            try:
+                generate_pattern = get_pattern_generator(pattern)
+            except (re.error, ValueError):
+                return None
+            rng = self.rng
+            generator = lambda: generate_pattern(rng)
+        else:
+            min_length = node.get(generator_constants.MIN_LENGTH, 0)
+            max_length = node.get(generator_constants.MAX_LENGTH, DEFAULT_MAX_LENGTH)
+            from jsf.schema_types.string_utils.content_type.text__plain import random_fixed_length_sentence
+
+            generator = lambda: random_fixed_length_sentence(min_length, max_length)
+
+        encoding = node.get(generator_constants.CONTENT_ENCODING)
+        if encoding is None:
+            return generator
+
+        from jsf.schema_types.string_utils import content_encoding
+
+        encoder = content_encoding.Encoder[content_encoding.ContentEncoding(encoding)]
+        return lambda: encoder(generator())
+
+    def _compile_number(self, node: dict, integer: bool) -> Callable[[], int | float]:
+        step, low, high = get_number_steps(node)
+        randint = self.rng.randint
+
+        if integer:
+            return lambda: int(step * randint(low, high))
+
+        return lambda: float(step * randint(low, high))
+
+    def _compile_enum(self, node: dict) -> Callable[[], Any]:
+        if generator_constants.CONST in node:
+            values = [node[generator_constants.CONST]]
+        else:
+            values = list(node[generator_constants.ENUM] or [])
+
+        if not values:
+            return None
+
+        choice = self.rng.choice
+        return lambda: choice(values)
+
+    def _compile_choice(self, schemas: list) -> Callable[[], Any]:
+        if not schemas:
+            return None
+
+        generators = [self.compile(schema) for schema in schemas]
+        choice = self.rng.choice
+        return lambda: choice(generators)()
+
+    def _nullable(self, generator: Callable[[], Any]) -> Callable[[], Any]:
+        null_below = self.allow_none_optionals
+        uniform = self.rng.uniform
+        return lambda: None if uniform(0, 1) < null_below else generator()
+
+    def _budgeted(self, node: dict, generator: Callable[[], Any]) -> Callable[[], Any]:
+        budget = self.budget
+
+        def gen_budgeted() -> Any:
+            if not budget.enter():
+                return (self.compile_minimal(node) or generator)()
+            try:
+                return generator()
+            finally:
+                budget.leave()
+
+        return gen_budgeted
+
+    def _compile_minimal(self, node: dict) -> Callable[[], Any] | None:
+        if not isinstance(node, dict) or not _FALLBACK_KEYWORDS.isdisjoint(node):
+            return None
+
+        if generator_constants.CONST in node or generator_constants.ENUM in node:
+            values = [node[generator_constants.CONST]] if generator_constants.CONST in node else node[generator_constants.ENUM]
+            if not values:
+                return None
+            value = values[0]
+            return lambda: value
+
+        node_type = get_types(node)[0][0]
+        if node_type in (generator_constants.OBJECT, None):
+            if node_type == generator_constants.OBJECT and generator_constants.PROPERTIES in node:
+                # The required properties, then the first others up to minProperties
+                names = list(node[generator_constants.PROPERTIES])
+                required = [name for name in names if name in (node.get(generator_constants.REQUIRED) or [])]
+                optional = [name for name in names if name not in required]
+                keep = required + optional[:max(0, node.get("minProperties", 0) - len(required))]
+                properties = [(name, self._compile_smallest(node[generator_constants.PROPERTIES][name])) for name in keep]
+                return lambda: {name: generator() for name, generator in properties}
+
+            for key in (generator_constants.ANY_OF, generator_constants.ONE_OF):
+                if node.get(key):
+                    return self._compile_smallest(node[key][0])
+
+            return dict if node_type == generator_constants.OBJECT else None
+
+        if node_type == generator_constants.ARRAY:
+            items = node.get(generator_constants.ITEMS)
+            if not isinstance(items, dict) or node.get(generator_constants.UNIQUE_ITEMS):
+                return None
+            item_generator = self._compile_smallest(items)
+            min_items = int(node.get(generator_constants.MIN_ITEMS, 0))
+            return lambda: [item_generator() for _ in range(min_items)]
+
+        if node_type == "string":
+            if generator_constants.PATTERN in node or node.get(generator_constants.FORMAT) in generator_constants.JSF_FORMATS:
+                return self._compile_string(node)
+
+            # Encoded empty strings are empty too
+            min_length = node.get(generator_constants.MIN_LENGTH, 0)
+            if not min_length:
+                return lambda: ""
+            return self._compile_string(dict(node, maxLength=min_length))
+
+        if node_type in ("integer", "number"):
+            step, low, high = get_number_steps(node)
+            value = int(step * low) if node_type == "integer" else float(step * low)
+            return (lambda: value) if low <= high else None
+
+        if node_type == "boolean":
+            return lambda: False
+
+        if node_type == "null":
+            return lambda: None
+
+        return None
+
+    def _compile_smallest(self, node: dict) -> Callable[[], Any]:
+        return self.compile_minimal(node) or self.compile(node)
+
+    def _fallback(self, node: dict) -> Callable[[], Any]:
+        self.fallbacks += 1
+        from jsf import JSF
+
+        logger.debug("generating with JSF: %s", node)
+        return JSF(node, allow_none_optionals=self.allow_none_optionals).generate
+
+
+class CompiledGenerator:
+    """
+    Document generator compiled from a cleaned up schema, used in place of a JSF generator
+    by gen_fake_data and the generators built on it (see build_faker).  budget is copied,
+    gen_fake_data starts it for each document and seeds rng with the document's seed.
+    Like rng, a generator is used by one thread at a time.
+    """
+
+    def __init__(self, schema: dict, allow_none_optionals: float = 0.5, budget: GenerationBudget = None):
+        self.schema = schema
+        self.budget = copy.copy(budget)
+        self.rng = random.Random()
+        self.compiler = SchemaCompiler(allow_none_optionals, self.budget, self.rng)
+        self.generate = self.compiler.compile(schema)
+        logger.debug("compiled %s schema nodes, %s generated with JSF", len(self.compiler.compiled), self.compiler.fallbacks)
+
+    def root_properties(self) -> dict:
+        """
+        The top-level property schemas, by name.
+        """
+
+        properties = self.schema.get(generator_constants.PROPERTIES)
+        return dict(properties) if isinstance(properties, dict) else {}
+
+    def generate_non_empty(self, node: dict = None) -> Any:
+        """
+        Generates a value of the schema, or one of its nodes, that is not empty where the
+        node allows it (see SchemaCompiler.compile).
+        """
+
+        return self.compiler.compile(self.schema if node is None else node, non_empty=True)()
@@ -0,0 +1,48 @@
+from jadnjson.constants import generator_constants
+
+
+class CleanupOptions:
+    """
+    The options that change what the cleanup (see cleanup_schema_dict) makes of a schema.
+    They are part of the cache key of the prepared schema, see get_prepared_key.
+
+    shared_refs has every ref site hold its definition's own dict, so each definition is in
+    memory, cleaned up and compiled (see build_faker) once however often it is referenced.
+    Choices are then listed once, at their definition's keypath.  The generated documents
+    are the same.
+
+    target_size and target_seconds limit arrays and free text strings so a document comes out
+    at about target_size bytes of JSON, and/or is generated in about target_seconds, see
+    SizePlanner.  Both None leave the schema's own limits.
+
+    recursion_depth unrolls recursive definitions that many levels deep, each ending with its
+    minimal non-recursive alternative, at 0 the refs that make the recursion are removed.
+    The refs to the levels are resolved shared either way, so each level is held once.
+    """
+
+    def __init__(
+        self,
+        shared_refs: bool = False,
+        target_size: int = generator_constants.GEN_TARGET_SIZE,
+        target_seconds: float = None,
+        recursion_depth: int = generator_constants.GEN_RECURSION_DEPTH
+    ):
+        self.shared_refs = shared_refs
+        self.target_size = target_size
+        self.target_seconds = target_seconds
+        self.recursion_depth = recursion_depth
+
+    def to_dict(self) -> dict:
+        return {
+            "shared_refs": self.shared_refs,
+            "target_size": self.target_size,
+            "target_seconds": self.target_seconds,
+            "recursion_depth": self.recursion_depth
+        }
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, CleanupOptions) and self.to_dict() == other.to_dict()
+
+    def __hash__(self) -> int:
+        return hash(tuple(self.to_dict().values()))
+
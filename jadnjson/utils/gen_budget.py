@@ -0,0 +1,62 @@
+import threading
+import time
+
+
+class GenerationBudget:
+    """
+    Limits on generating one document: wall time in seconds, nesting depth of the schema
+    nodes being generated and number of nodes generated.  None leaves a limit off.
+    Once a limit is hit the rest of the document is finished with minimal values, see
+    SchemaCompiler.  hit names the limit that was hit ("seconds", "depth" or "nodes"),
+    None while the document is under all of them.  A cancel event given to start stops
+    the document the same way once it is set, with hit "cancelled".
+
+    The counts are kept on the budget, each generator works on its own copy.
+    """
+
+    def __init__(self, max_seconds: float = None, max_depth: int = None, max_nodes: int = None):
+        self.max_seconds = max_seconds
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.start()
+
+    def start(self, cancel: threading.Event = None):
+        """
+        Resets the counts for a new document.
+        """
+
+        self.cancel = cancel
+        self.hit = None
+        self.nodes = 0
+        self.depth = 0
+        self.deadline = None if self.max_seconds is None else time.perf_counter() + self.max_seconds
+
+    def enter(self) -> bool:
+        """
+        Counts a node about to be generated, False when it goes over a limit (or one was
+        already hit) and the node should get a minimal value instead.  Pair a True with
+        leave once the node is generated.
+        """
+
+        if self.hit is not None:
+            return False
+
+        self.nodes += 1
+        self.depth += 1
+
+        if self.cancel is not None and self.cancel.is_set():
+            self.hit = "cancelled"
+        elif self.max_nodes is not None and self.nodes > self.max_nodes:
+            self.hit = "nodes"
+        elif self.max_depth is not None and self.depth > self.max_depth:
+            self.hit = "depth"
+        elif self.deadline is not None and time.perf_counter() > self.deadline:
+            self.hit = "seconds"
+        else:
+            return True
+
+        self.depth -= 1
+        return False
+
+    def leave(self):
+        self.depth -= 1
@@ -0,0 +1,34 @@
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+
+class GenStats:
+    """
+    Time spent in each stage (validation, root_fixing, ref_resolution, cleanup, planning,
+    model, generation) and counters (refs_resolved, recursions_removed, constraints_clamped...)
+    collected while a schema is cleaned up and data is generated from it.
+    on_stage, when given, is called with the stage name and seconds as each stage ends.
+    """
+
+    def __init__(self, on_stage: Callable[[str, float], None] = None):
+        self.timings = {}
+        self.counters = {}
+        self.on_stage = on_stage
+
+    @contextmanager
+    def time(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            seconds = time.perf_counter() - start
+            self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+            if self.on_stage:
+                self.on_stage(stage, seconds)
+
+    def count(self, counter: str, amount: int = 1):
+        self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def to_dict(self) -> dict:
+        return {"timings": dict(self.timings), "counters": dict(self.counters)}
@@ -1,7 +1,28 @@
+from __future__ import annotations
+
+import io
 import json
+import mmap
 import os
+import sys
+from typing import IO, TYPE_CHECKING, Any, Iterable
+
+try:
+    import orjson
+except ImportError:  # Optional, the json module is used without it
+    orjson = None
+
+if TYPE_CHECKING:
+    from benedict import benedict
+
 
-import benedict
+# Files from this size up are memory-mapped rather than read when parsed with orjson
+MMAP_THRESHOLD = 1 << 20
+
+# Characters (or bytes) of encoded JSON held before they are written
+WRITE_BUFFER_SIZE = 1 << 16
+
+_json_backend = "orjson" if orjson else "json"
 
 
 def get_last_occurance(val: str, split_on: chr, lower: bool = False) -> str: 
@@ -38,6 +59,15 @@ def get_keys(schema: benedict, include_indexes: bool = False, ends_with: str = N
     filtered_key_list = [i for i in keys_list if i.endswith(ends_with)]    
     return filtered_key_list
 
+def is_benedict(value) -> bool:
+    """
+    True for a benedict.  benedict is not imported for the check, when it was never 
+    loaded no value can be one. 
+    """
+    
+    module = sys.modules.get("benedict")
+    return module is not None and isinstance(value, module.benedict)
+
 def remove_chars(val_str: str, to_be_removed: str, num_of_chars: int) -> str:
     """
     Removes characters from a string
@@ -58,18 +88,145 @@ def remove_chars(val_str: str, to_be_removed: str, num_of_chars: int) -> str:
 
 def write_to_file(json_data: dict, filename: str):
     
-    data = None
-    if isinstance(json_data, dict):
-        data = json.dumps(json_data, indent=4)
-    elif isinstance(json_data, benedict):
-        data = json_data.dump()
+    if not isinstance(json_data, dict):
+        raise ValueError("no data found")
+    
+    file_dir = os.path.dirname(os.path.realpath('__file__'))
+    join_file_path = os.path.join(file_dir, '_out/' + filename)
+    abs_file_path = os.path.abspath(os.path.realpath(join_file_path))      
+    
+    write_json(json_data, abs_file_path, indent=4)
+
+
+def get_json_backend() -> str:
+    return _json_backend
+
+
+def set_json_backend(name: str):
+    """
+    Selects the library the JSON I/O functions below use, "orjson" (the default when it 
+    is installed) or "json".  Both give the same JSON. 
+    """
+    
+    global _json_backend
+    
+    if name not in ("json", "orjson"):
+        raise ValueError(f"unknown JSON backend {name}")
+    if name == "orjson" and orjson is None:
+        raise ImportError("orjson is not installed")
+    
+    _json_backend = name
+
+
+def loads_json(data: bytes | str | memoryview) -> Any:
+    if _json_backend == "orjson":
+        return orjson.loads(data)
+    
+    return json.loads(bytes(data) if isinstance(data, memoryview) else data)
+
+
+def dumps_json(json_data: Any, indent: int = None) -> bytes:
+    """
+    Encodes to UTF-8 JSON, compact or indented.  orjson only indents by 2, other indents 
+    and values orjson can not encode (integers over 64 bits...) are encoded by json. 
+    """
+    
+    data = _dumps_orjson(json_data, indent)
+    if data is not None:
+        return data
+    
+    separators = (",", ":") if indent is None else (",", ": ")
+    return json.dumps(json_data, indent=indent, separators=separators, ensure_ascii=False).encode("utf-8")
+
+
+def read_json(path: str) -> Any:
+    """
+    Parses a JSON file from its bytes, without decoding them to text first.  With orjson, 
+    files of MMAP_THRESHOLD bytes or more are memory-mapped instead of read into memory. 
+    """
+    
+    with open(path, "rb") as json_file:
+        if _json_backend != "orjson" or os.fstat(json_file.fileno()).st_size < MMAP_THRESHOLD:
+            return loads_json(json_file.read())
+        
+        with mmap.mmap(json_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+            return orjson.loads(view)
+
+
+def write_json(json_data: Any, destination: str | IO, indent: int = None):
+    """
+    Writes JSON to a file path, or a text or binary file-like object.  The JSON is 
+    encoded by json's iterencode whichever the backend, and written in chunks of about 
+    WRITE_BUFFER_SIZE as it is encoded, so it is never held as one string.  orjson only 
+    encodes whole documents, use dumps_json for it. 
+    """
+    
+    if isinstance(destination, (str, os.PathLike)):
+        with open(destination, "wb") as json_file:
+            return write_json(json_data, json_file, indent)
+    
+    text = isinstance(destination, io.TextIOBase)
+    
+    separators = (",", ":") if indent is None else (",", ": ")
+    encoder = json.JSONEncoder(indent=indent, separators=separators, ensure_ascii=False)
+    _write_chunks(encoder.iterencode(json_data), destination, text)
+
+
+def write_ndjson(json_docs: Iterable[dict], destination: str | IO, buffer_size: int = WRITE_BUFFER_SIZE) -> int:
+    """
+    Appends each document as one line of NDJSON to a file path, or a text or binary 
+    file-like object.  Documents are consumed one at a time and at most about buffer_size 
+    characters are held before being written, so memory stays flat however many documents 
+    are written.
+
+    Returns:
+        return (int): number of documents written
+    """
+    
+    if isinstance(destination, (str, os.PathLike)):
+        with open(destination, "ab") as ndjson_file:
+            return write_ndjson(json_docs, ndjson_file, buffer_size)
+    
+    text = isinstance(destination, io.TextIOBase)
+    lines = (dumps_json(json_doc) + b"\n" for json_doc in json_docs)
+    
+    return _write_chunks((line.decode("utf-8") for line in lines) if text else lines, destination, text, buffer_size)
+
+
+def _dumps_orjson(json_data: Any, indent: int = None) -> bytes | None:
+    """
+    The JSON from orjson, None when it is not the backend or can not encode it. 
+    """
+    
+    if _json_backend != "orjson" or indent not in (None, 2):
+        return None
+    
+    try:
+        return orjson.dumps(json_data, option=orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0))
+    except orjson.JSONEncodeError:
+        return None
+
+
+def _write_chunks(chunks: Iterable[str | bytes], destination: IO, text: bool, buffer_size: int = WRITE_BUFFER_SIZE) -> int:
+    """
+    Writes the chunks, joined into writes of about buffer_size, returns the number of chunks. 
+    """
     
-    if data:
-        file_dir = os.path.dirname(os.path.realpath('__file__'))
-        join_file_path = os.path.join(file_dir, '_out/' + filename)
-        abs_file_path = os.path.abspath(os.path.realpath(join_file_path))      
+    count = 0
+    buffer = []
+    buffered = 0
+    for chunk in chunks:
+        count += 1
+        buffer.append(chunk if text or isinstance(chunk, bytes) else chunk.encode("utf-8"))
+        buffered += len(chunk)
         
-        with open(abs_file_path, "w") as json_file:
-            json_file.write(data)
-    else:
-        raise "no data found"
\ No newline at end of file
+        if buffered >= buffer_size:
+            destination.write(("" if text else b"").join(buffer))
+            buffer.clear()
+            buffered = 0
+            
+    if buffer:
+        destination.write(("" if text else b"").join(buffer))
+    destination.flush()
+    
+    return count
@@ -0,0 +1,322 @@
+import logging
+import re
+import string
+from random import Random
+from typing import Callable
+
+import rstr
+from rstr.rstr_base import ALPHABETS
+from rstr.xeger import STAR_PLUS_LIMIT
+
+from jadnjson.utils.seeding import current_random
+
+try:
+    import re._parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+
+logger = logging.getLogger(__name__)
+
+# Alphabets rstr draws the regex categories from
+CATEGORIES = {
+    "category_digit": ALPHABETS["digits"],
+    "category_not_digit": ALPHABETS["nondigits"],
+    "category_space": ALPHABETS["whitespace"],
+    "category_not_space": ALPHABETS["nonwhitespace"],
+    "category_word": ALPHABETS["word"],
+    "category_not_word": ALPHABETS["nonword"]
+}
+
+# ASCII stand-ins for the unicode property classes python's re does not support
+UNICODE_CLASSES = {
+    "L": "a-zA-Z", "Lu": "A-Z", "Ll": "a-z", "Lt": "A-Z", "Lm": "a-zA-Z", "Lo": "a-zA-Z",
+    "N": "0-9", "Nd": "0-9", "Nl": "0-9", "No": "0-9",
+    "P": re.escape(string.punctuation), "Pc": "_", "Pd": "\\-", "Ps": "(\\[{", "Pe": ")\\]}",
+    "S": re.escape("$+<=>^`|~"), "Sm": re.escape("+<=>|~"), "Sc": "\\$", "Z": " ", "Zs": " "
+}
+
+# Tokens of a pattern: unicode properties, backreferences, escapes, class brackets, named
+# groups, repeats and single characters
+_TOKENS = re.compile(r"\\[pP](?:\{\w+\}|\w)|\\k<\w+>|\\.|\[\^?\]?|\]|\(\?<(?![=!])|\{\d+(?:,\d*)?\}|.", re.DOTALL)
+
+# Process wide, by pattern
+_parsed = {}
+_generators = {}
+_sanitized = {}
+_unsupported = set()
+
+_jsf_installed = False
+
+
+def parse_pattern(pattern: str):
+    """
+    The parsed form of a regex pattern, parsed once per process.
+    """
+
+    parsed = _parsed.get(pattern)
+    if parsed is None:
+        parsed = _parsed[pattern] = sre_parse.parse(pattern)
+
+    return parsed
+
+
+def get_pattern_generator(pattern: str) -> Callable[[Random], str]:
+    """
+    Returns a function generating strings that match a regex pattern, prepared once per
+    process.  It draws from the Random it is given, current_random() when None.  The
+    strings are the ones rstr.xeger(pattern) generates, it makes the same random draws,
+    without parsing the pattern again for each string.  Raises re.error or ValueError for
+    patterns rstr can not generate from.
+    """
+
+    generator = _generators.get(pattern)
+    if generator is None:
+        build = compile_parsed(parse_pattern(pattern))
+
+        def generator(rng: Random = None) -> str:
+            return build({}, rng or current_random())
+
+        _generators[pattern] = generator
+
+    return generator
+
+
+class CachedRstr:
+    """
+    Stands in for the rstr module in JSF, xeger generates from the pattern generators
+    prepared once per process instead of parsing the pattern for every string.  Patterns
+    they do not support are left to rstr.
+    """
+
+    def __getattr__(self, name: str):
+        return getattr(rstr, name)
+
+    @staticmethod
+    def xeger(pattern) -> str:
+        pattern = getattr(pattern, "pattern", pattern)
+        if pattern not in _unsupported:
+            try:
+                return get_pattern_generator(pattern)()
+            except (re.error, ValueError):
+                _unsupported.add(pattern)
+
+        return rstr.xeger(pattern)
+
+
+def install_jsf_patterns():
+    """
+    Has JSF generate the strings of patterns, pattern formats and pattern property names
+    with CachedRstr, once per process.  The strings are the ones rstr gives.
+    """
+
+    global _jsf_installed
+
+    if _jsf_installed:
+        return
+
+    from jsf.schema_types import object as jsf_object
+    from jsf.schema_types import string as jsf_string
+
+    jsf_object.rstr = jsf_string.rstr = CachedRstr()
+    _jsf_installed = True
+
+
+def rewrite_pattern(pattern: str) -> str | None:
+    """
+    Rewrites the ECMA 262 syntax of a pattern that python's re or rstr can not handle:
+    unicode property classes become ASCII classes, named groups and backreferences use
+    python's syntax and repeats with a minimum over rstr's limit are split into repeats
+    under it.  None when a part can not be rewritten.
+    """
+
+    parts = []
+    groups = []
+    atom = None
+    in_class = False
+    for match in _TOKENS.finditer(pattern):
+        token = match.group()
+        start = len(parts)
+
+        if token[:2] in ("\\p", "\\P"):
+            ranges = UNICODE_CLASSES.get(token[2:].strip("{}"))
+            negate = token[1] == "P"
+            if ranges is None or (negate and in_class):
+                return None
+            if not in_class:
+                token, atom = f"[{'^' if negate else ''}{ranges}]", start
+            else:
+                token = ranges
+        elif in_class:
+            in_class = token != "]"
+        elif token.startswith("["):
+            in_class, atom = True, start
+        elif token in ("(", "(?<"):
+            token = "(?P<" if token == "(?<" else token
+            groups.append(start)
+            atom = None
+        elif token == ")":
+            atom = groups.pop() if groups else None
+        elif token.startswith("{") and token.endswith("}"):
+            if atom is not None and int(token[1:-1].partition(",")[0]) > STAR_PLUS_LIMIT:
+                parts[atom:] = [split_repeat("".join(parts[atom:]), token)]
+                atom = None
+                continue
+            atom = None
+        elif token in ("*", "+", "?", "|"):
+            atom = None
+        else:
+            token = f"(?P={token[3:-1]})" if token.startswith("\\k<") else token
+            atom = start
+
+        parts.append(token)
+
+    return "".join(parts)
+
+
+def split_repeat(atom: str, repeat: str) -> str:
+    """
+    Splits a {n}, {n,m} or {n,} repeat of an atom into repeats of at most rstr's limit.
+    """
+
+    low, comma, high = repeat[1:-1].partition(",")
+    low = int(low)
+    high = low if not comma else int(high) if high else None
+
+    parts = [f"(?:{atom}){{{STAR_PLUS_LIMIT}}}"] * (low // STAR_PLUS_LIMIT)
+    if low % STAR_PLUS_LIMIT:
+        parts.append(f"(?:{atom}){{{low % STAR_PLUS_LIMIT}}}")
+
+    if high is None:
+        parts.append(f"(?:{atom})*")
+    elif high > low:
+        parts.append(f"(?:{atom}){{0,{high - low}}}")
+
+    return "".join(parts)
+
+
+def sanitize_pattern(pattern: str) -> str | None:
+    """
+    Returns the pattern, rewritten where needed (see rewrite_pattern), that strings can be
+    generated from, or None when there is none.  Checked once per process.
+    """
+
+    if pattern in _sanitized:
+        return _sanitized[pattern]
+
+    revised = rewrite_pattern(pattern)
+    if revised is not None:
+        try:
+            get_pattern_generator(revised)
+        except (re.error, ValueError) as err:
+            logger.debug("cannot generate strings for pattern %s: %s", revised, err)
+            revised = None
+
+    _sanitized[pattern] = revised
+    return revised
+
+
+def compile_parsed(parsed) -> Callable[[dict, Random], str]:
+    """
+    Compiles a parsed pattern into a function of the groups generated so far and the Random
+    to draw from, runs of literals are joined once.
+    """
+
+    parts = []
+    for opcode, value in parsed:
+        part = _compile_state(opcode.name.lower(), value)
+        if isinstance(part, str) and parts and isinstance(parts[-1], str):
+            parts[-1] += part
+        else:
+            parts.append(part)
+
+    generators = [(lambda groups, rng, text=part: text) if isinstance(part, str) else part for part in parts]
+    if not generators:
+        return lambda groups, rng: ""
+
+    if len(generators) == 1:
+        return generators[0]
+
+    return lambda groups, rng: "".join([generate(groups, rng) for generate in generators])
+
+
+def _compile_state(name: str, value) -> str | Callable[[dict, Random], str]:
+    """
+    A literal string or the generator of one regex node, handled the way rstr does.
+    """
+
+    if name == "literal":
+        return chr(value)
+
+    if name in ("at", "assert_not"):
+        return ""
+
+    if name == "not_literal":
+        alphabet = string.printable.replace(chr(value), "")
+        return lambda groups, rng: rng.choice(alphabet)
+
+    if name == "any":
+        alphabet = [char for char in ALPHABETS["printable"] if char != "\n"]
+        return lambda groups, rng: rng.choice(alphabet)
+
+    if name == "category":
+        alphabet = CATEGORIES[value.name.lower()]
+        return lambda groups, rng: rng.choice(alphabet)
+
+    if name == "in":
+        candidates = _class_candidates(value)
+        return lambda groups, rng: rng.choice(candidates)
+
+    if name == "branch":
+        branches = [compile_parsed(branch) for branch in value[1]]
+        return lambda groups, rng: rng.choice(branches)(groups, rng)
+
+    if name == "subpattern":
+        group, generate = value[0], compile_parsed(value[-1])
+        if not group:
+            return generate
+
+        def gen_group(groups: dict, rng: Random) -> str:
+            groups[group] = generate(groups, rng)
+            return groups[group]
+
+        return gen_group
+
+    if name == "assert":
+        return compile_parsed(value[1])
+
+    if name == "groupref":
+        return lambda groups, rng: groups[value]
+
+    if name in ("max_repeat", "min_repeat"):
+        start, end, inner = value
+        end = max(start, min(end, STAR_PLUS_LIMIT))
+        generate = compile_parsed(inner)
+        return lambda groups, rng: "".join([generate(groups, rng) for _ in range(rng.randint(start, end))])
+
+    raise ValueError(f"unsupported regex node {name}")
+
+
+def _class_candidates(items) -> list:
+    candidates = []
+    for opcode, value in items:
+        name = opcode.name.lower()
+        if name == "literal":
+            candidates.append(chr(value))
+        elif name == "range":
+            candidates.extend(chr(code) for code in range(value[0], value[1] + 1))
+        elif name == "category":
+            candidates.extend(CATEGORIES[value.name.lower()])
+        elif name == "negate":
+            candidates.append(False)
+        else:
+            raise ValueError(f"unsupported regex class item {name}")
+
+    # Negated classes draw from the printable characters left, in rstr's order
+    if candidates and candidates[0] is False:
+        candidates = list(set(string.printable).difference(candidates[1:]))
+
+    if not candidates:
+        raise ValueError("regex class without characters to generate")
+
+    return candidates
@@ -0,0 +1,442 @@
+import bisect
+import copy
+import re
+
+from jadnjson.constants import generator_constants
+from jadnjson.utils.schema_index import SchemaIndex
+
+
+ROOT = ""
+
+
+def get_ref_owner(keypath: str) -> str:
+    """
+    Returns the definition that owns a keypath ("definitions/A/properties/b" => "definitions/A").
+    Anything outside of the definitions belongs to the schema root.
+    """
+
+    for def_tag in generator_constants.DEFINITION_TAGS:
+        if keypath.startswith(def_tag + "/"):
+            def_name = keypath[len(def_tag) + 1:].split("/", 1)[0]
+            return def_tag + "/" + def_name.split("[", 1)[0]
+
+    return ROOT
+
+
+def get_pointer_keypath(pointer: str, json_pointer: bool = False) -> str:
+    """
+    Converts a local $ref pointer ("#/definitions/A") to a keypath ("definitions/A"),
+    or to a plain JSON pointer ("/definitions/A").
+    """
+
+    pointer = pointer.replace(generator_constants.POUND, "", 1)
+    return pointer if json_pointer else pointer.lstrip("/")
+
+
+def get_ancestor_keypaths(keypath: str) -> list:
+    """
+    The keypaths of the nodes holding the keypath, outermost first and without the schema
+    root ("a/b[0]/c" => ["a", "a/b", "a/b[0]"]).
+    """
+
+    return [keypath[:match.start()] for match in re.finditer(r"[/\[]", keypath) if match.start()]
+
+
+def get_natural_key(keypath: str) -> list:
+    """
+    Sort key for keypaths that orders list indexes by number ("anyOf[2]" before "anyOf[10]").
+    """
+
+    return [int(part) if i % 2 else part for i, part in enumerate(re.split(r"\[(\d+)\]", keypath))]
+
+
+class RefResolver:
+    """
+    Resolves the local $refs of a schema from its ref => ref dependency graph.
+
+    The graph is built once from the index.  A ref depends on the refs its value is made of:
+    the ones in the subtree its pointer targets, and the ones on the way to it (a pointer
+    into "definitions/A/properties/b/properties/x" goes through the ref at
+    "definitions/A/properties/b").  A ref into a part of a definition only depends on that
+    part, so a property referring to a sibling property is not a recursion.  A single depth
+    first pass finds the strongly connected components (Tarjan) and the refs that close a
+    cycle, i.e. lead back to a ref still being visited.  Only those refs are removed for
+    generation, all other refs are resolved in topological order, so every value is
+    complete before it is copied into the sites that reference it.
+
+    graph groups the refs by the definition holding them and the definition they point
+    into, recursive_groups lists the definitions whose refs make a cycle and resolve_order
+    orders the definitions by their refs.
+
+    With shared resolution every site is linked to the definition's own dict rather than
+    given a copy of it, so the resolved schema is a graph holding each definition once and
+    its size in memory, like the time to resolve it, follows the number of definitions
+    rather than the number of refs.
+
+    Recursive definitions can be unrolled to a number of levels instead (see
+    unroll_recursive_refs), so the recursion is generated that deep rather than not at all.
+    The refs to unrolled definitions are always resolved shared.
+    """
+
+    def __init__(self, index: SchemaIndex):
+        self.index = index
+        self.resolved_refs = 0
+        self.unrolled_definitions = set()
+        self._analyse()
+
+    def resolve(self, shared: bool = False) -> dict:
+        """
+        Removes the recursive refs and replaces every other ref with its resolved value,
+        or with the resolved node itself when shared is True.
+        """
+
+        self.remove_recursive_refs()
+
+        ref_sites = [ref for refs in self.get_ref_sites().values() for ref in refs]
+        self.resolve_refs(sorted(ref_sites, key=lambda ref: self._ref_positions.get(ref[0], -1)), shared)
+
+        return self.index.schema
+
+    def unroll_recursive_refs(self, depth: int) -> int:
+        """
+        Unrolls each recursive group to depth levels, returns the number of refs unrolled.
+
+        Every definition of the group is copied once per level ("definitions/Part__1" ...),
+        refs inside the group point at the same level and the refs that closed a cycle point
+        at the next level.  On the last level those refs are replaced by the minimal
+        alternative without them: an optional property is dropped, an array gets no items
+        and an option is removed from its anyOf / oneOf.  The definitions grow linearly
+        with the depth, the graph is analysed again and has no cycles left.  Groups holding
+        the schema root are not unrolled, their refs are removed as usual.
+
+        The levels are listed in unrolled_definitions, refs to them are resolved shared (see
+        resolve_refs).  Copied in, a level would hold a copy of the next one, and every
+        recursive group it refers to all of its levels, so the resolved schema would grow
+        with the product of the depths of nested groups rather than linearly.
+        """
+
+        recursive_sites = {ref_site for ref_site, _ in self.recursive_refs}
+        groups = [group for group in self.recursive_groups if ROOT not in group]
+        if depth < 1 or not groups:
+            return 0
+
+        unrolled = 0
+        last_sites = []
+        for group in groups:
+            levels = {member: [member] + [self._get_free_name(member, level) for level in range(1, depth + 1)] for member in group}
+            self.unrolled_definitions.update(name for member_levels in levels.values() for name in member_levels)
+
+            # Copied before any of the group's refs are changed
+            for member in group:
+                definition = self.index[member]
+                for level in range(1, depth + 1):
+                    self.index[levels[member][level]] = copy.deepcopy(definition)
+
+            for member in group:
+                for target, ref_sites in self.graph[member].items():
+                    if target not in levels:
+                        continue
+
+                    for ref_site, pointer in ref_sites:
+                        recursive = ref_site in recursive_sites
+                        unrolled += recursive
+
+                        for level in range(depth + 1):
+                            level_site = levels[member][level] + ref_site[len(member):]
+                            target_level = level + 1 if recursive else level
+
+                            if target_level > depth:
+                                last_sites.append(level_site)
+                            elif target_level:
+                                target_keypath = get_pointer_keypath(pointer)
+                                level_pointer = generator_constants.POUND_SLASH + levels[target][target_level] + target_keypath[len(target):]
+                                self.index[level_site + generator_constants.SLASH_DOL_REF] = level_pointer
+
+        # Deleting a list item shifts the items after it, so removals go back to front
+        for ref_site in sorted(last_sites, key=get_natural_key, reverse=True):
+            self._remove_ref_site(ref_site)
+
+        self._analyse()
+        return unrolled
+
+    def remove_recursive_refs(self, owners: set = None):
+        """
+        Removes the refs that close a cycle, only the ones held by the owners when given.
+        """
+
+        # Deleting a list item shifts the items after it, so removals go back to front
+        for ref_site, _ in sorted(self.recursive_refs, key=lambda ref: get_natural_key(ref[0]), reverse=True):
+            if owners is None or get_ref_owner(ref_site) in owners:
+                del self.index[ref_site]
+
+    def get_ref_sites(self, owners: set = None) -> dict:
+        """
+        The (ref site, pointer) pairs of the refs to resolve, by the definition holding them
+        (ROOT for the schema root), only the ones held by the owners when given.  Each
+        definition's refs are in the order they are resolved in.
+        """
+
+        ref_sites_by_owner = {}
+        for ref_site, pointer in self.index.ref_sites():
+            owner = get_ref_owner(ref_site)
+            if (owners is None or owner in owners) and self._get_ref_target(pointer) is not None:
+                ref_sites_by_owner.setdefault(owner, []).append((ref_site, pointer))
+
+        for ref_sites in ref_sites_by_owner.values():
+            ref_sites.sort(key=lambda ref: self._ref_positions.get(ref[0], -1))
+
+        return ref_sites_by_owner
+
+    def resolve_refs(self, ref_sites: list, shared: bool = False, indexed: bool = True):
+        """
+        Replaces the refs with their resolved value, or the resolved node itself when shared
+        is True or the ref points into an unrolled definition.  With indexed False the
+        resolved values are not added to the index, for callers that no longer look up
+        keypaths inside them.
+        """
+
+        import jsonpointer
+
+        for ref_site, pointer in ref_sites:
+            if ref_site and ref_site not in self.index:
+                # Inside a site resolved before it, the site's own ref replaced it
+                continue
+
+            resolved_data = jsonpointer.JsonPointer(get_pointer_keypath(pointer, True)).resolve(self.index.schema)
+            if (shared or self._get_ref_target(pointer) in self.unrolled_definitions) and ref_site:
+                self.index.link(ref_site, resolved_data, self._get_target_keypath(pointer))
+            elif indexed or not ref_site:
+                self.index[ref_site] = resolved_data
+            else:
+                self.index.set_unindexed(ref_site, resolved_data)
+            self.resolved_refs += 1
+
+    def _analyse(self):
+        self.graph = {ROOT: {}}
+        self.ref_graph = {}
+        self.unresolved_refs = []
+        self.recursive_refs = []
+        self.recursive_groups = []
+        self.resolve_order = []
+        self._ref_positions = {}
+
+        self._build_graph()
+        self._find_cycles()
+
+    def _get_free_name(self, owner: str, level: int) -> str:
+        name = f"{owner}__{level}"
+        while name in self.index:
+            name += "_"
+
+        return name
+
+    def _remove_ref_site(self, ref_site: str):
+        """
+        Replaces a ref that ends an unrolled recursion with its minimal alternative: an
+        optional array of it is dropped, any other array is limited to 0 items, a property
+        is dropped along with its name in the required ones, an option is removed.
+        """
+
+        parent_keypath, _, key = ref_site.rpartition("/")
+        if key == generator_constants.ITEMS and isinstance(self.index.get(parent_keypath), dict):
+            if self._get_required_keypath(parent_keypath) == "":
+                ref_site = parent_keypath
+            else:
+                # JSF needs items to parse the array, even one it never generates items for
+                self.index[ref_site] = {}
+                self.index[parent_keypath + "/" + generator_constants.MAX_ITEMS] = 0
+                if generator_constants.MIN_ITEMS in self.index[parent_keypath]:
+                    del self.index[parent_keypath + "/" + generator_constants.MIN_ITEMS]
+                return
+
+        required_keypath = self._get_required_keypath(ref_site)
+        if required_keypath:
+            name = ref_site.rpartition("/")[2]
+            self.index[required_keypath] = [required for required in self.index[required_keypath] if required != name]
+
+        del self.index[ref_site]
+
+    def _get_required_keypath(self, keypath: str) -> str | None:
+        """
+        The keypath of the required list of the object the keypath is a property of, "" when
+        it is an optional property and None when it is not a property.
+        """
+
+        properties_keypath, _, name = keypath.rpartition("/")
+        owner_keypath, _, properties_key = properties_keypath.rpartition("/")
+        if properties_key != generator_constants.PROPERTIES:
+            return None
+
+        required_keypath = owner_keypath + "/" + generator_constants.REQUIRED if owner_keypath else generator_constants.REQUIRED
+        required = self.index.get(required_keypath)
+        return required_keypath if isinstance(required, list) and name in required else ""
+
+    def _build_graph(self):
+        for def_tag in generator_constants.DEFINITION_TAGS:
+            definitions = self.index.schema.get(def_tag)
+            if isinstance(definitions, dict):
+                for def_name in definitions:
+                    self.graph.setdefault(def_tag + "/" + def_name, {})
+
+        refs = []
+        for ref_site, pointer in self.index.ref_sites():
+            target = self._get_ref_target(pointer)
+            if target is None:
+                self.unresolved_refs.append((ref_site, pointer))
+                continue
+
+            owner = get_ref_owner(ref_site)
+            self.graph[owner].setdefault(target, []).append((ref_site, pointer))
+            refs.append((ref_site, pointer))
+
+        # The root's refs first, so the refs reached first from the root are kept
+        refs.sort(key=lambda ref: get_ref_owner(ref[0]) != ROOT)
+
+        sites = sorted(ref_site for ref_site, _ in refs)
+        site_set = set(sites)
+        for ref_site, pointer in refs:
+            self.ref_graph[ref_site] = self._get_refs_in(self._get_target_keypath(pointer), sites, site_set)
+
+    def _get_ref_target(self, pointer) -> str | None:
+        """
+        Returns the definition a local $ref points into, or None for refs that are left as is.
+        """
+
+        if not isinstance(pointer, str) or not pointer.startswith(generator_constants.POUND):
+            return None
+
+        target = get_ref_owner(get_pointer_keypath(pointer))
+        return target if target in self.graph else None
+
+    def _get_target_keypath(self, pointer: str) -> str:
+        """
+        The keypath a pointer targets, list indexes as keypaths write them ("anyOf/0" =>
+        "anyOf[0]").  Past a node the index does not hold (through a ref) the pointer's
+        keys are kept as they are.
+        """
+
+        keypath = ""
+        node = self.index.schema
+        for token in get_pointer_keypath(pointer, True).split("/")[1:]:
+            token = token.replace("~1", "/").replace("~0", "~")
+            if isinstance(node, list) and token.isdigit():
+                keypath += f"[{token}]"
+                node = node[int(token)] if int(token) < len(node) else None
+            else:
+                keypath = keypath + "/" + token if keypath else token
+                node = node.get(token) if isinstance(node, dict) else None
+
+        return keypath
+
+    def _get_refs_in(self, keypath: str, sites: list, site_set: set) -> list:
+        """
+        The ref sites (sites sorted, site_set the same as a set) a value copied from the
+        keypath is made of: the ones at or under the keypath and the ones on the way to it.
+        """
+
+        if not keypath:
+            return list(sites)
+
+        refs_in = [site for site in get_ancestor_keypaths(keypath) if site in site_set]
+        if keypath in site_set:
+            refs_in.append(keypath)
+
+        for prefix in (keypath + "/", keypath + "["):
+            start = bisect.bisect_left(sites, prefix)
+            end = bisect.bisect_left(sites, prefix[:-1] + chr(ord(prefix[-1]) + 1), start)
+            refs_in.extend(sites[start:end])
+
+        return refs_in
+
+    def _find_cycles(self):
+        """
+        Iterative Tarjan over the refs, started from the root's so the refs reached first
+        from the root are kept.  Back edges (to a ref on the current path) leave from the
+        refs that make a cycle, and the finish order of the pass is a topological order of
+        what remains.  The definitions are ordered by the last of their refs to finish, the
+        ones without refs first.
+        """
+
+        order = {}
+        low = {}
+        on_path = set()
+        on_stack = set()
+        scc_stack = []
+        recursive_sites = set()
+        ref_order = []
+        groups = []
+
+        for start in self.ref_graph:
+            if start in order:
+                continue
+
+            order[start] = low[start] = len(order)
+            on_path.add(start)
+            on_stack.add(start)
+            scc_stack.append(start)
+            work = [(start, iter(self.ref_graph[start]))]
+
+            while work:
+                node, edges = work[-1]
+                advanced = False
+
+                for target in edges:
+                    if target not in order:
+                        order[target] = low[target] = len(order)
+                        on_path.add(target)
+                        on_stack.add(target)
+                        scc_stack.append(target)
+                        work.append((target, iter(self.ref_graph[target])))
+                        advanced = True
+                        break
+
+                    if target in on_path:
+                        recursive_sites.add(node)
+
+                    if target in on_stack:
+                        low[node] = min(low[node], order[target])
+
+                if advanced:
+                    continue
+
+                work.pop()
+                on_path.discard(node)
+                ref_order.append(node)
+
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+
+                if low[node] == order[node]:
+                    group = []
+                    while True:
+                        member = scc_stack.pop()
+                        on_stack.discard(member)
+                        group.append(member)
+                        if member == node:
+                            break
+
+                    if len(group) > 1 or node in self.ref_graph[node]:
+                        groups.append({get_ref_owner(member) for member in group})
+
+        self._ref_positions = {ref_site: position for position, ref_site in enumerate(ref_order)}
+
+        self.recursive_refs = sorted(
+            (ref for targets in self.graph.values() for refs in targets.values() for ref in refs if ref[0] in recursive_sites),
+            key=lambda ref: get_natural_key(ref[0])
+        )
+
+        # Cycles sharing a definition make one group, it is unrolled as a whole
+        merged = []
+        for group in groups:
+            for other in [other for other in merged if other & group]:
+                merged.remove(other)
+                group |= other
+            merged.append(group)
+        self.recursive_groups = [sorted(group) for group in merged]
+
+        last_positions = {owner: -1 for owner in self.graph}
+        for ref_site in ref_order:
+            if ref_site not in recursive_sites:
+                last_positions[get_ref_owner(ref_site)] = self._ref_positions[ref_site]
+        self.resolve_order = sorted(self.graph, key=lambda owner: last_positions[owner])
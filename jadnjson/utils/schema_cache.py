@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+
+# Bump when the cleanup output changes, so on-disk entries from older versions are not reused
+CACHE_VERSION = 6
+
+
+def get_schema_hash(schema: dict, **options) -> str:
+    """
+    Canonical hash of a schema (and any options that change its cleanup output).
+    Key order and whitespace do not change the hash.
+    """
+
+    canonical = json.dumps(
+        {"version": CACHE_VERSION, "schema": schema, "options": options},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class SchemaCache:
+    """
+    Content-addressed cache of cleaned schemas.  Entries are kept in a bounded in-memory LRU
+    and, when a cache_dir is given, pickled to disk so restarted processes can skip the cleanup.
+    Cached schemas are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_size: int = 32, cache_dir: str = None):
+        self.max_size = max_size
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries or bool(self.cache_dir and os.path.exists(self._get_path(key)))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        value = self._read(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            self.disk_hits += 1
+            self._add(key, value)
+
+        return value
+
+    def put(self, key: str, value):
+        with self._lock:
+            self._add(key, value)
+
+        self._write(key, value)
+
+    def invalidate(self, key: str = None):
+        """
+        Removes one entry, or every entry when no key is given, from memory and disk.
+        """
+
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+        if self.cache_dir:
+            file_names = [key + ".pickle"] if key else os.listdir(self.cache_dir)
+            for file_name in file_names:
+                if file_name.endswith(".pickle"):
+                    try:
+                        os.remove(os.path.join(self.cache_dir, file_name))
+                    except FileNotFoundError:
+                        pass
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "size": len(self._entries),
+            "max_size": self.max_size
+        }
+
+    def _add(self, key: str, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".pickle")
+
+    def _read(self, key: str):
+        if not self.cache_dir:
+            return None
+
+        try:
+            with open(self._get_path(key), "rb") as cache_file:
+                return pickle.load(cache_file)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def _write(self, key: str, value):
+        if not self.cache_dir:
+            return
+
+        # Written to a temp file first, so a reader never sees a partial entry
+        path = self._get_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as cache_file:
+            pickle.dump(value, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
@@ -0,0 +1,279 @@
+from jadnjson.constants import generator_constants
+
+
+class SchemaIndex:
+    """
+    Keypath index over a JSON Schema, built in a single walk of the plain dicts.
+
+    Keypaths use the same format as benedict ("definitions/A/anyOf[0]/type").
+    The index maps each keypath to the container and key that hold its value,
+    groups $ref sites by the pointer they target and lists keypaths by their last key
+    (maxItems, pattern, contentEncoding, ...).  Changes made through the index keep
+    it in sync, so the cleanup steps never need to enumerate the keypaths again.
+    """
+
+    def __init__(self, schema: dict):
+        self.schema = schema
+        self.entries = {}
+        self.suffixes = {}
+        self.refs = {}
+        self.links = {}
+        self._index(schema, "", False)
+
+    def __contains__(self, keypath: str) -> bool:
+        return keypath in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __getitem__(self, keypath: str):
+        if keypath == "":
+            return self.schema
+
+        container, key, _ = self.entries[keypath]
+        return container[key]
+
+    def __setitem__(self, keypath: str, value):
+        entry = self.entries.get(keypath)
+
+        if entry:
+            container, key, indexed = entry
+            current = container[key]
+            self._unindex(current, keypath)
+            if key == generator_constants.DOL_REF:
+                self._unindex_ref(current, get_parent_keypath(keypath))
+
+            # Same as benedict, a dict assigned over a dict updates it in place,
+            # so every other reference to the existing dict sees the new value
+            if isinstance(current, dict) and isinstance(value, dict):
+                if current is not value:
+                    current.clear()
+                    current.update(value)
+                value = current
+            else:
+                container[key] = value
+        else:
+            parent_keypath, _, key = keypath.rpartition("/")
+            container = self[parent_keypath]
+            indexed = self._is_indexed(parent_keypath)
+            self._add_entry(keypath, container, key, indexed)
+            container[key] = value
+
+        if key == generator_constants.DOL_REF:
+            self._index_ref(value, get_parent_keypath(keypath))
+        self._index(value, keypath, indexed)
+
+    def __delitem__(self, keypath: str):
+        container, key, _ = self.entries[keypath]
+
+        if isinstance(container, list):
+            # Removing a list item shifts its siblings, so the whole list is re-indexed
+            list_keypath = keypath[:keypath.rindex("[")]
+            self._unindex(container, list_keypath)
+            del container[key]
+            self._index(container, list_keypath, True)
+        else:
+            self._unindex(container[key], keypath)
+            self._remove_entry(keypath)
+            if key == generator_constants.DOL_REF:
+                self._unindex_ref(container[key], get_parent_keypath(keypath))
+            del container[key]
+
+    def link(self, keypath: str, value, target_keypath: str):
+        """
+        Points the keypath at a node held elsewhere in the schema, at the target keypath (a
+        definition), instead of copying it in.  Every keypath that links the node shares it
+        and only its own keypath stays indexed, keypaths through the link are not added to
+        the index, neither when a value holding the link is copied in elsewhere.
+        """
+
+        container, key, _ = self.entries[keypath]
+        current = container[key]
+        self._unindex(current, keypath)
+        if key == generator_constants.DOL_REF:
+            self._unindex_ref(current, get_parent_keypath(keypath))
+
+        container[key] = value
+        self.links[id(value)] = (value, target_keypath)
+
+    def set_unindexed(self, keypath: str, value):
+        """
+        Sets the keypath like setting it through the index does, a dict over a dict updates
+        it in place, but leaves the value out of the index.  The keypaths under it are
+        no longer indexed.
+        """
+
+        container, key, _ = self.entries[keypath]
+        current = container[key]
+        self._unindex(current, keypath)
+        if key == generator_constants.DOL_REF:
+            self._unindex_ref(current, get_parent_keypath(keypath))
+
+        if isinstance(current, dict) and isinstance(value, dict):
+            if current is not value:
+                current.clear()
+                current.update(value)
+        else:
+            container[key] = value
+
+    def rename(self, keypath: str, new_key: str) -> str:
+        """
+        Renames the key at the keypath, keeping its place among its siblings,
+        and returns the new keypath.
+        """
+
+        container, key, indexed = self.entries[keypath]
+        value = container[key]
+        new_keypath = keypath[:len(keypath) - len(key)] + new_key
+
+        self._unindex(value, keypath)
+        self._remove_entry(keypath)
+
+        items = [(new_key if k == key else k, v) for k, v in container.items()]
+        container.clear()
+        container.update(items)
+
+        self._add_entry(new_keypath, container, new_key, indexed)
+        self._index(value, new_keypath, indexed)
+
+        return new_keypath
+
+    def get(self, keypath: str, default=None):
+        """
+        Returns the live value at the keypath, or the default if it no longer exists.
+        """
+
+        try:
+            return self[keypath]
+        except (KeyError, IndexError, TypeError):
+            return default
+
+    def keys_ending_with(self, suffix: str, indexes: bool = False) -> list:
+        """
+        Returns the keypaths whose last key is the suffix, in keypath order.
+        Keypaths nested in lists are only included when indexes is True.
+        """
+
+        keypaths = self.suffixes.get(suffix, {})
+        return sorted(k for k in keypaths if indexes or not self.entries[k][2])
+
+    def ref_sites(self) -> list:
+        """
+        Returns (site keypath, pointer) pairs for every $ref, in keypath order.
+        The site is the object holding the $ref.  Sites reached through a dict that was
+        since resolved in place elsewhere no longer hold the $ref and are skipped.
+        """
+
+        sites = [
+            (site, pointer) for pointer, site_keys in self.refs.items() for site in site_keys
+            if self.get(site + generator_constants.SLASH_DOL_REF if site else generator_constants.DOL_REF) == pointer
+        ]
+        return sorted(sites, key=lambda site: site[0] + generator_constants.SLASH_DOL_REF)
+
+    def keypaths(self, indexes: bool = False) -> list:
+        return sorted(k for k, entry in self.entries.items() if indexes or not entry[2])
+
+    def num_of_keys(self) -> int:
+        """
+        Returns the number of keypaths (without list indexes) in the schema.  Resolved
+        refs share dicts, so each dict's count is worked out once and reused.
+        """
+
+        counts = {}
+        stack = [(self.schema, False)]
+
+        while stack:
+            node, children_counted = stack.pop()
+            if id(node) in counts:
+                continue
+
+            children = [value for value in node.values() if isinstance(value, dict)]
+            if children_counted:
+                counts[id(node)] = len(node) + sum(counts[id(child)] for child in children)
+            else:
+                stack.append((node, True))
+                stack.extend((child, False) for child in children if id(child) not in counts)
+
+        return counts[id(self.schema)]
+
+    def _is_indexed(self, keypath: str) -> bool:
+        entry = self.entries.get(keypath)
+        return bool(entry) and entry[2]
+
+    def _add_entry(self, keypath: str, container, key, indexed: bool):
+        self.entries[keypath] = (container, key, indexed)
+        if isinstance(key, str):
+            self.suffixes.setdefault(key, {})[keypath] = None
+
+    def _remove_entry(self, keypath: str):
+        container, key, _ = self.entries.pop(keypath)
+        if isinstance(key, str):
+            self.suffixes.get(key, {}).pop(keypath, None)
+
+    def _index_ref(self, pointer, site: str):
+        if isinstance(pointer, str):
+            self.refs.setdefault(pointer, {})[site] = None
+
+    def _unindex_ref(self, pointer, site: str):
+        if isinstance(pointer, str) and pointer in self.refs:
+            self.refs[pointer].pop(site, None)
+            if not self.refs[pointer]:
+                del self.refs[pointer]
+
+    def _is_linked(self, node, keypath: str) -> bool:
+        link = self.links.get(id(node))
+        return bool(link) and link[0] is node and link[1] != keypath
+
+    def _index(self, node, keypath: str, indexed: bool):
+        stack = [(node, keypath, indexed)]
+
+        while stack:
+            node, keypath, indexed = stack.pop()
+
+            if isinstance(node, dict):
+                for key, value in node.items():
+                    child_keypath = keypath + "/" + key if keypath else key
+                    self._add_entry(child_keypath, node, key, indexed)
+
+                    if key == generator_constants.DOL_REF:
+                        self._index_ref(value, keypath)
+
+                    if isinstance(value, (dict, list)) and not self._is_linked(value, child_keypath):
+                        stack.append((value, child_keypath, indexed))
+
+            elif isinstance(node, list):
+                for i, value in enumerate(node):
+                    child_keypath = f"{keypath}[{i}]"
+                    self._add_entry(child_keypath, node, i, True)
+
+                    if isinstance(value, (dict, list)) and not self._is_linked(value, child_keypath):
+                        stack.append((value, child_keypath, True))
+
+    def _unindex(self, node, keypath: str):
+        stack = [(node, keypath)]
+
+        while stack:
+            node, keypath = stack.pop()
+
+            if isinstance(node, dict):
+                children = [(keypath + "/" + key if keypath else key, key, value) for key, value in node.items()]
+            elif isinstance(node, list):
+                children = [(f"{keypath}[{i}]", i, value) for i, value in enumerate(node)]
+            else:
+                continue
+
+            for child_keypath, key, value in children:
+                if child_keypath in self.entries:
+                    self._remove_entry(child_keypath)
+                if key == generator_constants.DOL_REF:
+                    self._unindex_ref(value, keypath)
+                if isinstance(value, (dict, list)) and not self._is_linked(value, child_keypath):
+                    stack.append((value, child_keypath))
+
+
+def get_parent_keypath(keypath: str) -> str:
+    """
+    Returns the keypath of the object holding the keypath's last key.
+    """
+
+    return keypath.rpartition("/")[0]
@@ -0,0 +1,63 @@
+from typing import Callable
+
+from jadnjson.constants import generator_constants
+
+
+class SchemaVisitor:
+    """
+    Walks a plain-dict JSON Schema once and calls the transforms registered for the keywords
+    found in each schema object.
+
+    A transform is called as transform(node, parent, context), where node is the schema object
+    holding the keyword and parent the dict or list holding node.  Each transform runs at most
+    once per node, in registration order, before the walk goes into the node's children, so a
+    transform can rewrite a node's subschemas.  Resolved refs share dicts and each one is only
+    visited once.  Values of data keywords (enum, const, default, examples) are not walked.
+    """
+
+    def __init__(self):
+        self.transforms = []
+
+    def register(self, keywords: str | list, transform: Callable[[dict, dict | list, dict], None]):
+        """
+        Calls transform for each schema object holding any of the keywords.
+        """
+
+        if isinstance(keywords, str):
+            keywords = [keywords]
+
+        self.transforms.append((frozenset(keywords), transform))
+
+    def visit(self, schema: dict, context: dict = None, skip: list = None) -> int:
+        """
+        Runs the transforms over the schema and returns the number of schema objects visited.
+        The schema objects in skip, and the ones only reached through them, are left as is.
+        """
+
+        context = {} if context is None else context
+        skipped = {id(node) for node in skip or []}
+        visited = set()
+        stack = [(schema, None)]
+
+        while stack:
+            node, parent = stack.pop()
+            if id(node) in visited or id(node) in skipped:
+                continue
+            visited.add(id(node))
+
+            for keywords, transform in self.transforms:
+                if not keywords.isdisjoint(node):
+                    transform(node, parent, context)
+
+            for key, value in node.items():
+                if key in generator_constants.DATA_KEYWORDS:
+                    continue
+
+                if key in generator_constants.SCHEMA_MAP_KEYWORDS and isinstance(value, dict):
+                    stack.extend((child, value) for child in value.values() if isinstance(child, dict))
+                elif isinstance(value, dict):
+                    stack.append((value, node))
+                elif isinstance(value, list):
+                    stack.extend((child, value) for child in value if isinstance(child, dict))
+
+        return len(visited)
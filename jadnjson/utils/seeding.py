@@ -0,0 +1,129 @@
+import hashlib
+import random
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+
+# Faker picks dates between the epoch and now, seeded dates end here instead so they
+# do not change with the clock
+SEEDED_END_DATETIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+# The Random of the seeded_generation block running in each thread
+_local = threading.local()
+
+_install_lock = threading.Lock()
+_installed = False
+
+
+class ThreadRandom:
+    """
+    Stands in for the Random a library shares between all of its callers (JSF's modules draw
+    from the random module, Faker instances from one Random, rstr from the random module).
+    Draws come from the Random of the seeded_generation block running in the calling thread,
+    and from the shared one outside of a block, so a seeded document does not depend on what
+    other threads generate meanwhile.
+    """
+
+    def __init__(self, shared: random.Random):
+        self._shared = shared
+
+    def __getattr__(self, name: str):
+        return getattr(getattr(_local, "rng", None) or self._shared, name)
+
+
+def current_random() -> random.Random:
+    """
+    The Random of the seeded_generation block running in this thread, the random module's
+    outside of one.
+    """
+
+    return getattr(_local, "rng", None) or random
+
+
+def _date_time() -> datetime:
+    from jsf.schema_types import string as jsf_string
+
+    end_datetime = SEEDED_END_DATETIME if getattr(_local, "rng", None) is not None else None
+    return jsf_string.faker.date_time(timezone.utc, end_datetime=end_datetime)
+
+
+_DATE_FORMATS = {
+    "date-time": lambda: _date_time().isoformat(),
+    "time": lambda: _date_time().isoformat().split("T")[1],
+    "date": lambda: _date_time().isoformat().split("T")[0]
+}
+
+
+def install_thread_random():
+    """
+    Routes the draws of JSF (its parser picking from type lists too), the Faker instances it
+    holds ($provider fields are generated by the parser's) and rstr through ThreadRandom, and
+    JSF's date formats through one that ends at SEEDED_END_DATETIME in a seeded block.  Done
+    once per process, outside of a seeded_generation block they draw as before.
+    """
+
+    global _installed
+
+    with _install_lock:
+        if _installed:
+            return
+
+        import rstr
+        from jsf import parser
+        from jsf.schema_types import anyof, array, base, boolean, enum, number, object, oneof, string
+        from jsf.schema_types.string_utils.content_type import (
+            application__jwt, application__zip, image__jpeg, image__webp, text__plain
+        )
+
+        thread_random = ThreadRandom(random)
+        for module in (
+            parser, anyof, array, base, boolean, enum, number, object, oneof, string, application__zip, image__jpeg,
+            image__webp, text__plain
+        ):
+            module.random = thread_random
+
+        rstr._default_instance._random = thread_random
+
+        for faker in (parser.faker, string.faker, application__jwt.faker):
+            faker.random = ThreadRandom(faker.random)
+
+        string.format_map.update(_DATE_FORMATS)
+        _installed = True
+
+
+def derive_seed(seed: int | str, *parts) -> int:
+    """
+    Derives a child seed from a master seed and any parts (document index, worker, stage...).
+    The same inputs always give the same seed, in any process.
+    """
+
+    seed_str = ":".join(str(part) for part in (seed, *parts))
+    return int.from_bytes(hashlib.sha256(seed_str.encode("utf-8")).digest()[:8], "big")
+
+
+@contextmanager
+def seeded_generation(seed: int | str = None, rng: random.Random = None):
+    """
+    Seeds rng (a new Random when None) and has JSF, Faker and rstr draw from it in this
+    thread for the duration of the block, see ThreadRandom.  Other threads are not affected
+    and do not affect it.  Pass the rng compiled generators bind (see SchemaCompiler) so
+    they draw from the same one.  Date formats are generated up to SEEDED_END_DATETIME
+    within the block.  Does nothing when seed is None.
+    """
+
+    if seed is None:
+        yield
+        return
+
+    install_thread_random()
+
+    rng = rng or random.Random()
+    rng.seed(seed)
+
+    previous = getattr(_local, "rng", None)
+    _local.rng = rng
+    try:
+        yield rng
+    finally:
+        _local.rng = previous
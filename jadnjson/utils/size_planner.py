@@ -0,0 +1,339 @@
+import json
+import logging
+import math
+
+from rstr.xeger import STAR_PLUS_LIMIT
+
+from jadnjson.constants import generator_constants
+from jadnjson.generators.schema_compiler import DEFAULT_MAX_LENGTH, DEFAULT_MAXIMUM
+from jadnjson.utils.pattern_cache import parse_pattern
+
+
+logger = logging.getLogger(__name__)
+
+# Arrays without a maxItems are planned up to this many items, rstr repeats * and + up to
+# STAR_PLUS_LIMIT times
+UNBOUNDED_MAX_ITEMS = 20
+
+# Free text strings start out limited to this length, it only goes down when a document
+# with single item arrays is still over the target
+DEFAULT_STRING_CAP = 25
+
+# Expected lengths of the generated formats
+FORMAT_LENGTHS = {
+    "date-time": 25, "time": 14, "date": 10, "email": 22, "idn-email": 22, "hostname": 16,
+    "idn-hostname": 16, "ipv4": 13, "ipv6": 39, "uri": 30, "iri": 30, "uuid": 36
+}
+DEFAULT_FORMAT_LENGTH = 30
+
+ENCODING_FACTORS = {"base-64": 4 / 3, "base-32": 8 / 5, "base-16": 2}
+
+# Generation cost estimates in microseconds with JSF, per document, per value, per word of
+# free text, per format and per regex node that rstr expands (compiled generation is faster)
+DOCUMENT_COST = 150
+VALUE_COST = 2
+WORD_COST = 12
+FORMAT_COST = 60
+PATTERN_STEP_COST = 6
+
+
+class SizePlanner:
+    """
+    Plans the maxItems of each array and the maxLength of each free text string of a cleaned
+    up schema, so the generated documents come out at a target size (bytes of JSON) and/or
+    a target generation time.
+
+    The expected size and cost of every node are estimated from the schema structure:
+    optional properties are kept half of the time, anyOf picks one option, arrays hold
+    (minItems + maxItems) / 2 items and patterns are walked the way rstr expands them.  Each
+    array is given item_budget / expected item size items, so arrays of large objects get
+    fewer items than arrays of strings and nested arrays share the budget of their parent.
+    The largest item budget whose estimate fits the targets is found by binary search.
+    Resolved refs share dicts and each one is estimated once per pass, subschemas without
+    arrays or free text estimate the same for every budget and are estimated once.
+    """
+
+    def __init__(self, target_size: int = None, target_seconds: float = None, allow_none_optionals: float = 0.5):
+        self.target_size = target_size
+        self.target_seconds = target_seconds
+        self.keep = 1 - allow_none_optionals
+
+        self.item_budget = None
+        self.string_cap = DEFAULT_STRING_CAP
+        self.estimated_size = None
+        self.estimated_seconds = None
+        self.limits = {}
+
+        self._patterns = {}
+        self._memo = {}
+        self._fixed = {}
+        self._varying = 0
+        self._record = False
+
+    def plan(self, schema: dict) -> dict:
+        """
+        Works out the limits, by node id: (node, {keyword: limit}).  Without a target
+        nothing is limited.
+        """
+
+        if self.target_size is None and self.target_seconds is None:
+            return self.limits
+
+        self._fixed = {}
+        max_budget = self.target_size if self.target_seconds is None else 10 ** 7
+        fits = lambda budget, string_cap: self._fits(self._estimate(schema, budget, string_cap))
+
+        self.item_budget = search_largest(lambda budget: fits(budget, self.string_cap), 0, max_budget)
+        if self.item_budget == 0 and not fits(0, self.string_cap):
+            self.string_cap = search_largest(lambda string_cap: fits(0, string_cap), 1, self.string_cap)
+
+        self._record = True
+        size, cost = self._estimate(schema, self.item_budget, self.string_cap)
+        self._record = False
+
+        if not self._fits((size, cost)):
+            logger.warning("the smallest documents the schema allows are over the target, about %s bytes", round(size))
+
+        self.estimated_size = round(size)
+        self.estimated_seconds = (DOCUMENT_COST + cost) / 1e6
+        logger.info(
+            "planned documents of about %s bytes, %.4fs (item budget %s, string cap %s)",
+            self.estimated_size, self.estimated_seconds, self.item_budget, self.string_cap
+        )
+
+        return self.limits
+
+    def apply(self) -> int:
+        """
+        Writes the planned limits into the schema and returns the number of nodes changed.
+        maxItems and maxLength are added where missing, minItems and minLength only lowered.
+        """
+
+        changed = 0
+        for node, limits in self.limits.values():
+            clamped = False
+            for keyword, limit in limits.items():
+                val = node.get(keyword)
+                is_min = keyword in (generator_constants.MIN_ITEMS, generator_constants.MIN_LENGTH)
+                if (val is None and not is_min) or (isinstance(val, int) and val > limit):
+                    node[keyword] = limit
+                    clamped = True
+                    logger.debug("%s updated, %s => %s", keyword, val, limit)
+
+            changed += clamped
+
+        return changed
+
+    def _fits(self, estimate: tuple) -> bool:
+        size, cost = estimate
+        if self.target_size is not None and size > self.target_size:
+            return False
+
+        return self.target_seconds is None or (DOCUMENT_COST + cost) / 1e6 <= self.target_seconds
+
+    def _estimate(self, schema: dict, item_budget: int, string_cap: int) -> tuple[float, float]:
+        self._memo = {}
+        self._item_budget = item_budget
+        self._string_cap = string_cap
+        return self._estimate_node(schema)
+
+    def _estimate_node(self, node) -> tuple[float, float]:
+        """
+        Expected (bytes, microseconds) of a node's generated value.
+        """
+
+        if not isinstance(node, dict):
+            return 4, VALUE_COST
+
+        key = id(node)
+        if key in self._fixed:
+            return self._fixed[key]
+
+        if key in self._memo:
+            self._varying += 1
+            return self._memo[key]
+
+        # Recursion was removed by the cleanup, this only stops a loop
+        self._memo[key] = (4, VALUE_COST)
+        varying = self._varying
+
+        if generator_constants.CONST in node or generator_constants.ENUM in node:
+            values = [node[generator_constants.CONST]] if generator_constants.CONST in node else node[generator_constants.ENUM] or [None]
+            size = sum(len(json.dumps(value, default=str)) for value in values) / len(values)
+            estimate = (size, VALUE_COST)
+        else:
+            node_type = node.get(generator_constants.TYPE)
+            types = node_type if isinstance(node_type, list) else [node_type]
+            not_null = [item for item in types if item != "null"] or ["null"]
+
+            estimates = [self._estimate_type(node, item) for item in not_null]
+            estimate = mean(estimates)
+
+            # JSF nulls a nullable value as often as it leaves out an optional property
+            if len(not_null) < len(set(types)):
+                estimate = (self.keep * estimate[0] + (1 - self.keep) * 4, estimate[1])
+
+        self._memo[key] = estimate
+        if self._varying == varying:
+            self._fixed[key] = estimate
+
+        return estimate
+
+    def _estimate_type(self, node: dict, node_type: str) -> tuple[float, float]:
+        if node_type == generator_constants.OBJECT and isinstance(node.get(generator_constants.PROPERTIES), dict):
+            required = set(node.get(generator_constants.REQUIRED) or [])
+            size, cost = 2, VALUE_COST
+            for name, prop in node[generator_constants.PROPERTIES].items():
+                keep = 1 if name in required else self.keep
+                prop_size, prop_cost = self._estimate_node(prop)
+                size += keep * (len(name) + 4 + prop_size)
+                cost += keep * prop_cost
+            return size, cost
+
+        if node_type == generator_constants.ARRAY:
+            return self._estimate_array(node)
+
+        if node_type == "string":
+            return self._estimate_string(node)
+
+        if node_type in ("integer", "number"):
+            digits = len(str(int(abs(node.get("maximum", DEFAULT_MAXIMUM) or 0))))
+            return digits + (2 if node_type == "number" else 0), VALUE_COST
+
+        if node_type == "boolean":
+            return 5, VALUE_COST
+
+        if node_type in (generator_constants.OBJECT, None):
+            for key in (generator_constants.ANY_OF, generator_constants.ONE_OF):
+                if node.get(key):
+                    return mean([self._estimate_node(option) for option in node[key]])
+            if node.get(generator_constants.ALL_OF):
+                estimates = [self._estimate_node(part) for part in node[generator_constants.ALL_OF]]
+                return sum(size for size, _ in estimates), sum(cost for _, cost in estimates)
+            if node_type == generator_constants.OBJECT:
+                return 2, VALUE_COST
+
+        return 4, VALUE_COST
+
+    def _estimate_array(self, node: dict) -> tuple[float, float]:
+        items = node.get(generator_constants.ITEMS)
+        if isinstance(items, list):
+            estimates = [self._estimate_node(item) for item in items]
+            return 2 + sum(size + 1 for size, _ in estimates), VALUE_COST + sum(cost for _, cost in estimates)
+
+        if not isinstance(items, dict):
+            return 2, VALUE_COST
+
+        self._varying += 1
+        item_size, item_cost = self._estimate_node(items)
+
+        max_items = node.get(generator_constants.MAX_ITEMS)
+        upper = max_items if isinstance(max_items, int) else UNBOUNDED_MAX_ITEMS
+        cap = min(upper, max(1, math.floor(self._item_budget / max(item_size, 1))))
+        low = min(node.get(generator_constants.MIN_ITEMS, 0), cap)
+
+        if self._record:
+            self.limits[id(node)] = (node, {generator_constants.MAX_ITEMS: cap, generator_constants.MIN_ITEMS: low})
+
+        count = (low + cap) / 2
+        return 2 + count * (item_size + 1), VALUE_COST + count * item_cost
+
+    def _estimate_string(self, node: dict) -> tuple[float, float]:
+        string_format = node.get(generator_constants.FORMAT)
+        pattern = node.get(generator_constants.PATTERN)
+
+        if string_format in generator_constants.JSF_FORMATS and string_format not in ("regex", "relative-json-pointer"):
+            length, cost = FORMAT_LENGTHS.get(string_format, DEFAULT_FORMAT_LENGTH), FORMAT_COST
+        elif pattern is not None:
+            length, steps = self._estimate_pattern(pattern)
+            cost = VALUE_COST + steps * PATTERN_STEP_COST
+        else:
+            self._varying += 1
+            max_length = node.get(generator_constants.MAX_LENGTH, DEFAULT_MAX_LENGTH)
+            cap = min(max_length, self._string_cap)
+            low = min(node.get(generator_constants.MIN_LENGTH, 0), cap)
+
+            if self._record:
+                self.limits[id(node)] = (node, {generator_constants.MAX_LENGTH: cap, generator_constants.MIN_LENGTH: low})
+
+            # Lorem words are added until the length passes minLength, then stop 1 time in 10
+            length = 0.9 * min(cap, low + 60)
+            cost = VALUE_COST + WORD_COST * length / 6
+
+        factor = ENCODING_FACTORS.get(node.get(generator_constants.CONTENT_ENCODING), 1)
+        return length * factor + 2, cost
+
+    def _estimate_pattern(self, pattern: str) -> tuple[float, float]:
+        """
+        Expected (length, steps) of rstr.xeger(pattern), cached by pattern.
+        """
+
+        if pattern not in self._patterns:
+            try:
+                self._patterns[pattern] = estimate_parsed(parse_pattern(pattern))
+            except Exception:
+                self._patterns[pattern] = (len(pattern), len(pattern))
+
+        return self._patterns[pattern]
+
+
+def estimate_parsed(parsed) -> tuple[float, float]:
+    """
+    Expected length and number of regex nodes expanded for a parsed pattern.
+    """
+
+    length, steps = 0.0, 0.0
+    for opcode, value in parsed:
+        name = str(opcode).lower()
+        if name in ("literal", "not_literal", "any", "category", "in"):
+            length += 1
+            steps += 3 if name == "in" else 1
+        elif name in ("max_repeat", "min_repeat"):
+            start, end, inner = value
+            inner_length, inner_steps = estimate_parsed(inner)
+            times = (start + max(start, min(end, STAR_PLUS_LIMIT))) / 2
+            length += times * inner_length
+            steps += 1 + times * inner_steps
+        elif name == "subpattern":
+            inner_length, inner_steps = estimate_parsed(value[-1])
+            length += inner_length
+            steps += 1 + inner_steps
+        elif name == "branch":
+            inner_length, inner_steps = mean([estimate_parsed(branch) for branch in value[1]])
+            length += inner_length
+            steps += 1 + inner_steps
+        elif name == "assert":
+            inner_length, inner_steps = estimate_parsed(value[1])
+            length += inner_length
+            steps += inner_steps
+        elif name == "groupref":
+            length += 5
+            steps += 1
+
+    return length, steps
+
+
+def mean(estimates: list) -> tuple[float, float]:
+    if not estimates:
+        return 4, VALUE_COST
+
+    return (
+        sum(size for size, _ in estimates) / len(estimates),
+        sum(cost for _, cost in estimates) / len(estimates)
+    )
+
+
+def search_largest(fits, low: int, high: int) -> int:
+    """
+    Largest value from low to high that fits, fits going from True to False as the value
+    grows.  Returns low when none fits.
+    """
+
+    while low < high:
+        middle = (low + high + 1) // 2
+        if fits(middle):
+            low = middle
+        else:
+            high = middle - 1
+
+    return low
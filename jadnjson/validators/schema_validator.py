@@ -1,18 +1,82 @@
-import json
-from jsonschema import Draft202012Validator
-# from jsonschema import Draft201909Validator
+from __future__ import annotations
 
+import copy
+from typing import TYPE_CHECKING
 
-def validate_schema(schema: dict)-> tuple[bool, str]:
-    #TODO: validate by draft $schema
-    
-    # json_object = json.dumps(schema, indent = 4)     
+if TYPE_CHECKING:
+    from jsonschema.protocols import Validator
 
+    from jadnjson.utils.schema_cache import SchemaCache
+
+
+# Instance validators by schema hash, created on first use so importing validate_schema stays cheap
+_validator_cache = None
+
+
+def get_validator_class(schema: dict) -> type[Validator]:
+    """
+    The jsonschema validator of the draft the schema's $schema names, 2020-12 when it has
+    none (or one jsonschema does not know).
+    """
+
+    from jsonschema import Draft202012Validator
+    from jsonschema.validators import validator_for
+
+    return validator_for(schema, default=Draft202012Validator)
+
+
+def get_validator_cache() -> SchemaCache:
+    """
+    The cache get_validator keeps validators in unless given another one.
+    """
+
+    global _validator_cache
+
+    if _validator_cache is None:
+        from jadnjson.utils.schema_cache import SchemaCache
+
+        _validator_cache = SchemaCache(max_size=32)
+
+    return _validator_cache
+
+
+def get_validator(schema: dict, cache: SchemaCache = None) -> Validator:
+    """
+    Checks the schema against its draft's metaschema and returns a validator for its
+    instances, with the draft's format checker.  Both are done once per schema, the
+    validator is cached by the schema hash (in get_validator_cache unless a cache is given)
+    and holds its own copy of the schema, so the caller may change theirs.  Raises
+    ValueError when the schema is not valid.
+    """
+
+    from jsonschema.exceptions import SchemaError
+
+    from jadnjson.utils.schema_cache import get_schema_hash
+
+    if cache is None:
+        cache = get_validator_cache()
+
+    cache_key = get_schema_hash(schema, validator=True)
+    validator = cache.get(cache_key)
+    if validator is not None:
+        return validator
+
+    validator_class = get_validator_class(schema)
     try:
-        # Draft201909Validator.check_schema(schema)
-        # Draft202012Validator.check_schema(json_object)
-        Draft202012Validator.check_schema(schema)
-        return True, "Schema is Valid"
+        validator_class.check_schema(schema)
+    except SchemaError as err:
+        raise ValueError(err.message)
+
+    validator = validator_class(copy.deepcopy(schema), format_checker=validator_class.FORMAT_CHECKER)
+    cache.put(cache_key, validator)
+
+    return validator
+
+
+def validate_schema(schema: dict) -> tuple[bool, str]:
+    """
+    Checks the schema against the metaschema of the draft its $schema names, see get_validator.
+    """
 
-    except Exception as e:
-        raise ValueError(e.message)
\ No newline at end of file
+    get_validator(schema)
+    return True, "Schema is Valid"
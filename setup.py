@@ -9,6 +9,14 @@ setup(
         "jsf",
         "jsonpointer",
         "jsonschema",
-        "python-benedict"
-    ]    
+        "python-benedict",
+        # pattern_cache and seeding use rstr's internals (alphabets, repeat limit, Random)
+        "rstr>=3.2,<3.3"
+    ],
+    extras_require={
+        "orjson": ["orjson"]
+    },
+    entry_points={
+        "console_scripts": ["jadnjson-gen=jadnjson.cli:main"]
+    }
 )
\ No newline at end of file
@@ -0,0 +1,94 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import IsolatedAsyncioTestCase, mock
+
+from jadnjson.constants.generator_constants import TESTS_PATH
+from jadnjson.generators import async_generator, json_generator
+from jadnjson.generators.async_generator import gen_data_from_schema_async
+from jadnjson.generators.json_generator import GenerationCancelled, gen_data_from_schema, gen_fake_data
+from jadnjson.utils.cleanup_options import CleanupOptions
+from jadnjson.utils.gen_stats import GenStats
+from jadnjson.utils.general_utils import get_file
+from jadnjson.utils.schema_cache import SchemaCache
+
+
+class Test_AsyncGenerator(IsolatedAsyncioTestCase):
+
+    oc2ls_schema = {}
+    oscal_ssp_schema = {}
+
+    def setUp(self):
+        oc2ls_schema_doc = get_file('oc2ls_1.1.0_schema.json', TESTS_PATH)
+        self.oc2ls_schema = json.loads(oc2ls_schema_doc)
+
+        oscal_ssp_schema_doc = get_file('oscal_ssp_schema.json', TESTS_PATH)
+        self.oscal_ssp_schema = json.loads(oscal_ssp_schema_doc)
+
+    async def test_gen_data_async(self):
+        with ThreadPoolExecutor(2) as executor:
+            returnVal = await gen_data_from_schema_async(self.oc2ls_schema, seed=42, executor=executor, timeout=60)
+
+        assert returnVal.err_msg is None
+        assert returnVal.gen_data == gen_data_from_schema(self.oc2ls_schema, seed=42).gen_data
+
+    async def test_gen_data_async_validate(self):
+        threads = []
+
+        def build_repairer(schema, cache):
+            threads.append(threading.current_thread())
+            return json_generator.build_repairer(schema, cache)
+
+        # The validator is built off the event loop's thread
+        with ThreadPoolExecutor(1) as executor, mock.patch.object(async_generator, "build_repairer", build_repairer):
+            returnVal = await gen_data_from_schema_async(self.oc2ls_schema, seed=42, executor=executor, validate=True)
+
+        assert returnVal.err_msg is None
+        assert threads and threads[0] is not threading.current_thread()
+        assert returnVal.gen_data == gen_data_from_schema(self.oc2ls_schema, seed=42, validate=True).gen_data
+
+    async def test_shared_preparation(self):
+        cache = SchemaCache()
+        stats = [GenStats() for _ in range(3)]
+        results = await asyncio.gather(*[
+            gen_data_from_schema_async(json.loads(json.dumps(self.oc2ls_schema)), cache, seed=i, stats=stats[i])
+            for i in range(3)
+        ])
+
+        # One cleanup for the three requests
+        assert all(returnVal.err_msg is None for returnVal in results)
+        assert len(cache) == 1
+        assert sum(1 for stat in stats if "cleanup" in stat.timings) == 1
+        assert sum(stat.counters.get("shared_preparations", 0) for stat in stats) == 2
+
+    async def test_timeout_and_cancel(self):
+        returnVal = await gen_data_from_schema_async(self.oc2ls_schema, cache=None, timeout=0)
+        assert isinstance(returnVal.err_msg, asyncio.TimeoutError)
+
+        task = asyncio.ensure_future(gen_data_from_schema_async(self.oc2ls_schema, cache=None))
+        await asyncio.sleep(0)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+
+        cancel = threading.Event()
+        cancel.set()
+        with self.assertRaises(GenerationCancelled):
+            gen_fake_data({"type": "string"}, cancel=cancel)
+
+    async def test_timeout_frees_worker(self):
+        loop = asyncio.get_running_loop()
+
+        with ThreadPoolExecutor(1) as executor:
+            # Without a size target an SSP document takes minutes
+            returnVal = await gen_data_from_schema_async(
+                self.oscal_ssp_schema, seed=1, options=CleanupOptions(target_size=None), executor=executor, timeout=1
+            )
+            assert isinstance(returnVal.err_msg, asyncio.TimeoutError)
+
+            # The generation stops at its next node, the thread is free for the next call
+            start = time.perf_counter()
+            await loop.run_in_executor(executor, time.sleep, 0)
+            assert time.perf_counter() - start < 5
@@ -0,0 +1,52 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from jadnjson.cli import find_schemas, main
+
+
+class Test_Cli(TestCase):
+
+    data_dir = os.path.join("tests", "data")
+
+    def test_main(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            schema_dir = os.path.join(tmp_dir, "schemas")
+            output_dir = os.path.join(tmp_dir, "out")
+            os.makedirs(schema_dir)
+            for name in ("sm_schema.json", "music_schema.json"):
+                shutil.copy(os.path.join(self.data_dir, name), schema_dir)
+
+            assert find_schemas([schema_dir, os.path.join(schema_dir, "sm_schema.json")]) == [
+                os.path.join(schema_dir, "music_schema.json"), os.path.join(schema_dir, "sm_schema.json")
+            ]
+            assert main([schema_dir, "-n", "3", "-o", output_dir, "-w", "2", "--seed", "1"]) == 0
+
+            with open(os.path.join(output_dir, "sm_schema.ndjson")) as ndjson_file:
+                docs = [json.loads(line) for line in ndjson_file]
+            assert len(docs) == 3
+
+            # A failing schema is reported, the others still generate and replace their files
+            with open(os.path.join(schema_dir, "broken.json"), "w") as broken_file:
+                broken_file.write("{")
+            assert main([schema_dir, "-n", "2", "-o", output_dir, "-w", "1"]) == 1
+            assert not os.path.exists(os.path.join(output_dir, "broken.ndjson"))
+
+            with open(os.path.join(output_dir, "sm_schema.ndjson")) as ndjson_file:
+                assert len(ndjson_file.readlines()) == 2
+            assert sorted(os.listdir(output_dir)) == ["music_schema.ndjson", "sm_schema.ndjson"]
+
+    def test_main_name_clash(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_dir = os.path.join(tmp_dir, "out")
+            for schema_dir in ("a", "b"):
+                os.makedirs(os.path.join(tmp_dir, schema_dir))
+                shutil.copy(os.path.join(self.data_dir, "sm_schema.json"), os.path.join(tmp_dir, schema_dir))
+
+            # Both schemas would be written to sm_schema.ndjson, nothing is generated
+            with self.assertRaises(SystemExit) as exit_error:
+                main([os.path.join(tmp_dir, "a"), os.path.join(tmp_dir, "b"), "-o", output_dir])
+            assert exit_error.exception.code == 2
+            assert not os.path.exists(output_dir)
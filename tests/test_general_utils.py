@@ -0,0 +1,103 @@
+import io
+import json
+import os
+import tempfile
+from unittest import TestCase, skipIf
+
+from jadnjson.constants.generator_constants import TESTS_PATH
+from jadnjson.utils import general_utils
+from jadnjson.utils.general_utils import (
+    dumps_json, get_file, get_json_backend, loads_json, read_json, set_json_backend, write_json, write_ndjson
+)
+
+
+class Test_JsonIO(TestCase):
+
+    oscal_schema = {}
+
+    def setUp(self):
+        self.backend = get_json_backend()
+        self.oscal_schema = json.loads(get_file('oscal_ar_schema.json', TESTS_PATH))
+
+    def tearDown(self):
+        set_json_backend(self.backend)
+
+    def test_set_backend(self):
+        set_json_backend("json")
+        assert get_json_backend() == "json"
+
+        with self.assertRaises(ValueError):
+            set_json_backend("ujson")
+
+    @skipIf(general_utils.orjson is None, "orjson is not installed")
+    def test_backends_same_json(self):
+        doc = {"text": "café ✓", "int": 2 ** 40, "float": 0.5, "list": [True, None, {}], "nested": self.oscal_schema}
+
+        for indent in [None, 2]:
+            set_json_backend("orjson")
+            fast = dumps_json(doc, indent)
+            set_json_backend("json")
+            assert dumps_json(doc, indent) == fast
+
+        # Beyond 64 bits falls back to json
+        set_json_backend("orjson")
+        assert dumps_json({"big": 2 ** 70}) == b'{"big":1180591620717411303424}'
+
+    def test_read_json(self):
+        with tempfile.TemporaryDirectory() as out_dir:
+            json_path = os.path.join(out_dir, "schema.json")
+            with open(json_path, "w", encoding="utf-8") as json_file:
+                json.dump(self.oscal_schema, json_file, ensure_ascii=False)
+
+            for backend in ["json", "orjson"] if general_utils.orjson else ["json"]:
+                set_json_backend(backend)
+                assert read_json(json_path) == self.oscal_schema
+
+                # Large enough to be memory-mapped
+                mmap_threshold = general_utils.MMAP_THRESHOLD
+                general_utils.MMAP_THRESHOLD = 1024
+                try:
+                    assert read_json(json_path) == self.oscal_schema
+                finally:
+                    general_utils.MMAP_THRESHOLD = mmap_threshold
+
+                assert loads_json(b'{"a": [1, 2]}') == {"a": [1, 2]}
+
+    def test_write_json(self):
+        for backend in ["json", "orjson"] if general_utils.orjson else ["json"]:
+            set_json_backend(backend)
+            for indent in [None, 2, 4]:
+                text_buffer = io.StringIO()
+                write_json(self.oscal_schema, text_buffer, indent)
+                assert json.loads(text_buffer.getvalue()) == self.oscal_schema
+
+                binary_buffer = io.BytesIO()
+                write_json(self.oscal_schema, binary_buffer, indent)
+                assert binary_buffer.getvalue() == text_buffer.getvalue().encode("utf-8")
+
+    def test_write_json_streams(self):
+        docs = [{"id": i, "name": "café" * 100} for i in range(1000)]
+
+        for backend in ["json", "orjson"] if general_utils.orjson else ["json"]:
+            set_json_backend(backend)
+            writes = []
+
+            class RecordingBuffer(io.BytesIO):
+                def write(self, chunk):
+                    writes.append(len(chunk))
+                    return super().write(chunk)
+
+            binary_buffer = RecordingBuffer()
+            write_json(docs, binary_buffer)
+            assert json.loads(binary_buffer.getvalue()) == docs
+
+            # Written as it is encoded rather than as one document
+            assert len(writes) > 1
+            assert max(writes) < sum(writes)
+
+    def test_write_ndjson_binary(self):
+        docs = [{"id": i, "name": "café"} for i in range(10)]
+
+        binary_buffer = io.BytesIO()
+        assert write_ndjson(iter(docs), binary_buffer, buffer_size=16) == 10
+        assert [json.loads(line) for line in binary_buffer.getvalue().splitlines()] == docs
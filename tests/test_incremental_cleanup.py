@@ -0,0 +1,109 @@
+import copy
+import json
+import os
+from unittest import TestCase
+
+from jadnjson.generators.incremental_cleanup import IncrementalCleaner
+from jadnjson.generators.json_generator import cleanup_schema_dict
+from jadnjson.utils.cleanup_options import CleanupOptions
+from jadnjson.utils.gen_stats import GenStats
+
+
+class Test_IncrementalCleaner(TestCase):
+
+    schema = {}
+
+    def setUp(self):
+        self.schema = {
+            "type": "object",
+            "properties": {
+                "command": {"$ref": "#/definitions/Command"}
+            },
+            "definitions": {
+                "Command": {
+                    "type": "object",
+                    "properties": {
+                        "target": {"$ref": "#/definitions/Target"},
+                        "process": {"$ref": "#/definitions/Process"}
+                    }
+                },
+                "Target": {
+                    "type": "object",
+                    "maxProperties": 1,
+                    "properties": {
+                        "command_target": {"$ref": "#/definitions/Command-Target"},
+                        "name": {"type": "string", "pattern": "^[a-z]{3,8}$"}
+                    }
+                },
+                "Command-Target": {"type": "string"},
+                "Process": {
+                    "type": "object",
+                    "properties": {
+                        "pid": {"type": "integer"},
+                        "parent": {"$ref": "#/definitions/Process"}
+                    }
+                },
+                "Unused": {"type": "array", "items": {"type": "string"}, "uniqueItems": True}
+            }
+        }
+
+    def test_cleanup_changed_definitions(self):
+        for shared_refs in [False, True]:
+            cleaner = IncrementalCleaner(CleanupOptions(shared_refs))
+            cleaner.cleanup(self.schema)
+
+            next_version = copy.deepcopy(self.schema)
+            next_version["definitions"]["Command-Target"]["maxLength"] = 10
+
+            stats = GenStats()
+            schema_dict, choices_found = cleaner.cleanup(next_version, stats)
+
+            # Command-Target and the definitions that reach it, including the root
+            assert stats.counters["definitions_cleaned"] == 4
+            assert stats.counters["definitions_reused"] == 2
+            assert schema_dict == cleanup_schema_dict(copy.deepcopy(next_version), None, CleanupOptions(shared_refs))[0]
+            assert choices_found == {"definitions/Target": ["command_target", "name"]}
+
+    def test_cleanup_unchanged(self):
+        cleaner = IncrementalCleaner()
+        first_dict, _ = cleaner.cleanup(self.schema)
+
+        stats = GenStats()
+        schema_dict, choices_found = cleaner.cleanup(copy.deepcopy(self.schema), stats)
+
+        assert stats.counters["definitions_cleaned"] == 0
+        assert stats.counters["definitions_reused"] == 6
+        assert schema_dict == first_dict
+        assert choices_found == {"definitions/Target": ["command_target", "name"]}
+
+        # Planning works on its own copy, the kept definitions are not planned twice
+        assert schema_dict is not first_dict
+        assert schema_dict["definitions"]["Target"] is not first_dict["definitions"]["Target"]
+
+    def test_cleanup_removed_definition(self):
+        cleaner = IncrementalCleaner()
+        cleaner.cleanup(self.schema)
+
+        next_version = copy.deepcopy(self.schema)
+        del next_version["definitions"]["Command-Target"]
+
+        stats = GenStats()
+        schema_dict, _ = cleaner.cleanup(next_version, stats)
+
+        # Target now holds an unresolved ref, it and its referrers are cleaned up again
+        assert stats.counters["definitions_cleaned"] == 3
+        assert schema_dict == cleanup_schema_dict(copy.deepcopy(next_version))[0]
+
+    def test_cleanup_schema_versions(self):
+        schemas = []
+        for file_name in ["oc2ls_1.0.1_schema.json", "oc2ls_1.1.0_schema.json"]:
+            with open(os.path.join("tests", "data", file_name), "r") as schema_file:
+                schemas.append(json.load(schema_file))
+
+        cleaner = IncrementalCleaner()
+        for schema in schemas:
+            stats = GenStats()
+            schema_dict, _ = cleaner.cleanup(schema, stats)
+            assert schema_dict == cleanup_schema_dict(copy.deepcopy(schema))[0]
+
+        assert stats.counters["definitions_reused"] > 0
@@ -0,0 +1,113 @@
+import copy
+import json
+from unittest import TestCase, mock
+
+from jsonschema import Draft7Validator, Draft202012Validator
+
+from jadnjson.constants.generator_constants import TESTS_PATH
+from jadnjson.generators import instance_repair
+from jadnjson.generators.instance_repair import InstanceRepairer
+from jadnjson.generators.json_generator import build_repairer, gen_data_batch_from_schema
+from jadnjson.utils.gen_stats import GenStats
+from jadnjson.utils.general_utils import get_file
+from jadnjson.utils.ref_resolver import RefResolver
+from jadnjson.utils.schema_cache import SchemaCache
+
+
+class Test_InstanceRepairer(TestCase):
+
+    schema = {}
+
+    def setUp(self):
+        self.schema = {
+            "$schema": "http://json-schema.org/draft-07/schema#",
+            "type": "object",
+            "additionalProperties": False,
+            "required": ["command"],
+            "properties": {
+                "command": {"$ref": "#/definitions/Command"}
+            },
+            "definitions": {
+                "Command": {
+                    "type": "object",
+                    "additionalProperties": False,
+                    "required": ["action", "target"],
+                    "properties": {
+                        "action": {"type": "string", "enum": ["query", "deny"]},
+                        "target": {"$ref": "#/definitions/Target"},
+                        "args": {"type": "array", "items": {"type": "integer"}, "maxItems": 2, "uniqueItems": True}
+                    }
+                },
+                "Target": {"type": "string", "pattern": "^[a-z]{3,8}$", "maxLength": 8}
+            }
+        }
+
+    def test_repair(self):
+        instance = {"command": {"action": "run", "args": [1, 1, 2, 3], "extra": True}}
+
+        stats = GenStats()
+        errors = InstanceRepairer(self.schema).repair(instance, stats)
+
+        assert not errors
+        assert instance["command"]["action"] == "query"
+        assert instance["command"]["args"] == [1, 2]
+        assert "extra" not in instance["command"]
+        assert 3 <= len(instance["command"]["target"]) <= 8
+        assert stats.counters["instance_repairs"] >= 4
+
+    def test_validator_draft(self):
+        schema = {
+            "type": "object",
+            "required": ["pair"],
+            "properties": {
+                "pair": {"type": "array", "prefixItems": [{"type": "integer"}, {"type": "string"}], "items": False}
+            }
+        }
+
+        # 2020-12 when the schema names no draft, items: false then only forbids items after the prefix
+        repairer = InstanceRepairer(schema)
+        assert isinstance(repairer.validator, Draft202012Validator)
+        assert "$schema" not in repairer.schema
+
+        instance = {"pair": [1, "a"]}
+        assert not repairer.repair(instance)
+        assert instance == {"pair": [1, "a"]}
+
+        assert isinstance(InstanceRepairer(self.schema).validator, Draft7Validator)
+
+    def test_repair_unsatisfiable(self):
+        self.schema["definitions"]["Target"]["maxLength"] = 2
+
+        stats = GenStats()
+        errors = InstanceRepairer(self.schema, max_rounds=2).repair({"command": {"action": "deny", "target": "abcd"}}, stats)
+
+        assert errors
+        assert stats.counters["instances_invalid"] == 1
+
+    def test_cached_repairer(self):
+        cache = SchemaCache()
+        repairer = build_repairer(self.schema, cache)
+        assert build_repairer(copy.deepcopy(self.schema), cache) is repairer
+        assert build_repairer(self.schema, None) is not repairer
+
+        # The definitions are resolved once for every subschema generated again
+        with mock.patch.object(instance_repair, "RefResolver", wraps=RefResolver) as resolver_class:
+            assert not repairer.repair({"command": {"action": "query", "target": 5, "args": "a"}})
+            assert not repairer.repair({"command": {"action": "deny"}})
+
+        assert resolver_class.call_count == 1
+
+    def test_gen_data_validate(self):
+        oscal_catalog_schema = json.loads(get_file('oscal_catalog_schema.json', TESTS_PATH))
+        repairer = InstanceRepairer(oscal_catalog_schema)
+
+        # The cleanup revises some patterns, the documents are repaired against the schema's own
+        returnVal = gen_data_batch_from_schema(copy.deepcopy(oscal_catalog_schema), 3, seed=1)
+        assert any(repairer.validator.iter_errors(doc) for doc in returnVal.gen_data)
+
+        stats = GenStats()
+        returnVal = gen_data_batch_from_schema(oscal_catalog_schema, 3, seed=1, stats=stats, validate=True)
+        assert returnVal.err_msg is None
+        assert not any(list(repairer.validator.iter_errors(doc)) for doc in returnVal.gen_data)
+        assert stats.counters["instance_repairs"] > 0
+        assert "repair" in stats.timings
@@ -1,10 +1,24 @@
+import io
 import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
 from unittest import TestCase
 import unittest
+
+from jsonschema import Draft7Validator
+
 from jadnjson.constants.generator_constants import TESTS_PATH
 
-from jadnjson.generators.json_generator import cleanup_schema_for_data_gen, gen_data_from_schema
-from jadnjson.utils.general_utils import get_file, write_to_file
+from jadnjson.generators.json_generator import DataGenerationError, cleanup_choices, cleanup_schema_for_data_gen, gen_data_batch_from_schema, gen_data_from_schema, gen_data_stream_from_schema, gen_fake_data, get_prepared_key, update_inner_refs
+from jadnjson.utils.cleanup_options import CleanupOptions
+from jadnjson.utils.gen_budget import GenerationBudget
+from jadnjson.utils.gen_stats import GenStats
+from jadnjson.utils.general_utils import get_file, write_ndjson, write_to_file
+from jadnjson.utils.schema_cache import SchemaCache
+from jadnjson.utils.schema_index import SchemaIndex
 
 
 class Test_Generators(unittest.TestCase):
@@ -175,6 +189,261 @@ class Test_Generators(unittest.TestCase):
         print(json.dumps(returnVal.gen_data, indent=4))        
         assert returnVal.gen_data != None
         
+    def test_gen_data_batch_oc2ls_1_1_0(self):
+        returnVal = gen_data_batch_from_schema(self.oc2ls1_1_0_schema, 25)
+        
+        print("----test oc2ls_1_1_0 batch gen data----")
+        print(returnVal.timings)
+        assert len(returnVal.gen_data) == 25
+        assert returnVal.timings["count"] == 25
+        assert returnVal.timings["setup"] > 0
+        
+    def test_gen_data_batch_lazy(self):
+        returnVal = gen_data_batch_from_schema(self.sm_schema, 3, lazy=True)
+        
+        assert returnVal.timings["count"] == 0
+        assert len(list(returnVal.gen_data)) == 3
+        assert returnVal.timings["count"] == 3
+        
+    def test_gen_data_seeded(self):
+        first_batch = gen_data_batch_from_schema(self.sm_schema, 5, seed=42).gen_data
+        second_batch = gen_data_batch_from_schema(self.sm_schema, 5, seed=42).gen_data
+        
+        assert json.dumps(first_batch) == json.dumps(second_batch)
+        assert gen_data_from_schema(self.sm_schema, seed=42).gen_data == first_batch[0]
+        assert list(gen_data_stream_from_schema(self.sm_schema, 5, seed=42)) == first_batch
+        assert gen_data_batch_from_schema(self.sm_schema, 5, seed=43).gen_data != first_batch
+
+    def test_gen_data_seeded_type_lists(self):
+        schema = {
+            "type": "object",
+            "required": ["id", "value", "values", "name"],
+            "properties": {
+                "id": {"type": ["string", "integer", "boolean"]},
+                "value": {"type": ["integer", "string", "null"]},
+                "values": {"type": "array", "items": {"type": ["number", "string"]}, "minItems": 2},
+                "name": {"type": "string", "$provider": "faker.name"}
+            }
+        }
+
+        # JSF picks one of the types when it parses the schema, and generates $provider fields
+        # with its parser's Faker, both draw from the seed
+        for compiled in [False, True]:
+            for seeded_schema in [schema, self.faker_schema]:
+                first_batch = gen_data_batch_from_schema(seeded_schema, 5, cache=SchemaCache(), seed=8, compiled=compiled).gen_data
+                for _ in range(3):
+                    assert gen_data_batch_from_schema(seeded_schema, 5, cache=SchemaCache(), seed=8, compiled=compiled).gen_data == first_batch
+
+        jsf_batch = gen_data_batch_from_schema(self.faker_schema, 5, seed=8).gen_data
+        assert gen_data_batch_from_schema(self.faker_schema, 5, seed=8, compiled=True).gen_data == jsf_batch
+
+    def test_gen_data_reserved_words(self):
+        schema = {
+            "$schema": "http://json-schema.org/draft-07/schema#",
+            "type": "object",
+            "required": ["rec"],
+            "properties": {"rec": {"$ref": "#/definitions/Rec"}},
+            "definitions": {
+                "Rec": {
+                    "type": "object",
+                    "additionalProperties": False,
+                    "required": ["Type"],
+                    "default": {"Type": "a"},
+                    "properties": {"Type": {"$ref": "#/definitions/Type"}}
+                },
+                "Type": {"type": "string", "enum": ["a", "b"]}
+            }
+        }
+        validator = Draft7Validator(schema)
+
+        # The definition is renamed for generation, the documents keep the schema's names
+        for seed in range(5):
+            fake_data = gen_data_from_schema(schema, seed=seed).gen_data
+            assert "Type$1" not in json.dumps(fake_data)
+            assert not list(validator.iter_errors(fake_data))
+
+    def test_gen_data_seeded_threads(self):
+        solo = gen_data_batch_from_schema(self.oc2ls1_1_0_schema, 10, seed=5).gen_data
+
+        # Unseeded generation in other threads does not move the seeded one's draws
+        stop = threading.Event()
+        def gen_unseeded():
+            while not stop.is_set():
+                gen_data_from_schema(self.oc2ls1_1_0_schema)
+
+        threads = [threading.Thread(target=gen_unseeded) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        try:
+            for _ in range(3):
+                assert gen_data_batch_from_schema(self.oc2ls1_1_0_schema, 10, seed=5).gen_data == solo
+                assert gen_data_batch_from_schema(self.oc2ls1_1_0_schema, 10, seed=5, compiled=True).gen_data == solo
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+    def test_cleanup_choices_seeded(self):
+        schema = {
+            "type": "object",
+            "properties": {
+                "target": {"$ref": "#/definitions/Target"},
+                "targets": {"type": "array", "items": {"$ref": "#/definitions/Target"}},
+                "meta": {"type": "object", "properties": {"file": {}, "device": {}}}
+            },
+            "definitions": {
+                "Target": {"type": "object", "maxProperties": 1, "properties": {"file": {}, "device": {}, "process": {}}}
+            }
+        }
+        
+        def select_choice(seed):
+            target = {"file": {"name": "a"}, "device": {"id": "b"}, "process": {"pid": 1}}
+            fake_data = {"target": dict(target), "targets": [dict(target), dict(target)], "meta": dict(target)}
+            cleanup_choices(fake_data, schema, seed)
+            
+            # Objects that are not choices keep every property
+            assert len(fake_data["meta"]) == 3
+            assert all(len(choice) == 1 for choice in fake_data["targets"])
+            return list(fake_data["target"])
+        
+        selected = [select_choice(seed) for seed in range(8)]
+        
+        assert all(len(choice) == 1 for choice in selected)
+        assert len(set(choice[0] for choice in selected)) > 1
+        assert selected == [select_choice(seed) for seed in range(8)]
+        
+    def test_gen_data_stats(self):
+        stages = []
+        stats = GenStats(on_stage=lambda stage, seconds: stages.append(stage))
+        returnVal = gen_data_batch_from_schema(self.oc2ls1_1_0_schema, 3, cache=None, stats=stats)
+        
+        assert returnVal.stats is stats
+        assert set(["validation", "root_fixing", "ref_resolution", "cleanup", "model", "generation"]) <= set(stats.timings)
+        assert set(stages) == set(stats.timings)
+        assert stats.counters["recursions_removed"] == 1
+        assert stats.counters["refs_resolved"] > 0
+        assert stats.counters["constraints_clamped"] > 0
+        assert stats.counters["documents"] == 3
+        
+    def test_gen_data_choices(self):
+        schema_bene, choices_found = cleanup_schema_for_data_gen(json.loads(json.dumps(self.oc2ls1_1_0_schema)))
+        
+        assert choices_found["definitions/Target"][:3] == ["artifact", "command", "device"]
+        assert "anyOf" in schema_bene["definitions/Target"]
+        assert "definitions/Actuator" not in choices_found
+        
+        returnVal = gen_data_batch_from_schema(self.oc2ls1_1_0_schema, 10, seed=1)
+        targets = [doc["openc2_command"]["target"] for doc in returnVal.gen_data if "openc2_command" in doc]
+        assert targets
+        assert all(len(target) == 1 for target in targets)
+        
+    def test_gen_data_shared_refs(self):
+        stats = GenStats()
+        returnVal = gen_data_batch_from_schema(self.oscal_ar_schema, 3, cache=SchemaCache(), seed=1, stats=stats, options=CleanupOptions(shared_refs=True))
+        
+        assert returnVal.err_msg is None
+        assert returnVal.gen_data == gen_data_batch_from_schema(self.oscal_ar_schema, 3, seed=1).gen_data
+        assert stats.counters["refs_resolved"] > 0
+        
+    def test_prepared_key_options(self):
+        assert get_prepared_key(self.oscal_ar_schema) == get_prepared_key(self.oscal_ar_schema, CleanupOptions())
+        assert get_prepared_key(self.oscal_ar_schema, CleanupOptions(shared_refs=True)) != get_prepared_key(self.oscal_ar_schema)
+        assert CleanupOptions(recursion_depth=2) == CleanupOptions(recursion_depth=2)
+        assert len({CleanupOptions(), CleanupOptions(), CleanupOptions(target_size=None)}) == 2
+        
+    def test_gen_data_budget(self):
+        unlimited = gen_data_from_schema(self.oscal_ssp_schema, seed=2, budget=GenerationBudget(max_nodes=10 ** 9))
+        assert unlimited.budget_hit is None
+        assert unlimited.gen_data == gen_data_from_schema(self.oscal_ssp_schema, seed=2).gen_data
+        
+        stats = GenStats()
+        returnVal = gen_data_batch_from_schema(self.oscal_ssp_schema, 3, seed=2, stats=stats, budget=GenerationBudget(max_depth=4))
+        assert returnVal.err_msg is None
+        assert stats.counters["budget_hits"] == 3
+        assert all(len(json.dumps(doc)) < len(json.dumps(unlimited.gen_data)) for doc in returnVal.gen_data)
+        
+        returnVal = gen_data_from_schema(self.oscal_ssp_schema, seed=2, budget=GenerationBudget(max_seconds=0))
+        assert returnVal.budget_hit == "seconds"
+        assert returnVal.gen_data
+        
+    def test_gen_data_recursion_depth(self):
+        def get_depth(node, key: str) -> int:
+            if isinstance(node, list):
+                return max([get_depth(item, key) for item in node] or [0])
+            if isinstance(node, dict):
+                return max([get_depth(value, key) + (name == key) for name, value in node.items()] or [0])
+            return 0
+        
+        for shared_refs, recursion_depth in [(True, 0), (True, 2), (False, 2)]:
+            stats = GenStats()
+            returnVal = gen_data_batch_from_schema(
+                self.oscal_catalog_schema, 10, seed=3, stats=stats, compiled=True,
+                options=CleanupOptions(shared_refs=shared_refs, recursion_depth=recursion_depth)
+            )
+            
+            assert returnVal.err_msg is None
+            assert max(get_depth(doc, "groups") for doc in returnVal.gen_data) == recursion_depth + 1
+            assert stats.counters["recursions_unrolled"] == (4 if recursion_depth else 0)
+        
+    def test_recursion_depth_size(self):
+        # The unrolled levels are linked, not copied in, so each level adds the same
+        # number of keypaths rather than a copy of all the levels below it
+        sizes = []
+        for recursion_depth in range(5):
+            index = SchemaIndex(json.loads(json.dumps(self.oscal_catalog_schema)))
+            update_inner_refs(index, recursion_depth=recursion_depth)
+            sizes.append(len(index))
+        
+        assert len({sizes[level + 1] - sizes[level] for level in range(1, 4)}) == 1
+        assert sizes[4] < sizes[0]
+        
+    def test_gen_fake_data_regenerates_required(self):
+        schema = {
+            "type": "object",
+            "required": ["tags"],
+            "properties": {
+                "tags": {"type": "array", "maxItems": 1, "items": {"type": "string", "minLength": 1}}
+            }
+        }
+        
+        for _ in range(20):
+            fake_data = gen_fake_data(schema)
+            assert len(fake_data["tags"]) == 1
+        
+    def test_gen_fake_data_unfilled_required(self):
+        schema = {
+            "type": "object",
+            "required": ["name"],
+            "properties": {
+                "name": {"type": "string", "maxLength": 0}
+            }
+        }
+        
+        with self.assertRaises(DataGenerationError):
+            gen_fake_data(schema, max_attempts=3)
+            
+        returnVal = gen_data_from_schema(schema)
+        assert returnVal.gen_data == None
+        assert isinstance(returnVal.err_msg, DataGenerationError)
+        
+    def test_gen_data_stream_ndjson(self):
+        ndjson_buffer = io.StringIO()
+        written = write_ndjson(gen_data_stream_from_schema(self.oc2ls1_0_1_schema, 20), ndjson_buffer, buffer_size=256)
+        
+        lines = ndjson_buffer.getvalue().splitlines()
+        assert written == 20
+        assert len(lines) == 20
+        assert all(json.loads(line) for line in lines)
+        
+    def test_gen_data_stream_ndjson_append(self):
+        with tempfile.TemporaryDirectory() as out_dir:
+            ndjson_path = os.path.join(out_dir, "mock_data.ndjson")
+            write_ndjson(gen_data_stream_from_schema(self.sm_schema, 2), ndjson_path)
+            write_ndjson(gen_data_stream_from_schema(self.sm_schema, 3), ndjson_path)
+            
+            with open(ndjson_path) as ndjson_file:
+                assert len(ndjson_file.readlines()) == 5
+        
     def test_resolve_inner_refs(self):
         resolved_schema = cleanup_schema_for_data_gen(self.oc2ls1_1_0_schema)
         
@@ -183,6 +452,20 @@ class Test_Generators(unittest.TestCase):
         
         assert resolved_schema != None                  
         
+    def test_cleanup_lazy_imports(self):
+        # A new interpreter, this one already loaded JSF for the tests above
+        code = (
+            "import json, sys\n"
+            "from jadnjson.generators.json_generator import prepare_schema\n"
+            "with open(sys.argv[1]) as schema_file:\n"
+            "    prepare_schema(json.load(schema_file))\n"
+            "print(json.dumps([name for name in ['jsf', 'faker', 'benedict'] if name in sys.modules]))\n"
+        )
+        schema_path = os.path.join("tests", "data", "oc2ls_1.1.0_schema.json")
+        output = subprocess.run([sys.executable, "-c", code, schema_path], capture_output=True, text=True, check=True).stdout
+        
+        assert json.loads(output) == []
+        
 if __name__ == '__main__':
     unittest.main()
         
\ No newline at end of file
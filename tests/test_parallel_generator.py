@@ -0,0 +1,29 @@
+import json
+from unittest import TestCase
+
+from jadnjson.constants.generator_constants import TESTS_PATH
+from jadnjson.generators.parallel_generator import gen_data_parallel_from_schema
+from jadnjson.utils.general_utils import get_file
+
+
+class Test_ParallelGenerator(TestCase):
+
+    oc2ls_schema = {}
+
+    def setUp(self):
+        oc2ls_schema_doc = get_file('oc2ls_1.1.0_schema.json', TESTS_PATH)
+        self.oc2ls_schema = json.loads(oc2ls_schema_doc)
+
+    def test_same_seed_any_workers(self):
+        one_worker = list(gen_data_parallel_from_schema(self.oc2ls_schema, 12, workers=1, seed=42))
+        three_workers = list(gen_data_parallel_from_schema(self.oc2ls_schema, 12, workers=3, seed=42, chunk_size=5))
+
+        assert len(one_worker) == 12
+        assert one_worker == three_workers
+
+    def test_unordered(self):
+        ordered = list(gen_data_parallel_from_schema(self.oc2ls_schema, 10, workers=2, seed=7))
+        unordered = list(gen_data_parallel_from_schema(self.oc2ls_schema, 10, workers=2, seed=7, ordered=False, chunk_size=2))
+
+        assert sorted(json.dumps(doc, sort_keys=True) for doc in ordered) == \
+            sorted(json.dumps(doc, sort_keys=True) for doc in unordered)
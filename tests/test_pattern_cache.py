@@ -0,0 +1,78 @@
+import random
+import re
+from unittest import TestCase
+
+import rstr
+
+from jadnjson.generators.json_generator import CLEANUP_VISITOR, build_faker
+from jadnjson.utils import pattern_cache
+from jadnjson.utils.gen_stats import GenStats
+from jadnjson.utils.pattern_cache import get_pattern_generator, rewrite_pattern, sanitize_pattern
+
+
+class Test_PatternCache(TestCase):
+
+    patterns = [
+        "^[a-fA-F0-9]{8}-[a-fA-F0-9]{4}$",
+        "^(\\d{3})-(ab|c[^x]?)\\1\\s.+$",
+        "^[_\\w]+(?=x)[\\W]{2,}\\D*$"
+    ]
+
+    def test_get_pattern_generator(self):
+        # Prepared once, the generator makes the same draws as rstr
+        assert get_pattern_generator(self.patterns[0]) is get_pattern_generator(self.patterns[0])
+
+        for pattern in self.patterns:
+            generator = get_pattern_generator(pattern)
+            for seed in range(10):
+                random.seed(seed)
+                expected = rstr.xeger(pattern)
+                random.seed(seed)
+                assert generator() == expected
+
+    def test_jsf_patterns(self):
+        pattern = "^jsf-[a-f]{4}(\\.[0-9]{2})?$"
+        schema = {"type": "object", "required": ["id"], "properties": {"id": {"type": "string", "pattern": pattern}}}
+
+        # JSF's strings come from the prepared generator, the same strings as rstr
+        faker = build_faker(schema)
+        assert all(re.fullmatch(pattern, faker.generate()["id"]) for _ in range(10))
+        assert pattern in pattern_cache._generators
+
+        from jsf.schema_types import string as jsf_string
+        for seed in range(5):
+            random.seed(seed)
+            expected = rstr.xeger(pattern)
+            random.seed(seed)
+            assert jsf_string.rstr.xeger(pattern) == expected
+
+    def test_rewrite_pattern(self):
+        assert rewrite_pattern("^(\\p{L}|_)[\\p{L}\\d]*$") == "^([a-zA-Z]|_)[a-zA-Z\\d]*$"
+        assert rewrite_pattern("^\\P{N}(?<y>a)\\k<y>$") == "^[^0-9](?P<y>a)(?P=y)$"
+        assert rewrite_pattern("^[a-f]{128}$") == "^(?:[a-f]){100}(?:[a-f]){28}$"
+        assert rewrite_pattern("^(ab){150,}c{2,}$") == "^(?:(ab)){100}(?:(ab)){50}(?:(ab))*c{2,}$"
+        assert rewrite_pattern("\\p{Xx}") is None
+
+        revised = sanitize_pattern("^[a-f]{128}$")
+        assert re.fullmatch(revised, get_pattern_generator(revised)())
+        assert sanitize_pattern("a**") is None
+
+    def test_cleanup_patterns(self):
+        schema = {
+            "type": "object",
+            "properties": {
+                "hash": {"type": "string", "pattern": "^[a-f0-9]{128}$"},
+                "name": {"type": "string", "pattern": "^\\p{Lu}+$"},
+                "code": {"type": "string", "pattern": "^(\\\\?*|x)$"},
+                "id": {"type": "string", "pattern": "^\\d+$"}
+            }
+        }
+        stats = GenStats()
+        CLEANUP_VISITOR.visit(schema, {"stats": stats})
+
+        properties = schema["properties"]
+        assert properties["name"]["pattern"] == "^[A-Z]+$"
+        assert "pattern" not in properties["code"]
+        assert properties["id"]["pattern"] == "^\\d+$"
+        assert stats.counters["patterns_revised"] == 2
+        assert stats.counters["patterns_removed"] == 1
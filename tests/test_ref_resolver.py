@@ -0,0 +1,198 @@
+from unittest import TestCase
+
+from jadnjson.utils.ref_resolver import RefResolver
+from jadnjson.utils.schema_index import SchemaIndex
+
+
+class Test_RefResolver(TestCase):
+
+    schema = {}
+
+    def setUp(self):
+        self.schema = {
+            "type": "object",
+            "properties": {
+                "command": {"$ref": "#/definitions/Command"}
+            },
+            "definitions": {
+                "Command": {
+                    "type": "object",
+                    "properties": {
+                        "target": {"$ref": "#/definitions/Target"},
+                        "process": {"$ref": "#/definitions/Process"}
+                    }
+                },
+                "Target": {
+                    "type": "object",
+                    "properties": {
+                        "command_target": {"$ref": "#/definitions/Command-Target"}
+                    }
+                },
+                "Command-Target": {"type": "string"},
+                "Process": {
+                    "type": "object",
+                    "properties": {
+                        "pid": {"type": "integer"},
+                        "parent": {"$ref": "#/definitions/Process"},
+                        "children": {"type": "array", "items": {"$ref": "#/definitions/Processes"}}
+                    }
+                },
+                "Processes": {
+                    "anyOf": [{"$ref": "#/definitions/Process"}, {"type": "null"}]
+                }
+            }
+        }
+
+    def test_find_cycles(self):
+        resolver = RefResolver(SchemaIndex(self.schema))
+
+        assert resolver.recursive_groups == [["definitions/Process", "definitions/Processes"]]
+        assert resolver.recursive_refs == [
+            ("definitions/Process/properties/parent", "#/definitions/Process"),
+            ("definitions/Processes/anyOf[0]", "#/definitions/Process")
+        ]
+
+        # Dependencies come before the definitions that reference them
+        resolve_order = resolver.resolve_order
+        assert resolve_order.index("definitions/Command-Target") < resolve_order.index("definitions/Target")
+        assert resolve_order.index("definitions/Target") < resolve_order.index("definitions/Command")
+        assert resolve_order[-1] == ""
+
+    def test_resolve(self):
+        index = SchemaIndex(self.schema)
+        RefResolver(index).resolve()
+
+        command = self.schema["properties"]["command"]
+        assert command["properties"]["target"]["properties"]["command_target"] == {"type": "string"}
+
+        process = command["properties"]["process"]["properties"]
+        assert "parent" not in process
+        assert process["children"]["items"] == {"anyOf": [{"type": "null"}]}
+        assert not index.ref_sites()
+
+    def test_resolve_shared(self):
+        index = SchemaIndex(self.schema)
+        resolver = RefResolver(index)
+        resolver.resolve(shared=True)
+
+        definitions = self.schema["definitions"]
+        command = self.schema["properties"]["command"]
+        assert command is definitions["Command"]
+        assert command["properties"]["target"] is definitions["Target"]
+        assert definitions["Process"]["properties"]["children"]["items"] is definitions["Processes"]
+        assert definitions["Processes"] == {"anyOf": [{"type": "null"}]}
+        assert resolver.resolved_refs == 5
+        assert not index.ref_sites()
+
+        # Keypaths through a link are not indexed, the definition's own keypaths are
+        assert "definitions/Target/properties/command_target" in index
+        assert "definitions/Target/properties/command_target/type" not in index
+        assert "properties/command/properties" not in index
+        assert "definitions/Command-Target/type" in index
+
+    def test_unroll_recursive_refs(self):
+        self.schema["definitions"]["Process"]["required"] = ["pid", "parent"]
+        index = SchemaIndex(self.schema)
+        resolver = RefResolver(index)
+
+        assert resolver.unroll_recursive_refs(2) == 2
+        assert not resolver.recursive_refs
+        assert not resolver.recursive_groups
+
+        # Each level points at the next one, the last one ends without the recursion
+        definitions = self.schema["definitions"]
+        assert definitions["Process"]["properties"]["parent"] == {"$ref": "#/definitions/Process__1"}
+        assert definitions["Process__1"]["properties"]["children"]["items"] == {"$ref": "#/definitions/Processes__1"}
+        assert definitions["Processes__1"]["anyOf"][0] == {"$ref": "#/definitions/Process__2"}
+        assert "parent" not in definitions["Process__2"]["properties"]
+        assert definitions["Process__2"]["required"] == ["pid"]
+        assert definitions["Processes__2"] == {"anyOf": [{"type": "null"}]}
+
+        resolver.resolve()
+        parent = self.schema["properties"]["command"]["properties"]["process"]["properties"]["parent"]
+        assert parent["properties"]["parent"]["properties"] == {
+            "pid": {"type": "integer"},
+            "children": {"type": "array", "items": {"anyOf": [{"type": "null"}]}}
+        }
+        assert not index.ref_sites()
+
+    def test_unroll_recursive_arrays(self):
+        self.schema["definitions"]["Process"]["properties"]["children"]["items"] = {"$ref": "#/definitions/Process"}
+        self.schema["definitions"]["Process"]["properties"]["children"]["minItems"] = 1
+        self.schema["definitions"]["Process"]["required"] = ["children"]
+        self.schema["definitions"]["Target"]["properties"]["targets"] = {"type": "array", "items": {"$ref": "#/definitions/Target"}}
+        RefResolver(SchemaIndex(self.schema)).unroll_recursive_refs(1)
+
+        # A required array has no items left to generate, an optional one is dropped
+        definitions = self.schema["definitions"]
+        assert definitions["Process__1"]["properties"]["children"] == {"type": "array", "items": {}, "maxItems": 0}
+        assert "targets" not in definitions["Target__1"]["properties"]
+
+    def test_sub_path_refs(self):
+        schema = {
+            "type": "object",
+            "properties": {"b": {"$ref": "#/definitions/B"}},
+            "definitions": {
+                # A property referring to a sibling property is not a recursion
+                "A": {
+                    "type": "object",
+                    "required": ["b", "c"],
+                    "properties": {
+                        "b": {"$ref": "#/definitions/Name"},
+                        "c": {"$ref": "#/definitions/A/properties/b"},
+                        "d": {"$ref": "#/definitions/A/properties/b/maxLength"}
+                    }
+                },
+                # Nor is a ref into a part of B that does not lead back to A
+                "B": {
+                    "type": "object",
+                    "properties": {
+                        "a": {"$ref": "#/definitions/A"},
+                        "label": {"type": "string"}
+                    }
+                },
+                "Name": {"type": "string", "maxLength": 8}
+            }
+        }
+        schema["definitions"]["A"]["properties"]["e"] = {"$ref": "#/definitions/B/properties/label"}
+
+        index = SchemaIndex(schema)
+        resolver = RefResolver(index)
+        assert not resolver.recursive_refs
+        assert not resolver.recursive_groups
+
+        resolver.resolve()
+        a = schema["properties"]["b"]["properties"]["a"]
+        assert a["required"] == ["b", "c"]
+        assert a["properties"]["b"] == a["properties"]["c"] == {"type": "string", "maxLength": 8}
+        assert a["properties"]["d"] == 8
+        assert a["properties"]["e"] == {"type": "string"}
+        assert not index.ref_sites()
+
+    def test_sub_path_recursion(self):
+        schema = {
+            "type": "object",
+            "properties": {"a": {"$ref": "#/definitions/A"}},
+            "definitions": {
+                "A": {
+                    "type": "object",
+                    "properties": {
+                        "b": {"type": "object", "properties": {"next": {"$ref": "#/definitions/A"}}},
+                        "c": {"$ref": "#/definitions/A/properties/b"}
+                    }
+                }
+            }
+        }
+
+        # The part c refers to leads back to A through next, both make the cycle
+        index = SchemaIndex(schema)
+        resolver = RefResolver(index)
+        assert resolver.recursive_groups == [["definitions/A"]]
+        assert resolver.recursive_refs == [
+            ("definitions/A/properties/b/properties/next", "#/definitions/A"),
+            ("definitions/A/properties/c", "#/definitions/A/properties/b")
+        ]
+
+        resolver.resolve()
+        assert schema["properties"]["a"]["properties"] == {"b": {"type": "object", "properties": {}}}
+        assert not index.ref_sites()
@@ -0,0 +1,69 @@
+import json
+import tempfile
+from unittest import TestCase
+
+from jadnjson.constants.generator_constants import TESTS_PATH
+from jadnjson.generators.json_generator import gen_data_from_schema, prepare_schema
+from jadnjson.utils.general_utils import get_file
+from jadnjson.utils.schema_cache import SchemaCache, get_schema_hash
+
+
+class Test_SchemaCache(TestCase):
+
+    sm_schema = {}
+
+    def setUp(self):
+        sm_schema_doc = get_file('sm_schema.json', TESTS_PATH)
+        self.sm_schema = json.loads(sm_schema_doc)
+
+    def test_schema_hash(self):
+        reordered = json.loads(json.dumps(self.sm_schema, sort_keys=True))
+
+        assert get_schema_hash(self.sm_schema) == get_schema_hash(reordered)
+        assert get_schema_hash(self.sm_schema) != get_schema_hash(self.sm_schema, max_items=2)
+
+    def test_lru(self):
+        cache = SchemaCache(max_size=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert cache.get("a") == 1
+
+        cache.put("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.stats()["hits"] == 2
+        assert cache.stats()["misses"] == 1
+
+        cache.invalidate("a")
+        assert "a" not in cache
+        cache.invalidate()
+        assert len(cache) == 0
+
+    def test_prepare_schema(self):
+        cache = SchemaCache()
+        original = json.dumps(self.sm_schema)
+
+        prepared = prepare_schema(self.sm_schema, cache)
+        assert prepare_schema(json.loads(original), cache) is prepared
+        assert cache.stats()["misses"] == 1
+        assert cache.stats()["hits"] == 1
+
+        # The caller's schema is left as it was
+        assert json.dumps(self.sm_schema) == original
+
+        returnVal = gen_data_from_schema(self.sm_schema, cache)
+        assert returnVal.gen_data != None
+        assert cache.stats()["hits"] == 2
+
+    def test_disk_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            prepared = prepare_schema(self.sm_schema, SchemaCache(cache_dir=cache_dir))
+
+            # A new cache, e.g. in a restarted worker, reads the entry from disk
+            cache = SchemaCache(cache_dir=cache_dir)
+            assert prepare_schema(self.sm_schema, cache) == prepared
+            assert cache.stats()["disk_hits"] == 1
+
+            cache.invalidate()
+            assert prepare_schema(self.sm_schema, cache) == prepared
+            assert cache.stats()["misses"] == 1
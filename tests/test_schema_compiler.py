@@ -0,0 +1,93 @@
+import json
+from unittest import TestCase
+
+from jsonschema import Draft7Validator
+
+from jadnjson.constants import generator_constants
+from jadnjson.constants.generator_constants import TESTS_PATH
+from jadnjson.generators.json_generator import build_faker, cleanup_schema_dict, gen_data_batch_from_schema, gen_fake_data
+from jadnjson.generators.schema_compiler import SchemaCompiler
+from jadnjson.utils.gen_budget import GenerationBudget
+from jadnjson.utils.general_utils import get_file
+from jadnjson.utils.seeding import seeded_generation
+
+
+class Test_SchemaCompiler(TestCase):
+
+    schema = {}
+    oc2ls1_1_0_schema = {}
+
+    def setUp(self):
+        version = {"type": "string", "pattern": "^\\d+$"}
+        self.schema = {
+            "type": "object",
+            "required": ["versions", "status"],
+            "properties": {
+                "versions": {"type": "array", "minItems": 1, "maxItems": 3, "items": version},
+                "status": {"type": "integer", "enum": [200, 404]},
+                "count": {"type": ["integer", "null"], "minimum": 1, "maximum": 10},
+                "ratio": {"type": "number", "maximum": 1, "multipleOf": 0.25},
+                "name": {"type": "string", "minLength": 2, "maxLength": 8},
+                "data": {"type": "string", "contentEncoding": "base-64"},
+                "target": {"anyOf": [version, {"type": "boolean"}]},
+                "extra": {"allOf": [{"type": "object", "properties": {"id": version}}]}
+            },
+            "definitions": {"Version": version}
+        }
+
+        oc2ls_schema_1_1_0_doc = get_file('oc2ls_1.1.0_schema.json', TESTS_PATH)
+        self.oc2ls1_1_0_schema = json.loads(oc2ls_schema_1_1_0_doc)
+
+    def test_compile(self):
+        compiler = SchemaCompiler()
+        generate = compiler.compile(self.schema)
+        validator = Draft7Validator(self.schema)
+
+        # The shared Version dict is compiled once, allOf is left to JSF
+        assert compiler.compile(self.schema["definitions"]["Version"]) is compiler.compile(self.schema["properties"]["versions"]["items"])
+        assert compiler.fallbacks == 1
+
+        docs = [generate() for _ in range(50)]
+        assert all(not list(validator.iter_errors(doc)) for doc in docs)
+        assert any(doc.get("count") is None for doc in docs if "count" in doc)
+
+        full = compiler.compile(self.schema, non_empty=True)()
+        assert set(full) == set(self.schema["properties"])
+
+    def test_compile_budget(self):
+        budget = GenerationBudget(max_nodes=1)
+        generate = SchemaCompiler(budget=budget).compile(self.schema)
+        validator = Draft7Validator(self.schema)
+
+        # Over the budget after the root, only the required properties with minimal values
+        for _ in range(10):
+            budget.start()
+            doc = generate()
+            assert budget.hit == "nodes"
+            assert doc == {"versions": [doc["versions"][0]], "status": 200}
+            assert not list(validator.iter_errors(doc))
+
+    def test_compiled_same_as_jsf(self):
+        schema_dict, _ = cleanup_schema_dict(self.oc2ls1_1_0_schema)
+        faker = build_faker(schema_dict, 5)
+        compiled = build_faker(schema_dict, 5, compiled=True)
+
+        # The closures make the same random draws as JSF, so a seed gives the same documents
+        assert [gen_fake_data(schema_dict, compiled, seed=i) for i in range(10)] == \
+            [gen_fake_data(schema_dict, faker, seed=i) for i in range(10)]
+
+        with seeded_generation(3, compiled.rng):
+            first = compiled.generate()
+        with seeded_generation(3, compiled.rng):
+            assert compiled.generate() == first
+
+    def test_gen_data_batch_compiled(self):
+        returnVal = gen_data_batch_from_schema(self.oc2ls1_1_0_schema, 5, seed=42, compiled=True)
+
+        assert returnVal.err_msg is None
+        assert returnVal.gen_data == gen_data_batch_from_schema(self.oc2ls1_1_0_schema, 5, seed=42).gen_data
+
+    def test_jsf_formats(self):
+        from jsf.schema_types import string as jsf_string
+
+        assert generator_constants.JSF_FORMATS == set(jsf_string.format_map) | {"regex"}
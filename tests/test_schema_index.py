@@ -0,0 +1,122 @@
+import json
+from unittest import TestCase
+
+from benedict import benedict
+
+from jadnjson.constants.generator_constants import TESTS_PATH
+from jadnjson.generators.json_generator import replace_reserved_words, update_inner_refs
+from jadnjson.utils.general_utils import get_file
+from jadnjson.utils.schema_index import SchemaIndex
+
+
+class Test_SchemaIndex(TestCase):
+
+    schema = {}
+    oc2ls1_1_0_schema = {}
+
+    def setUp(self):
+        self.schema = {
+            "type": "object",
+            "properties": {
+                "results": {"$ref": "#/definitions/Results"}
+            },
+            "definitions": {
+                "Results": {
+                    "type": "object",
+                    "properties": {
+                        "versions": {"$ref": "#/definitions/Versions"},
+                        "pairs": {"anyOf": [{"$ref": "#/definitions/Version"}, {"type": "integer"}]}
+                    }
+                },
+                "Versions": {"type": "array", "maxItems": 10, "items": {"$ref": "#/definitions/Version"}},
+                "Version": {"type": "string", "pattern": "^\\d+$"}
+            }
+        }
+
+        oc2ls_schema_1_1_0_doc = get_file('oc2ls_1.1.0_schema.json', TESTS_PATH)
+        self.oc2ls1_1_0_schema = json.loads(oc2ls_schema_1_1_0_doc)
+
+    def test_index_lookups(self):
+        index = SchemaIndex(self.schema)
+
+        assert index["definitions/Versions/maxItems"] == 10
+        assert index["definitions/Results/properties/pairs/anyOf[1]/type"] == "integer"
+        assert index.keys_ending_with("pattern") == ["definitions/Version/pattern"]
+        assert index.keys_ending_with("type") == [
+            "definitions/Results/type", "definitions/Version/type", "definitions/Versions/type", "type"
+        ]
+        assert len(index.keys_ending_with("type", indexes=True)) == 5
+        assert sorted(index.refs["#/definitions/Version"]) == [
+            "definitions/Results/properties/pairs/anyOf[0]", "definitions/Versions/items"
+        ]
+
+    def test_index_updates(self):
+        index = SchemaIndex(self.schema)
+
+        index["definitions/Versions/items"] = {"type": "string", "maxLength": 5}
+        assert "definitions/Versions/items/maxLength" in index
+        assert "definitions/Versions/items/$ref" not in index
+        assert sorted(index.refs["#/definitions/Version"]) == ["definitions/Results/properties/pairs/anyOf[0]"]
+
+        del index["definitions/Results/properties/pairs/anyOf[0]"]
+        assert index["definitions/Results/properties/pairs/anyOf[0]/type"] == "integer"
+        assert "definitions/Results/properties/pairs/anyOf[1]" not in index
+        assert "#/definitions/Version" not in index.refs
+
+        index["definitions/Version/format"] = "date"
+        assert self.schema["definitions"]["Version"]["format"] == "date"
+        assert index.keys_ending_with("format") == ["definitions/Version/format"]
+
+    def test_link(self):
+        index = SchemaIndex(self.schema)
+        version = self.schema["definitions"]["Version"]
+
+        index.link("definitions/Versions/items", version, "definitions/Version")
+        assert "definitions/Versions/items" in index
+        assert "definitions/Versions/items/pattern" not in index
+
+        # A copy of a node holding the link is indexed up to the link, not through it
+        index["properties/versions"] = self.schema["definitions"]["Versions"]
+        assert "properties/versions/maxItems" in index
+        assert "properties/versions/items/pattern" not in index
+        assert index.keys_ending_with("pattern") == ["definitions/Version/pattern"]
+
+    def test_rename(self):
+        index = SchemaIndex(self.schema)
+
+        assert index.rename("definitions/Versions", "Releases") == "definitions/Releases"
+        assert list(self.schema["definitions"]) == ["Results", "Releases", "Version"]
+        assert index["definitions/Releases/maxItems"] == 10
+        assert "definitions/Versions/maxItems" not in index
+        assert "definitions/Releases/items" in index.refs["#/definitions/Version"]
+
+    def test_replace_reserved_words(self):
+        self.schema["definitions"]["Results"]["properties"]["Type"] = {"$ref": "#/definitions/Type"}
+        self.schema["definitions"]["Results"]["required"] = ["Type", "pairs"]
+        self.schema["definitions"]["Type"] = {"type": "string"}
+
+        index = SchemaIndex(self.schema)
+        replace_reserved_words(index)
+        update_inner_refs(index)
+
+        # Only the definition is renamed, the property and required name are data
+        results = self.schema["properties"]["results"]
+        assert "Type" not in self.schema["definitions"]
+        assert "Type$1" in self.schema["definitions"]
+        assert results["properties"]["Type"] == {"type": "string"}
+        assert results["required"] == ["Type", "pairs"]
+
+    def test_update_inner_refs(self):
+        index = SchemaIndex(self.schema)
+        update_inner_refs(index)
+
+        assert self.schema["properties"]["results"]["properties"]["versions"]["items"] == {"type": "string", "pattern": "^\\d+$"}
+        assert not index.ref_sites()
+
+    def test_num_of_keys(self):
+        index = SchemaIndex(self.oc2ls1_1_0_schema)
+        update_inner_refs(index)
+
+        # Counted through every resolved ref, the same as a full keypath enumeration
+        bene_schema = benedict(self.oc2ls1_1_0_schema, keypath_separator="/")
+        assert index.num_of_keys() == len(bene_schema.keypaths(indexes=False))
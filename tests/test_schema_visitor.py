@@ -0,0 +1,42 @@
+from unittest import TestCase
+
+from jadnjson.generators.json_generator import CLEANUP_VISITOR
+from jadnjson.utils.gen_stats import GenStats
+from jadnjson.utils.schema_visitor import SchemaVisitor
+
+
+class Test_SchemaVisitor(TestCase):
+
+    schema = {}
+
+    def setUp(self):
+        version = {"type": "string", "maxLength": 100, "pattern": "^\\d+$"}
+        self.schema = {
+            "type": "object",
+            "properties": {
+                "versions": {"type": "array", "maxItems": 10, "uniqueItems": True, "items": version},
+                "pairs": {"anyOf": [version, {"type": "integer", "enum": [{"maxItems": 10}]}]},
+                "maxItems": {"type": "string", "contentEncoding": "base64"}
+            },
+            "definitions": {"Version": version}
+        }
+
+    def test_visit(self):
+        seen = []
+        visitor = SchemaVisitor()
+        visitor.register(["maxItems", "maxLength"], lambda node, parent, context: seen.append((node, parent)))
+
+        # The shared Version dict is visited once, property names and enum values are not keywords
+        assert visitor.visit(self.schema) == 6
+        assert len(seen) == 2
+        assert any(node is self.schema["definitions"]["Version"] for node, _ in seen)
+        assert any(parent is self.schema["properties"] for _, parent in seen)
+
+    def test_cleanup_visitor(self):
+        stats = GenStats()
+        CLEANUP_VISITOR.visit(self.schema, {"stats": stats})
+
+        versions = self.schema["properties"]["versions"]
+        assert versions["uniqueItems"] == False
+        assert self.schema["properties"]["maxItems"]["contentEncoding"] == "base-64"
+        assert self.schema["properties"]["pairs"]["anyOf"][1]["enum"] == [{"maxItems": 10}]
@@ -3,7 +3,8 @@ from unittest import TestCase
 
 from jadnjson.constants.generator_constants import TESTS_PATH
 from jadnjson.utils.general_utils import get_file
-from jadnjson.validators.schema_validator import validate_schema
+from jadnjson.utils.schema_cache import SchemaCache
+from jadnjson.validators.schema_validator import get_validator, get_validator_class, validate_schema
 
 
 class Test_SchemaValidator(TestCase):
@@ -53,6 +54,21 @@ class Test_SchemaValidator(TestCase):
             assert result[0] == True
             test_result = True
             
-        assert test_result == True                
+        assert test_result == True
+
+    def test_validator_draft(self):
+        assert get_validator_class(self.alt_schema).__name__ == "Draft7Validator"
+        assert get_validator_class({"type": "object"}).__name__ == "Draft202012Validator"
+
+    def test_validator_cached(self):
+        cache = SchemaCache()
+        validator = get_validator(self.alt_schema, cache)
+        assert get_validator(json.loads(json.dumps(self.alt_schema)), cache) is validator
+        assert cache.stats()["hits"] == 1
+
+        # The validator keeps its own copy of the schema
+        self.alt_schema["$ref"] = "#/definitions/Other"
+        assert validator.schema["$ref"] == "#/definitions/Root"
 
-        
\ No newline at end of file
+        with self.assertRaises(ValueError):
+            get_validator({"type": 1}, cache)
@@ -0,0 +1,81 @@
+import json
+from unittest import TestCase
+
+from jadnjson.constants.generator_constants import TESTS_PATH
+from jadnjson.generators.json_generator import build_faker, cleanup_schema_dict, gen_fake_data
+from jadnjson.utils.cleanup_options import CleanupOptions
+from jadnjson.utils.general_utils import get_file
+from jadnjson.utils.pattern_cache import parse_pattern
+from jadnjson.utils.size_planner import SizePlanner, estimate_parsed
+
+
+class Test_SizePlanner(TestCase):
+
+    schema = {}
+    oscal_ar_schema = {}
+
+    def setUp(self):
+        link = {"type": "object", "required": ["href"], "properties": {"href": {"type": "string", "format": "uri"}}}
+        self.schema = {
+            "type": "object",
+            "required": ["title", "links", "parts"],
+            "properties": {
+                "title": {"type": "string", "maxLength": 200},
+                "links": {"type": "array", "items": link},
+                "parts": {
+                    "type": "array",
+                    "minItems": 2,
+                    "items": {
+                        "type": "object",
+                        "required": ["links", "ids"],
+                        "properties": {
+                            "links": {"type": "array", "items": link},
+                            "ids": {"type": "array", "maxItems": 1000, "items": {"type": "string", "pattern": "^[a-z]{4}$"}}
+                        }
+                    }
+                }
+            }
+        }
+
+        oscal_ar_schema_doc = get_file('oscal_ar_schema.json', TESTS_PATH)
+        self.oscal_ar_schema = json.loads(oscal_ar_schema_doc)
+
+    def test_plan(self):
+        small = SizePlanner(target_size=1000)
+        small.plan(self.schema)
+        large = SizePlanner(target_size=20000)
+        large.plan(self.schema)
+
+        assert small.estimated_size <= 1000 < large.estimated_size <= 20000
+        assert small.item_budget < large.item_budget
+
+        # Arrays of small items get more of the budget than arrays of objects
+        parts = self.schema["properties"]["parts"]
+        limits = large.limits
+        assert limits[id(parts["items"]["properties"]["ids"])][1]["maxItems"] > limits[id(parts)][1]["maxItems"]
+
+        assert small.apply() == 5
+        assert parts["maxItems"] == parts["minItems"] == 1
+        assert self.schema["properties"]["title"]["maxLength"] == 25
+
+    def test_plan_seconds(self):
+        planner = SizePlanner(target_seconds=0.002)
+        planner.plan(self.schema)
+
+        loose = SizePlanner(target_seconds=0.02)
+        loose.plan(self.schema)
+
+        assert planner.estimated_seconds <= 0.002 < loose.estimated_seconds
+        assert planner.estimated_size < loose.estimated_size
+
+    def test_estimate_pattern(self):
+        assert estimate_parsed(parse_pattern("^[a-z]{4}$")) == (4, 13)
+        assert estimate_parsed(parse_pattern("(ab|cdef)x?"))[0] == 3.5
+
+    def test_target_size(self):
+        for target_size in (10000, 30000):
+            schema_dict, _ = cleanup_schema_dict(json.loads(json.dumps(self.oscal_ar_schema)), options=CleanupOptions(target_size=target_size))
+            faker = build_faker(schema_dict, compiled=True)
+            sizes = [len(json.dumps(gen_fake_data(schema_dict, faker, seed=i))) for i in range(10)]
+
+            assert target_size / 2 < sum(sizes) / len(sizes) < target_size * 1.5